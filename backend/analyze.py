@@ -32,15 +32,27 @@ Scoring Rules (VADER compound score thresholds):
 - anything in between → Neutral 😐
 """
 
+import json
+import os
+import sys
+import time
+from datetime import datetime
 import pandas as pd
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from clean import load_and_clean
+from clean import load_and_clean, iter_clean_chunks
+from metrics import ANALYZE_STAGE_SECONDS
 
 # ─── CONSTANTS ────────────────────────────────────────────────────────────────
 POSITIVE_THRESHOLD = 0.05
 NEGATIVE_THRESHOLD = -0.05
 OUTPUT_FILE = 'analyzed_output.csv'
-
+CHECKPOINT_FILE = OUTPUT_FILE + '.ckpt'
+OUTPUT_COLS = [
+    'post_id', 'subreddit', 'title', 'author', 'comment',
+    'cleaned_comment', 'compound_score', 'sentiment',
+    'vader_pos', 'vader_neu', 'vader_neg',
+    'upvotes', 'created_time'
+]
 
 def get_vader_sentiment(text: str, analyzer: SentimentIntensityAnalyzer) -> dict:
     """
@@ -72,6 +84,40 @@ def label_sentiment(compound_score: float) -> str:
         return 'Neutral'
 
 
+def score_frame(df: pd.DataFrame, analyzer: SentimentIntensityAnalyzer | None = None) -> pd.DataFrame:
+    """
+    Add VADER columns (vader_neg/neu/pos, compound_score) and the
+    sentiment label to a cleaned DataFrame.
+    """
+    if analyzer is None:
+        from scoring import get_analyzer   # scoring imports this module; import lazily
+        analyzer = get_analyzer()          # one per process (one per pool worker)
+
+    vader_results = df['cleaned_comment'].apply(
+        lambda text: get_vader_sentiment(text, analyzer)
+    )
+
+    df['vader_neg']      = vader_results.apply(lambda r: r['neg'])
+    df['vader_neu']      = vader_results.apply(lambda r: r['neu'])
+    df['vader_pos']      = vader_results.apply(lambda r: r['pos'])
+    df['compound_score'] = vader_results.apply(lambda r: round(r['compound'], 4))
+    df['sentiment']      = df['compound_score'].apply(label_sentiment)
+    return df
+
+
+def _print_summary(total: int, pos: int, neu: int, neg: int, avg: float):
+    total_safe = total or 1
+    print(f"\n{'='*40}")
+    print(f"  SENTIMENT ANALYSIS RESULTS")
+    print(f"{'='*40}")
+    print(f"  Total Comments Analyzed : {total}")
+    print(f"  Positive  😊            : {pos}  ({pos/total_safe*100:.1f}%)")
+    print(f"  Neutral   😐            : {neu}  ({neu/total_safe*100:.1f}%)")
+    print(f"  Negative  😠            : {neg}  ({neg/total_safe*100:.1f}%)")
+    print(f"  Avg Compound Score      : {avg:.4f}")
+    print(f"{'='*40}\n")
+
+
 def analyze(csv_path: str = 'reddit_data.csv') -> pd.DataFrame:
     """
     Full Sentiment Analysis pipeline.
@@ -86,59 +132,155 @@ def analyze(csv_path: str = 'reddit_data.csv') -> pd.DataFrame:
     """
 
     # ── Step 1: Load and clean data ──────────────────────────────────────────
-    df = load_and_clean(csv_path)
+    with ANALYZE_STAGE_SECONDS.time(stage='load_clean'):
+        df = load_and_clean(csv_path)
 
     # ── Step 2: Initialize VADER ─────────────────────────────────────────────
     print("[analyze.py] Initializing VADER SentimentIntensityAnalyzer...")
-    analyzer = SentimentIntensityAnalyzer()
+    from scoring import get_analyzer
+    analyzer = get_analyzer()
 
-    # ── Step 3: Compute scores ───────────────────────────────────────────────
+    # ── Steps 3 + 4: Compute scores and assign labels ────────────────────────
     print("[analyze.py] Analyzing sentiment for each comment...")
-
-    vader_results = df['cleaned_comment'].apply(
-        lambda text: get_vader_sentiment(text, analyzer)
-    )
-
-    df['vader_neg']      = vader_results.apply(lambda r: r['neg'])
-    df['vader_neu']      = vader_results.apply(lambda r: r['neu'])
-    df['vader_pos']      = vader_results.apply(lambda r: r['pos'])
-    df['compound_score'] = vader_results.apply(lambda r: round(r['compound'], 4))
-
-    # ── Step 4: Assign sentiment labels ──────────────────────────────────────
-    df['sentiment'] = df['compound_score'].apply(label_sentiment)
+    with ANALYZE_STAGE_SECONDS.time(stage='score'):
+        df = score_frame(df, analyzer)
 
     # ── Step 5: Save output ──────────────────────────────────────────────────
-    output_cols = [
-        'post_id', 'subreddit', 'title', 'author', 'comment',
-        'cleaned_comment', 'compound_score', 'sentiment',
-        'vader_pos', 'vader_neu', 'vader_neg',
-        'upvotes', 'created_time'
-    ]
-    df[output_cols].to_csv(OUTPUT_FILE, index=False)
+    with ANALYZE_STAGE_SECONDS.time(stage='write'):
+        df[OUTPUT_COLS].to_csv(OUTPUT_FILE, index=False)
     print(f"[analyze.py] Results saved to: {OUTPUT_FILE}")
 
     # ── Step 6: Print summary ─────────────────────────────────────────────────
-    total = len(df)
-    pos = (df['sentiment'] == 'Positive').sum()
-    neu = (df['sentiment'] == 'Neutral').sum()
-    neg = (df['sentiment'] == 'Negative').sum()
-
-    print(f"\n{'='*40}")
-    print(f"  SENTIMENT ANALYSIS RESULTS")
-    print(f"{'='*40}")
-    print(f"  Total Comments Analyzed : {total}")
-    print(f"  Positive  😊            : {pos}  ({pos/total*100:.1f}%)")
-    print(f"  Neutral   😐            : {neu}  ({neu/total*100:.1f}%)")
-    print(f"  Negative  😠            : {neg}  ({neg/total*100:.1f}%)")
-    print(f"  Avg Compound Score      : {df['compound_score'].mean():.4f}")
-    print(f"{'='*40}\n")
+    counts = df['sentiment'].value_counts()
+    _print_summary(len(df), int(counts.get('Positive', 0)), int(counts.get('Neutral', 0)),
+                   int(counts.get('Negative', 0)), float(df['compound_score'].mean()))
 
     return df
 
 
+def _input_stamp(csv_path: str) -> dict:
+    """Size and mtime of the raw CSV: a file replaced or appended to at the same path no longer matches."""
+    st = os.stat(csv_path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def _load_checkpoint(csv_path: str) -> dict | None:
+    """Return the checkpoint for csv_path if one exists and matches the input and output on disk."""
+    try:
+        with open(CHECKPOINT_FILE) as f:
+            ckpt = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if ckpt.get('csv_path') != os.path.abspath(csv_path):
+        print(f"[analyze.py] Ignoring checkpoint for a different input: {ckpt.get('csv_path')}")
+        return None
+    if ckpt.get('input') != _input_stamp(csv_path):
+        print(f"[analyze.py] Ignoring checkpoint: {csv_path} changed since it was written.")
+        return None
+    if not os.path.exists(OUTPUT_FILE) or os.path.getsize(OUTPUT_FILE) < ckpt['output_bytes']:
+        print("[analyze.py] Ignoring checkpoint: output file is missing or shorter than recorded.")
+        return None
+    return ckpt
+
+
+def _save_checkpoint(ckpt: dict):
+    """Write the checkpoint atomically so a crash mid-write never corrupts it."""
+    ckpt['updated_at'] = datetime.now().isoformat()
+    tmp = CHECKPOINT_FILE + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(ckpt, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, CHECKPOINT_FILE)
+
+
+def analyze_chunked(csv_path: str = 'reddit_data.csv', chunksize: int = 50_000,
+                    workers: int | None = None, resume: bool = True) -> dict:
+    """
+    Streaming, resumable variant of analyze() for raw CSVs larger than RAM.
+
+    Cleaning and scoring run per chunk across a process pool (see
+    clean.iter_clean_chunks); each scored chunk is appended to OUTPUT_FILE
+    in input order as soon as it is ready. Neither the raw nor the analyzed
+    frame is ever held in memory whole, so only summary counts are returned.
+
+    After every chunk a checkpoint (input offset, output rows/bytes, running
+    counts) is written next to the output. If the run dies, calling this
+    again with the same csv_path truncates the output back to the last
+    checkpoint and continues from the recorded input offset. A checkpoint
+    whose input has since changed size or mtime is ignored and the run
+    starts over. The checkpoint is removed once the run completes; pass
+    resume=False to start over.
+    """
+    ckpt = _load_checkpoint(csv_path) if resume else None
+    if ckpt:
+        with open(OUTPUT_FILE, 'r+b') as f:
+            f.truncate(ckpt['output_bytes'])   # drop a chunk written after the last checkpoint
+        print(f"[analyze.py] Resuming from checkpoint: {ckpt['input_offset']} input rows done, "
+              f"{ckpt['output_rows']} rows already written.")
+    else:
+        if os.path.exists(OUTPUT_FILE):
+            os.remove(OUTPUT_FILE)
+        ckpt = {
+            'csv_path': os.path.abspath(csv_path),
+            'input': _input_stamp(csv_path),
+            'input_offset': 0,
+            'output_rows': 0,
+            'output_bytes': 0,
+            'counts': {'Positive': 0, 'Neutral': 0, 'Negative': 0},
+            'score_sum': 0.0,
+        }
+
+    started = time.perf_counter()
+    rows_this_run = 0
+    chunks = iter_clean_chunks(csv_path, chunksize, workers, then=score_frame,
+                               skip_rows=ckpt['input_offset'])
+    waited = time.perf_counter()
+    for raw_rows, chunk in chunks:
+        # Clean + score run inside the pool; here we only see how long we waited for them
+        ANALYZE_STAGE_SECONDS.observe(time.perf_counter() - waited, stage='chunk_clean_score')
+        write_started = time.perf_counter()
+        with open(OUTPUT_FILE, 'a', newline='') as f:
+            chunk[OUTPUT_COLS].to_csv(f, index=False, header=(ckpt['output_bytes'] == 0))
+            f.flush()
+            os.fsync(f.fileno())
+        ckpt['output_bytes'] = os.path.getsize(OUTPUT_FILE)
+
+        counts = chunk['sentiment'].value_counts()
+        for label in ckpt['counts']:
+            ckpt['counts'][label] += int(counts.get(label, 0))
+        ckpt['score_sum'] += float(chunk['compound_score'].sum())
+        ckpt['input_offset'] += raw_rows
+        ckpt['output_rows'] += len(chunk)
+        _save_checkpoint(ckpt)
+        ANALYZE_STAGE_SECONDS.observe(time.perf_counter() - write_started, stage='chunk_write')
+
+        rows_this_run += raw_rows
+        rate = rows_this_run / max(time.perf_counter() - started, 1e-9)
+        print(f"[analyze.py] {ckpt['input_offset']} input rows done, {ckpt['output_rows']} written "
+              f"({rate:,.0f} rows/s)")
+        waited = time.perf_counter()
+
+    if os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
+    print(f"[analyze.py] Results saved to: {OUTPUT_FILE}")
+
+    total = ckpt['output_rows']
+    c = ckpt['counts']
+    avg = ckpt['score_sum'] / total if total else 0.0
+    _print_summary(total, c['Positive'], c['Neutral'], c['Negative'], avg)
+    return {'total': total, **c, 'avg_compound_score': round(avg, 4)}
+
+
 # ─── STANDALONE TEST ─────────────────────────────────────────────────────────
 if __name__ == '__main__':
-    # Run: python analyze.py
+    # Run: python analyze.py                      → whole file in memory
+    #      python analyze.py --chunksize 100000   → chunked, parallel, streamed to disk,
+    #                                                 resumes from the last checkpoint after a crash
+    if '--chunksize' in sys.argv:
+        analyze_chunked('reddit_data.csv', chunksize=int(sys.argv[sys.argv.index('--chunksize') + 1]))
+        sys.exit(0)
+
     df = analyze('reddit_data.csv')
 
     print("SAMPLE OUTPUT (first 5 rows):")
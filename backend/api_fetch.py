@@ -24,18 +24,18 @@ Setup:
   3. Run: pip install praw python-dotenv
 """
 
+import importlib.util
 import re
 import os
+import threading
 
 # ─── OPTIONAL IMPORTS ────────────────────────────────────────────────────────
 # These are only required for live fetching. If not installed,
 # the module degrades gracefully and returns a useful error.
 
-try:
-    import praw
-    PRAW_AVAILABLE = True
-except ImportError:
-    PRAW_AVAILABLE = False
+# praw pulls in requests and ~100 ms of imports, so only check that it is
+# installed here and import it when the first client is built.
+PRAW_AVAILABLE = importlib.util.find_spec('praw') is not None
 
 try:
     from dotenv import load_dotenv
@@ -88,6 +88,47 @@ def check_credentials() -> dict:
     return {'ok': True, 'client_id': client_id, 'client_secret': client_secret, 'user_agent': user_agent}
 
 
+# ─── PER-THREAD CLIENTS ──────────────────────────────────────────────────────
+# Building a praw.Reddit instance re-reads config and re-authenticates, so
+# clients are reused across calls. praw is not thread-safe, though, so each
+# thread (e.g. each url_analysis worker) keeps its own read-only client.
+
+_local = threading.local()
+_generation = 0                 # bumped by reset_reddit_client() to retire every thread's client
+_generation_lock = threading.Lock()
+
+
+def get_reddit_client(creds: dict | None = None):
+    """
+    Return this thread's authenticated praw.Reddit client, creating it on
+    first use. Raises RuntimeError if praw or the credentials are missing.
+    """
+    client = getattr(_local, 'client', None)
+    if client is not None and _local.generation == _generation:
+        return client
+
+    creds = creds or check_credentials()
+    if not creds['ok']:
+        raise RuntimeError(creds['error'])
+    import praw
+    reddit = praw.Reddit(
+        client_id=creds['client_id'],
+        client_secret=creds['client_secret'],
+        user_agent=creds['user_agent'],
+    )
+    # Note: read_only mode – we only read, never post
+    reddit.read_only = True
+    _local.client, _local.generation = reddit, _generation
+    return reddit
+
+
+def reset_reddit_client():
+    """Drop every thread's client so the next call re-authenticates (e.g. after a credential change)."""
+    global _generation
+    with _generation_lock:
+        _generation += 1
+
+
 def fetch_post_data(url: str, comment_limit: int = 50) -> dict:
     """
     Fetch a Reddit post and its top-level comments.
@@ -132,13 +173,7 @@ def fetch_post_data(url: str, comment_limit: int = 50) -> dict:
 
     # ── 3. Authenticate with Reddit ───────────────────────────────────────────
     try:
-        reddit = praw.Reddit(
-            client_id=creds['client_id'],
-            client_secret=creds['client_secret'],
-            user_agent=creds['user_agent'],
-        )
-        # Note: read_only mode – we only read, never post
-        reddit.read_only = True
+        reddit = get_reddit_client(creds)
     except Exception as e:
         return {'ok': False, 'error': f'Failed to authenticate with Reddit API: {str(e)}'}
 
@@ -7,44 +7,312 @@ Modes:
   - DEFAULT: Serves data from SQLite database (auto-synced via scheduler).
   - CSV MODE: When a CSV is uploaded via POST /api/upload-csv, all endpoints
               serve data from the in-memory DataFrame instead.
+              Each upload is a named dataset (registry.py): ?dataset=<id>
+              reads an earlier one without uploading it again.
   - CLEAR:    POST /api/clear-data resets to default SQLite mode.
 
 CSV Required Columns:
     post_id, subreddit, comment, sentiment_label, sentiment_score, created_time
+
+Startup:
+  create_app() builds the Flask app from the `api` blueprint and returns
+  immediately. The SQLite schema is created on the first request and the
+  scheduler starts SCHEDULER_DELAY seconds later on a background thread,
+  so the first health check never waits on either.
+
+    python app.py                          # dev server on :5000
+    flask --app app run                    # Flask finds create_app()
+    gunicorn 'app:create_app()'
+
+Multi-worker mode (RUN_MODE=multi, e.g. gunicorn -w 4):
+  - Exactly one worker runs the scheduler; the others wait for its lease
+    to expire (see leader.py). /api/status answers with the leader's state.
+  - Uploads are written to DATASET_DIR as memory-mapped columns and
+    attached read-only by every worker before its next request, so N
+    workers share one copy of the data (see datasets.py).
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Blueprint, jsonify, request, Response, stream_with_context, g, send_file
 from flask_cors import CORS
 import pandas as pd
-import io
+import numpy as np
 import os
+import json
+import hashlib
+import tempfile
+import threading
+import time
 from datetime import datetime
 
 # Local imports
-from db import init_db, get_all_posts, get_stats
+from db import init_db, get_all_posts, get_stats, get_lease
 import scheduler
-from clean import clean_text
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+import url_analysis
+import timeseries
+import live_stats
+import events
+import metrics
+import scoring
+import profiling
+import leader
+import datasets
+import retention
+import duckdb_engine
+import registry
+import bitmaps
+import result_cache
+import topk
+import sketches
+import sampling
+from scoring import score_text, score_many
 
 # ─── INIT ────────────────────────────────────────────────────────────────────
-app = Flask(__name__)
-CORS(app)
+api = Blueprint('api', __name__)
+
+SCHEDULER_DELAY = float(os.getenv('SCHEDULER_DELAY', 1))
+RUN_MODE        = os.getenv('RUN_MODE', 'single').lower()     # 'single' | 'multi'
+
+engine = None            # APScheduler instance once start_background() ran
+_db_ready = False
+_boot_lock = threading.Lock()
+
+
+def _ensure_db():
+    global _db_ready
+    if not _db_ready:
+        with _boot_lock:
+            if not _db_ready:
+                init_db()
+                _db_ready = True
 
-init_db()
-engine = scheduler.start_scheduler()
-vader = SentimentIntensityAnalyzer()
 
-# ─── GLOBAL IN-MEMORY CSV STORE ──────────────────────────────────────────────
-# When None → all endpoints use the SQLite database.
-# When a DataFrame → all endpoints use this data.
-UPLOADED_DF: pd.DataFrame | None = None
-UPLOAD_META: dict = {}
+def start_background():
+    """Create the schema and start the polling scheduler, once per process."""
+    global engine
+    _ensure_db()
+    with _boot_lock:
+        if engine is None:
+            engine = scheduler.start_scheduler()
+    return engine
+
+
+def stop_background():
+    """Stop the scheduler (multi-worker mode: this worker lost the leader lease)."""
+    global engine
+    with _boot_lock:
+        if engine is not None:
+            engine.shutdown(wait=False)
+            engine = None
+
+
+def create_app(start_scheduler: bool = True) -> Flask:
+    """
+    Build the Flask app. With start_scheduler, the scheduler boots on a
+    background timer after SCHEDULER_DELAY seconds instead of blocking here
+    (RUN_MODE=multi: only once this worker wins the leader lease).
+    """
+    app = Flask(__name__)
+    CORS(app)
+    app.register_blueprint(api)
+    if start_scheduler and RUN_MODE == 'multi':
+        _ensure_db()
+        events.start_relay()
+        leader.start(on_acquire=start_background, on_lose=stop_background, state_fn=_leader_state)
+    elif start_scheduler:
+        timer = threading.Timer(SCHEDULER_DELAY, start_background)
+        timer.daemon = True
+        timer.start()
+    if RUN_MODE != 'multi':
+        _restore_dataset()
+    return app
+
+
+def _leader_state() -> dict:
+    """
+    Published with the scheduler lease (RUN_MODE=multi): the sync state for
+    /api/status and the live-stats payloads, overall and per subreddit,
+    for /api/live-stats on the other workers.
+    """
+    with topk.live.lock:
+        subs = [sub for sub in topk.live.counts if sub is not None]
+    live = {**live_stats.snapshot(), 'top': {sub or '': topk.snapshot(sub) for sub in [None, *subs]}}
+    return {**scheduler.sync_state, 'live': live}
+
+
+# ─── INSTRUMENTATION ─────────────────────────────────────────────────────────
+@api.before_app_request
+def _start_timer():
+    _ensure_db()
+    _refresh_dataset()
+    g.request_started = time.perf_counter()
+    mode = profiling.requested_mode(request.args, request.headers)
+    if mode:
+        g.profile = profiling.start(mode)
+
+
+@api.before_app_request
+def _select_dataset():
+    """?dataset=<id> points this request at a named upload; unknown ids are a 404."""
+    dataset_id = request.args.get('dataset')
+    if not dataset_id:
+        return None
+    if _dataset_meta(dataset_id) is None:
+        return jsonify({'ok': False, 'error': f'Unknown dataset: {dataset_id}'}), 404
+    g.dataset_id = dataset_id
+
+
+@api.after_app_request
+def _record_latency(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    handle = g.pop('profile', None)
+    if handle is not None:
+        response.headers['X-Profile-Id'] = profiling.stop(handle, f'{request.method} {route}')
+    started = g.pop('request_started', None)
+    if started is not None:
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route=route,
+                                             method=request.method, status=response.status_code)
+    return response
+
+
+metrics.register_gauge('score_cache_hits', 'VADER score cache hits since start.',
+                       lambda: scoring.cache_stats['hits'])
+metrics.register_gauge('score_cache_misses', 'VADER score cache misses since start.',
+                       lambda: scoring.cache_stats['misses'])
+metrics.register_gauge('sse_clients', 'Open /api/stream connections.', events.client_count)
+metrics.register_gauge('uploaded_rows', 'Rows in the active uploaded dataset (0 in SQLite mode).',
+                       lambda: UPLOAD_META.get('rows', 0))
+metrics.register_gauge('dataset_resident_bytes', 'Memory held by resident uploaded datasets.',
+                       registry.resident_bytes)
+metrics.register_gauge('dataset_evictions', 'Uploaded datasets evicted to disk since start.',
+                       lambda: registry.stats['evictions'])
+metrics.register_gauge('result_cache_hits', 'Comment/thread listings served from the row-id cache.',
+                       lambda: result_cache.stats['hits'])
+metrics.register_gauge('result_cache_misses', 'Comment/thread listings computed and cached.',
+                       lambda: result_cache.stats['misses'])
+metrics.register_gauge('result_cache_hit_ratio', 'Row-id cache hits / lookups since start.',
+                       result_cache.hit_ratio)
+metrics.register_gauge('result_cache_bytes', 'Memory held by cached listing row ids.',
+                       lambda: result_cache.summary()['bytes'])
+
+# ─── UPLOADED DATASETS ───────────────────────────────────────────────────────
+# Uploads are named datasets held by registry.py (or by the DuckDB engine).
+# ACTIVE_DATASET is the id endpoints read when a request has no ?dataset=;
+# None → all endpoints use the SQLite database.
+# RUN_MODE=multi: every worker follows the active id in datasets.py's
+# pointer file. Frames are zero-copy views over the shared mmap with
+# free-text columns kept apart (read them via datasets.text_values).
+ACTIVE_DATASET: str | None = None
+UPLOAD_META: dict = {}                   # meta of the active dataset
 
 REQUIRED_COLUMNS = {'post_id', 'subreddit', 'comment', 'sentiment_label', 'sentiment_score', 'created_time'}
+UPLOAD_CHUNK = 1 << 20                   # bytes per read while hashing an upload
+SCORE_BINS = [-1.0, -0.8, -0.6, -0.4, -0.2, 0.0, 0.2, 0.4, 0.6, 0.8, 1.0]   # /api/sentiment histogram
+
+EMOTION_LEXICON = {
+    'Joy':      ['love', 'great', 'amazing', 'awesome', 'happy', 'excellent', 'wonderful', 'fantastic', 'good', 'enjoy', 'best', 'brilliant', 'delightful', 'superb'],
+    'Anger':    ['hate', 'angry', 'furious', 'outraged', 'terrible', 'horrible', 'disgusting', 'awful', 'worst', 'ridiculous', 'pathetic', 'useless', 'idiotic'],
+    'Fear':     ['scared', 'afraid', 'worried', 'anxious', 'terrified', 'nervous', 'panic', 'dread', 'horror', 'frightened', 'concerned', 'dangerous'],
+    'Sadness':  ['sad', 'depressed', 'miserable', 'unhappy', 'disappointed', 'heartbroken', 'tragic', 'grief', 'sorry', 'regret', 'unfortunate', 'crying'],
+    'Surprise': ['wow', 'shocking', 'unbelievable', 'unexpected', 'amazing', 'incredible', 'surprising', 'astonishing', 'mind-blowing', 'never expected'],
+    'Neutral':  []
+}
+
+def _dataset_id() -> str | None:
+    """The dataset this request reads: ?dataset=<id>, else the active upload."""
+    return g.get('dataset_id') or ACTIVE_DATASET
 
 def get_df() -> pd.DataFrame | None:
-    """Returns the active DataFrame (uploaded CSV or None for SQLite fallback)."""
-    return UPLOADED_DF
+    """Returns the request's DataFrame (uploaded CSV or None for SQLite fallback)."""
+    return get_dataset()[0]
+
+def get_dataset() -> tuple:
+    """(frame, text) of the request's dataset; text is None unless the frame is memory-mapped."""
+    return registry.get(_dataset_id()) or (None, None)
+
+def _bitmap_index() -> bitmaps.BitmapIndex | None:
+    """The request dataset's filter index (bitmaps.py), built on first use."""
+    return registry.derived(_dataset_id(), 'bitmaps', bitmaps.BitmapIndex)
+
+def _listing_rows(df: pd.DataFrame, text: dict | None, search: str = '', start: int | None = None,
+                  end: int | None = None, sentiment: str | None = None, subreddit: str | None = None,
+                  sort_col: str = 'sentiment_score', descending: bool = True) -> np.ndarray:
+    """
+    Row ids of a comments/threads listing, filtered and sorted. Cached in
+    result_cache.py by dataset id and parameters; the unfiltered listing
+    is the index's own sort order.
+    """
+    index = _bitmap_index()
+    order = index.order(sort_col, descending)
+    if not (search or sentiment or subreddit or start is not None or end is not None):
+        return order
+    key = (_dataset_id(), search, start, end, sentiment, subreddit, sort_col, descending)
+    rows = result_cache.get(key)
+    if rows is None:
+        selected = index.select(start, end, sentiment_label=sentiment, subreddit=subreddit)
+        if search:
+            selected = selected & bitmaps.pack(datasets.text_contains(df, text, 'comment', search))
+        rows = index.ordered(selected, order)
+        result_cache.put(key, rows)
+    return rows
+
+def _top_k(df: pd.DataFrame) -> topk.TopK:
+    """The dataset's top-K tracker (topk.py); built for this call if the frame is not a registry one."""
+    dataset_id = registry.frame_id(df)
+    if dataset_id is None:
+        return topk.TopK.from_frame(df)
+    return registry.derived(dataset_id, 'topk', topk.TopK.from_frame)
+
+def _sample() -> sampling.StratifiedSample | None:
+    """
+    The request dataset's stratified sample (sampling.py) when ?approx=true
+    asks for estimates, else None. Pandas engine only.
+    """
+    if request.args.get('approx', '').lower() not in ('1', 'true', 'yes') or _dataset_id() is None:
+        return None
+    return registry.derived(_dataset_id(), 'sample', sampling.StratifiedSample)
+
+def _sql():
+    """A DuckDB engine view when QUERY_ENGINE=duckdb holds the request's dataset, else None (pandas path)."""
+    engine = duckdb_engine.engine
+    return engine.bind(_dataset_id()) if engine is not None else None
+
+def csv_loaded() -> bool:
+    return ACTIVE_DATASET is not None
+
+def _dataset_meta(dataset_id: str) -> dict | None:
+    """Upload meta of a named dataset in either engine, or None if the id is unknown."""
+    engine = duckdb_engine.engine
+    if engine is not None and dataset_id in engine.tables:
+        return engine.meta(dataset_id)
+    return registry.meta(dataset_id) if registry.exists(dataset_id) else None
+
+def _activate(dataset_id: str | None, meta: dict | None = None):
+    """
+    Make a dataset the active one (None → SQLite). The choice is written
+    to datasets.py's pointer file: other workers follow it, and the next
+    process restores it at startup.
+    """
+    global ACTIVE_DATASET, UPLOAD_META
+    ACTIVE_DATASET, UPLOAD_META = dataset_id, meta or {}
+    datasets.activate(dataset_id, UPLOAD_META)
+
+def _restore_dataset():
+    """Single process: re-activate the dataset that was active when the last process stopped."""
+    global ACTIVE_DATASET, UPLOAD_META
+    pointer = datasets.read_pointer()
+    version = pointer.get('version')
+    if version and registry.exists(version):
+        ACTIVE_DATASET, UPLOAD_META = version, pointer.get('meta') or registry.meta(version)
+        print(f"[app.py] Restored dataset {version} ({UPLOAD_META.get('filename')})")
+
+def _refresh_dataset():
+    """RUN_MODE=multi: follow an upload, activation or clear from another worker."""
+    global ACTIVE_DATASET, UPLOAD_META
+    if RUN_MODE != 'multi':
+        return
+    pointer = datasets.read_pointer()
+    if pointer.get('version') != ACTIVE_DATASET:
+        ACTIVE_DATASET, UPLOAD_META = pointer.get('version'), pointer.get('meta') or {}
 
 def empty_zero_response():
     """Standard zero-state response when no data is available."""
@@ -52,14 +320,14 @@ def empty_zero_response():
 
 # ─── UPLOAD / CLEAR ENDPOINTS ────────────────────────────────────────────────
 
-@app.route('/api/upload-csv', methods=['POST'])
+@api.route('/api/upload-csv', methods=['POST'])
 def upload_csv():
     """
-    Accepts a multipart CSV file upload and stores it in memory.
-    All dashboard endpoints will now serve data from this CSV.
+    Accepts a multipart CSV file upload and stores it in memory as a new
+    named dataset. It becomes the active one, so all dashboard endpoints
+    now serve data from this CSV. The upload is hashed as it streams in:
+    a file seen before reuses its dataset instead of being parsed again.
     """
-    global UPLOADED_DF, UPLOAD_META
-
     if 'file' not in request.files:
         return jsonify({'ok': False, 'error': 'No file part in the request.'}), 400
 
@@ -67,14 +335,22 @@ def upload_csv():
     if file.filename == '':
         return jsonify({'ok': False, 'error': 'No file selected.'}), 400
 
+    engine = duckdb_engine.get_engine(RUN_MODE)
+    if engine is not None:
+        return _upload_to_engine(engine, file)
+
     if not file.filename.lower().endswith('.csv'):
         return jsonify({'ok': False, 'error': 'Only CSV files are supported.'}), 400
 
-    try:
-        content = file.read().decode('utf-8')
-        df = pd.read_csv(io.StringIO(content))
-    except Exception as e:
-        return jsonify({'ok': False, 'error': f'Failed to parse CSV: {str(e)}'}), 400
+    content_hash, source = _hashed_upload(file)
+    with source:
+        seen = registry.find(content_hash)
+        if seen:
+            return _reuse_dataset(seen)
+        try:
+            df = pd.read_csv(source, encoding='utf-8')
+        except Exception as e:
+            return jsonify({'ok': False, 'error': f'Failed to parse CSV: {str(e)}'}), 400
 
     # Normalize column names
     df.columns = [c.strip().lower() for c in df.columns]
@@ -91,15 +367,29 @@ def upload_csv():
     # Coerce types
     df['sentiment_score'] = pd.to_numeric(df['sentiment_score'], errors='coerce').fillna(0.0)
     df['created_time'] = df['created_time'].astype(str)
+    columns = list(df.columns)
+    # Parse timestamps once here so /api/trends never re-parses strings
+    timeseries.ensure_epochs(df)
 
-    UPLOADED_DF = df
-    UPLOAD_META = {
+    dataset_id = registry.new_id()
+    meta = {
         'filename': file.filename,
         'rows': len(df),
-        'columns': list(df.columns),
+        'columns': columns,
         'uploaded_at': datetime.now().isoformat(),
-        'subreddits': df['subreddit'].nunique()
+        'subreddits': int(df['subreddit'].nunique()),
+        'dataset_id': dataset_id,
+        'content_hash': content_hash,
     }
+    if RUN_MODE == 'multi':
+        # Workers (this one included) attach the saved copy, so nobody keeps a private one
+        datasets.save(df, meta, dataset_id)
+    else:
+        registry.add(df, meta, dataset_id)
+    _activate(dataset_id, meta)
+    registry.persist(dataset_id, AGGREGATES, DERIVED)
+
+    events.publish('dataset', {'action': 'upload', 'csv_loaded': True, 'meta': UPLOAD_META})
 
     return jsonify({
         'ok': True,
@@ -108,65 +398,290 @@ def upload_csv():
     })
 
 
-@app.route('/api/clear-data', methods=['POST'])
+def _upload_to_engine(engine, file):
+    """QUERY_ENGINE=duckdb: stream the upload to disk and load it into DuckDB (no DataFrame)."""
+    if not file.filename.lower().endswith(('.csv', '.parquet')):
+        return jsonify({'ok': False, 'error': 'Only CSV or Parquet files are supported.'}), 400
+    path = engine.upload_path(file.filename)
+    with open(path, 'wb') as f:
+        content_hash = _copy_hashed(file.stream, f)
+    seen = engine.find(content_hash)
+    if seen:
+        os.remove(path)
+        return _reuse_dataset(seen)
+
+    dataset_id = registry.new_id()
+    try:
+        result = engine.register_file(path, REQUIRED_COLUMNS, dataset_id, {
+            'filename': file.filename,
+            'uploaded_at': datetime.now().isoformat(),
+            'engine': 'duckdb',
+            'content_hash': content_hash,
+        })
+    finally:
+        os.remove(path)        # the table holds its own copy
+    if not result['ok']:
+        result.pop('ok')
+        return jsonify({'ok': False, **result}), 422 if 'required_columns' in result else 400
+
+    _activate(dataset_id, result['meta'])
+    events.publish('dataset', {'action': 'upload', 'csv_loaded': True, 'meta': UPLOAD_META})
+    return jsonify({
+        'ok': True,
+        'message': f"Successfully loaded {UPLOAD_META['rows']} rows from {file.filename}.",
+        'meta': UPLOAD_META
+    })
+
+
+def _copy_hashed(stream, sink) -> str:
+    """Copy an upload stream into `sink` chunk by chunk, hashing as it goes. Returns the SHA-256 hex digest."""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(UPLOAD_CHUNK), b''):
+        digest.update(chunk)
+        sink.write(chunk)
+    return digest.hexdigest()
+
+
+def _hashed_upload(file) -> tuple:
+    """
+    (SHA-256 hex digest, stream rewound to the start) of an uploaded file,
+    without holding a second copy of it. Werkzeug has already spooled the
+    multipart body (to disk past 500 KB), so that is hashed in place; a
+    stream that cannot seek is spooled to a temporary file first.
+    """
+    stream = file.stream
+    if not (hasattr(stream, 'seekable') and stream.seekable()):
+        spool = tempfile.TemporaryFile()
+        content_hash = _copy_hashed(stream, spool)
+        spool.seek(0)
+        return content_hash, spool
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(UPLOAD_CHUNK), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest(), stream
+
+
+def _reuse_dataset(dataset_id: str):
+    """Activate the dataset an identical earlier upload produced; nothing is parsed."""
+    meta = _dataset_meta(dataset_id) or {}
+    _activate(dataset_id, meta)
+    events.publish('dataset', {'action': 'upload', 'csv_loaded': True, 'meta': UPLOAD_META})
+    return jsonify({
+        'ok': True,
+        'deduplicated': True,
+        'message': f"Already uploaded as {meta.get('filename')}; reusing its {meta.get('rows', 0)} rows.",
+        'meta': UPLOAD_META
+    })
+
+
+@api.route('/api/clear-data', methods=['POST'])
 def clear_data():
-    """Clears the uploaded CSV and reverts all endpoints to SQLite fallback."""
-    global UPLOADED_DF, UPLOAD_META
-    UPLOADED_DF = None
-    UPLOAD_META = {}
+    """
+    Reverts all endpoints to SQLite fallback. Uploaded datasets stay
+    available by id; dataset=<id> (query or JSON body) deletes that one.
+    """
+    dataset_id = request.args.get('dataset') or (request.get_json(silent=True) or {}).get('dataset')
+    if dataset_id:
+        engine = duckdb_engine.engine
+        dropped = engine is not None and engine.drop(dataset_id)
+        if not (registry.remove(dataset_id) or dropped):
+            return jsonify({'ok': False, 'error': f'Unknown dataset: {dataset_id}'}), 404
+        result_cache.invalidate(dataset_id)
+        if dataset_id != ACTIVE_DATASET:
+            events.publish('dataset', {'action': 'delete', 'dataset_id': dataset_id,
+                                       'csv_loaded': csv_loaded(), 'meta': UPLOAD_META})
+            return jsonify({'ok': True, 'message': f'Dataset {dataset_id} deleted.'})
+
+    _activate(None)
+    events.publish('dataset', {'action': 'clear', 'csv_loaded': False, 'meta': {}})
     return jsonify({'ok': True, 'message': 'Data cleared. Dashboard reset to default state.'})
 
 
-@app.route('/api/upload-status', methods=['GET'])
+@api.route('/api/datasets/<dataset_id>/activate', methods=['POST'])
+def activate_dataset(dataset_id):
+    """Makes an earlier upload the active dataset again (no re-upload)."""
+    meta = _dataset_meta(dataset_id)
+    if meta is None:
+        return jsonify({'ok': False, 'error': f'Unknown dataset: {dataset_id}'}), 404
+    _activate(dataset_id, meta)
+    events.publish('dataset', {'action': 'activate', 'csv_loaded': True, 'meta': UPLOAD_META})
+    return jsonify({'ok': True, 'meta': UPLOAD_META})
+
+
+@api.route('/api/upload-status', methods=['GET'])
 def upload_status():
-    """Returns the current upload state (is CSV loaded, file info, etc.)."""
-    if UPLOADED_DF is not None:
-        return jsonify({'csv_loaded': True, 'meta': UPLOAD_META})
-    return jsonify({'csv_loaded': False, 'meta': {}})
+    """
+    Returns the current upload state (is CSV loaded, file info, etc.) plus
+    every named dataset with its resident memory and the memory budget,
+    and the listing row-id cache (result_cache.py) with its hit ratio.
+    """
+    engine = duckdb_engine.engine
+    listed = registry.listing() + (engine.describe() if engine is not None else [])
+    for entry in listed:
+        entry['active'] = entry['id'] == ACTIVE_DATASET
+    return jsonify({
+        'csv_loaded': csv_loaded(),
+        'meta': UPLOAD_META if csv_loaded() else {},
+        'active_dataset': ACTIVE_DATASET,
+        'datasets': listed,
+        'memory': registry.memory(),
+        'result_cache': result_cache.summary(),
+    })
 
 
 # ─── HEALTH / STATUS ─────────────────────────────────────────────────────────
 
-@app.route('/health', methods=['GET'])
+@api.route('/health', methods=['GET'])
 def health():
-    mode = 'csv' if UPLOADED_DF is not None else 'sqlite'
+    mode = 'csv' if csv_loaded() else 'sqlite'
     return jsonify({'status': 'ok', 'data_mode': mode, 'message': f'Reddit Alytics API running in {mode.upper()} mode.'})
 
 
-@app.route('/api/status', methods=['GET'])
+@api.route('/metrics', methods=['GET'])
+def metrics_view():
+    """Prometheus text exposition of request, scheduler, analysis and DB timings."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@api.route('/api/profiles', methods=['GET'])
+def profiles_list():
+    """Saved request / scheduler profiles, newest first (requires PROFILING_ENABLED=1)."""
+    if not profiling.ENABLED:
+        return jsonify({'ok': False, 'error': 'Profiling is disabled. Set PROFILING_ENABLED=1.'}), 403
+    return jsonify({'ok': True, 'profiles': profiling.list_profiles(),
+                    'scheduler': dict(profiling.scheduler_requests)})
+
+
+@api.route('/api/profiles/<name>', methods=['GET'])
+def profiles_get(name):
+    """Download a profile; ?format=text renders a .pstats file as a top-40 table."""
+    if not profiling.ENABLED:
+        return jsonify({'ok': False, 'error': 'Profiling is disabled. Set PROFILING_ENABLED=1.'}), 403
+    path = profiling.profile_path(name)
+    if path is None:
+        return jsonify({'ok': False, 'error': f'Unknown profile: {name}'}), 404
+    if request.args.get('format') == 'text' and name.endswith('.pstats'):
+        return Response(profiling.pstats_text(path), mimetype='text/plain')
+    return send_file(path, as_attachment=True, download_name=name)
+
+
+@api.route('/api/profiles/scheduler', methods=['POST'])
+def profiles_scheduler():
+    """Arm profiling for the next N scheduler cycles: {"cycles": N, "mode": "cprofile"|"sample"}."""
+    if not profiling.ENABLED:
+        return jsonify({'ok': False, 'error': 'Profiling is disabled. Set PROFILING_ENABLED=1.'}), 403
+    data = request.get_json(force=True, silent=True) or {}
+    try:
+        cycles = int(data.get('cycles', 1))
+    except (TypeError, ValueError):
+        return jsonify({'ok': False, 'error': 'cycles must be an integer'}), 400
+    profiling.profile_next_cycles(cycles, data.get('mode', 'cprofile'))
+    return jsonify({'ok': True, 'scheduler': dict(profiling.scheduler_requests)})
+
+
+@api.route('/api/status', methods=['GET'])
 def status():
     stats = get_stats()
+    sync = scheduler.sync_state
+    worker = {'pid': os.getpid(), 'run_mode': RUN_MODE, 'leader': RUN_MODE != 'multi' or leader.is_leader()}
+    if not worker['leader']:
+        # Another worker runs the scheduler; report the state it publishes with its lease
+        lease = get_lease(leader.LEASE_NAME)
+        sync = (lease or {}).get('state') or sync
     return jsonify({
         'status': 'ok',
         'total_rows': stats['total_posts'],
-        'last_update': scheduler.sync_state['last_update'],
-        'sync_mode': scheduler.sync_state['mode'],
-        'sync_interval_seconds': scheduler.sync_state['interval_seconds'],
-        'cycle_count': scheduler.sync_state['cycle_count'],
-        'posts_last_cycle': scheduler.sync_state.get('posts_inserted', 0),
-        'error': scheduler.sync_state['error'],
-        'csv_loaded': UPLOADED_DF is not None
+        'last_update': sync['last_update'],
+        'sync_mode': sync['mode'],
+        'sync_interval_seconds': sync['interval_seconds'],
+        'cycle_count': sync['cycle_count'],
+        'posts_last_cycle': sync.get('posts_inserted', 0),
+        'error': sync['error'],
+        'csv_loaded': csv_loaded(),
+        'worker': worker,
     })
 
 
+@api.route('/api/retention', methods=['GET'])
+def retention_status():
+    """Retention config, last run, table row counts and database size."""
+    return jsonify(retention.status())
+
+
+@api.route('/api/history', methods=['GET'])
+def history():
+    """
+    Long-range sentiment from reddit.db, continuous across the retention
+    boundary. Query params: granularity=hour|day (default day), days, subreddit.
+    """
+    granularity = request.args.get('granularity', 'day')
+    try:
+        days = float(request.args.get('days', 30 if granularity == 'day' else 2))
+        rows = retention.history(granularity, days, request.args.get('subreddit') or None)
+    except ValueError as e:
+        return jsonify({'ok': False, 'error': str(e)}), 400
+    return jsonify({'granularity': granularity, 'history': rows})
+
+
+@api.route('/api/live-stats', methods=['GET'])
+def live_stats_view():
+    """
+    Rolling 1m / 15m / 1h ingestion aggregates (counts, mean sentiment, subreddit
+    velocity), plus the most extreme posts inserted since startup (optional subreddit=).
+    RUN_MODE=multi: workers that don't run the scheduler answer with what the
+    leader last published with its lease (at most LEADER_LEASE_TTL / 3 old).
+    """
+    subreddit = request.args.get('subreddit') or None
+    if RUN_MODE == 'multi' and not leader.is_leader():
+        live = ((get_lease(leader.LEASE_NAME) or {}).get('state') or {}).get('live')
+        if live:
+            return jsonify({**live, 'top': live['top'].get(subreddit or '') or topk.snapshot(subreddit)})
+    return jsonify({**live_stats.snapshot(), 'top': topk.snapshot(subreddit)})
+
+
+@api.route('/api/stream', methods=['GET'])
+def stream():
+    """
+    Server-Sent Events channel. Emits 'cycle' after every scheduler cycle
+    and 'dataset' when a CSV is uploaded or cleared. In RUN_MODE=multi the
+    events of every worker are relayed here (events.py), whichever worker
+    this client is connected to.
+    """
+    return Response(
+        stream_with_context(events.broadcaster.stream(first='retry: 5000\n\n')),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
 # ─── DASHBOARD ENDPOINTS ─────────────────────────────────────────────────────
 
-@app.route('/api/overview', methods=['GET'])
+@api.route('/api/overview', methods=['GET'])
 def overview():
-    df = get_df()
+    """KPIs of the dataset; in SQLite mode also distinct-count sketches of the live stream."""
+    if _sql():
+        return jsonify(_sql().overview())
+    if _sample():
+        return jsonify(sampling.overview(_sample()))
+    if _dataset_id() is None:
+        return jsonify({**_aggregate('overview'), 'sketches': sketches.distinct_summary()})
+    return jsonify(_aggregate('overview'))
 
+
+def overview_payload(df: pd.DataFrame | None, text: dict | None = None) -> dict:
     if df is None:
-        return jsonify({
+        return {
             'total_comments': 0, 'total_subreddits': 0,
             'avg_sentiment_score': 0,
             'sentiment_counts': {'Positive': 0, 'Neutral': 0, 'Negative': 0},
             'most_active_subreddit': 'N/A',
             'most_positive_subreddit': 'N/A',
             'most_negative_subreddit': 'N/A'
-        })
+        }
 
     counts = df['sentiment_label'].value_counts().to_dict()
-    return jsonify({
+    return {
         'total_comments': len(df),
         'total_subreddits': int(df['subreddit'].nunique()),
         'avg_sentiment_score': round(float(df['sentiment_score'].mean()), 4),
@@ -176,33 +691,49 @@ def overview():
             'Negative': int(counts.get('Negative', 0))
         },
         'most_active_subreddit': str(df['subreddit'].value_counts().idxmax()) if not df.empty else 'N/A'
-    })
+    }
 
 
-@app.route('/api/sentiment', methods=['GET'])
+@api.route('/api/sentiment', methods=['GET'])
 def sentiment():
-    df = get_df()
-
+    """
+    Sentiment distribution; in SQLite mode also t-digest quantiles of the
+    live stream (quantiles=0.5,0.9,... to pick them).
+    """
+    if _sql():
+        return jsonify(_sql().sentiment(SCORE_BINS))
+    if _sample():
+        return jsonify(sampling.sentiment(_sample(), SCORE_BINS))
+    if _dataset_id() is None:
+        try:
+            quantiles = sketches.parse_quantiles(request.args.get('quantiles'))
+        except ValueError as e:
+            return jsonify({'ok': False, 'error': str(e)}), 400
+        return jsonify({**_aggregate('sentiment'), 'sketches': sketches.quantile_summary(quantiles)})
+    return jsonify(_aggregate('sentiment'))
+
+
+def sentiment_payload(df: pd.DataFrame | None, text: dict | None = None) -> dict:
     if df is None:
-        return jsonify({'total': 0, 'counts': {'Positive': 0, 'Neutral': 0, 'Negative': 0},
-                        'percentages': {'Positive': 0, 'Neutral': 0, 'Negative': 0}, 'avg_score': 0,
-                        'distribution': []})
+        return {'total': 0, 'counts': {'Positive': 0, 'Neutral': 0, 'Negative': 0},
+                'percentages': {'Positive': 0, 'Neutral': 0, 'Negative': 0}, 'avg_score': 0,
+                'distribution': []}
 
     total = len(df)
     if total == 0:
-        return jsonify({'total': 0, 'counts': {'Positive': 0, 'Neutral': 0, 'Negative': 0},
-                        'percentages': {'Positive': 0, 'Neutral': 0, 'Negative': 0}, 'avg_score': 0,
-                        'distribution': []})
+        return {'total': 0, 'counts': {'Positive': 0, 'Neutral': 0, 'Negative': 0},
+                'percentages': {'Positive': 0, 'Neutral': 0, 'Negative': 0}, 'avg_score': 0,
+                'distribution': []}
 
     counts = df['sentiment_label'].value_counts().to_dict()
 
     # Score distribution histogram (10 buckets from -1.0 to 1.0)
-    bins = [-1.0, -0.8, -0.6, -0.4, -0.2, 0.0, 0.2, 0.4, 0.6, 0.8, 1.0]
+    bins = SCORE_BINS
     labels = [f'{bins[i]:.1f} to {bins[i+1]:.1f}' for i in range(len(bins)-1)]
     hist = pd.cut(df['sentiment_score'], bins=bins, labels=labels).value_counts().sort_index()
     distribution = [{'range': str(r), 'count': int(c)} for r, c in hist.items()]
 
-    return jsonify({
+    return {
         'total': total,
         'counts': {
             'Positive': int(counts.get('Positive', 0)),
@@ -216,15 +747,21 @@ def sentiment():
         },
         'avg_score': round(float(df['sentiment_score'].mean()), 4),
         'distribution': distribution
-    })
+    }
 
 
-@app.route('/api/subreddits', methods=['GET'])
+@api.route('/api/subreddits', methods=['GET'])
 def subreddits():
-    df = get_df()
+    if _sql():
+        return jsonify(_sql().subreddits())
+    if _sample():
+        return jsonify(sampling.subreddits(_sample()))
+    return jsonify(_aggregate('subreddits'))
+
 
+def subreddits_payload(df: pd.DataFrame | None, text: dict | None = None) -> dict:
     if df is None:
-        return jsonify({'subreddits': []})
+        return {'subreddits': []}
 
     result = []
     total_all = len(df)
@@ -246,12 +783,12 @@ def subreddits():
             'negative_pct': round(neg / t * 100, 1) if t else 0,
             'avg_score': round(float(sub_df['sentiment_score'].mean()), 4)
         })
-    return jsonify({'subreddits': result})
+    return {'subreddits': result}
 
 
-@app.route('/api/comments', methods=['GET'])
+@api.route('/api/comments', methods=['GET'])
 def comments():
-    df = get_df()
+    df, text = get_dataset()
 
     page     = int(request.args.get('page', 1))
     per_page = int(request.args.get('per_page', 8))
@@ -260,50 +797,52 @@ def comments():
     sub_f    = request.args.get('subreddit', '')
     sort_by  = request.args.get('sort_by', 'score')
     sort_dir = request.args.get('sort_dir', 'desc')
-
+    try:
+        start_ts = timeseries.parse_bound(request.args.get('start_date'))
+        end_ts   = timeseries.parse_bound(request.args.get('end_date'), end=True)
+    except ValueError as e:
+        return jsonify({'ok': False, 'error': str(e)}), 400
+
+    if _sql():
+        return jsonify(_sql().comments(page, per_page, search, sentiment_f, sub_f, sort_by, sort_dir,
+                                       start_ts, end_ts))
     if df is None:
         return jsonify({'total': 0, 'page': page, 'per_page': per_page, 'total_pages': 1, 'comments': [],
                         'counts': {'Positive': 0, 'Neutral': 0, 'Negative': 0, 'total': 0}})
-    else:
-        # Normalize for CSV mode
-        df = df.copy()
-        if 'comment' in df.columns and 'sentiment_label' in df.columns:
-            pass  # columns already correct
-
-    # Build filtered rows
-    fdf = df.copy()
-    if search:
-        mask = fdf['comment'].str.lower().str.contains(search, na=False)
-        fdf = fdf[mask]
-    if sentiment_f:
-        fdf = fdf[fdf['sentiment_label'] == sentiment_f]
-    if sub_f and sub_f != 'All':
-        fdf = fdf[fdf['subreddit'] == sub_f]
-
-    # Sort
-    sort_col = 'sentiment_score' if sort_by == 'score' else ('upvotes' if 'upvotes' in fdf.columns else 'sentiment_score')
-    if sort_col in fdf.columns:
-        fdf = fdf.sort_values(sort_col, ascending=(sort_dir == 'asc'))
-
-    total = len(fdf)
+
+    sort_col = 'sentiment_score' if sort_by == 'score' else ('upvotes' if 'upvotes' in df.columns else 'sentiment_score')
+    rows = _listing_rows(df, text, search, start_ts, end_ts, sentiment_f or None,
+                         sub_f if sub_f and sub_f != 'All' else None, sort_col, sort_dir != 'asc')
+
+    total = len(rows)
     total_pages = max(1, (total + per_page - 1) // per_page)
     start = (page - 1) * per_page
-    paginated = fdf.iloc[start:start + per_page]
-
-    all_counts = df['sentiment_label'].value_counts().to_dict()
-
-    comment_list = []
-    for _, row in paginated.iterrows():
-        comment_list.append({
-            'post_id':      str(row.get('post_id', '')),
-            'comment':      str(row.get('comment', '')),
-            'sentiment':    str(row.get('sentiment_label', '')),
-            'score':        float(row.get('sentiment_score', 0)),
-            'subreddit':    str(row.get('subreddit', '')),
-            'author':       str(row.get('author', 'unknown')),
-            'upvotes':      int(row.get('upvotes', 0)),
-            'created_time': str(row.get('created_time', ''))
-        })
+    paginated = df.iloc[rows[start:start + per_page]]
+
+    all_counts = _bitmap_index().label_counts
+
+    comment_list = [
+        {
+            'post_id':      post_id,
+            'comment':      comment,
+            'sentiment':    label,
+            'score':        float(score),
+            'subreddit':    sub,
+            'author':       author,
+            'upvotes':      int(upvotes),
+            'created_time': created,
+        }
+        for post_id, comment, label, score, sub, author, upvotes, created in zip(
+            datasets.text_values(paginated, text, 'post_id'),
+            datasets.text_values(paginated, text, 'comment'),
+            paginated['sentiment_label'].astype(str),
+            paginated['sentiment_score'],
+            paginated['subreddit'].astype(str),
+            datasets.text_values(paginated, text, 'author', 'unknown'),
+            paginated['upvotes'].fillna(0) if 'upvotes' in paginated.columns else [0] * len(paginated),
+            datasets.text_values(paginated, text, 'created_time'),
+        )
+    ]
 
     return jsonify({
         'total': total,
@@ -320,66 +859,64 @@ def comments():
     })
 
 
-@app.route('/api/trends', methods=['GET'])
+@api.route('/api/trends', methods=['GET'])
 def trends():
+    """
+    Sentiment over time.
+    Query params: granularity=hour|day|week (default day), start_date, end_date,
+    by_subreddit=true for an extra per-subreddit breakdown,
+    approx=true for estimates from the dataset's stratified sample (sampling.py).
+    """
     df = get_df()
+    sql = _sql()
 
-    if df is None:
-        return jsonify({'trends': []})
-
-    if df.empty:
+    if sql is None and (df is None or df.empty):
         return jsonify({'trends': []})
 
-    df = df.copy()
+    granularity  = request.args.get('granularity', 'day')
+    by_subreddit = request.args.get('by_subreddit', '').lower() in ('1', 'true', 'yes')
     try:
-        df['date'] = pd.to_datetime(df['created_time'], errors='coerce').dt.strftime('%Y-%m-%d')
-    except Exception:
-        df['date'] = df['created_time'].astype(str).str[:10]
-
-    df = df.dropna(subset=['date'])
-    grouped = df.groupby('date')
-
-    trend_rows = []
-    for date, group in sorted(grouped, key=lambda x: x[0]):
-        counts = group['sentiment_label'].value_counts()
-        trend_rows.append({
-            'date':      date,
-            'avg_score': round(float(group['sentiment_score'].mean()), 4),
-            'positive':  int(counts.get('Positive', 0)),
-            'neutral':   int(counts.get('Neutral', 0)),
-            'negative':  int(counts.get('Negative', 0)),
-            'total':     len(group)
-        })
-    return jsonify({'trends': trend_rows})
-
-
-@app.route('/api/emotions', methods=['GET'])
+        start = timeseries.parse_bound(request.args.get('start_date'))
+        end   = timeseries.parse_bound(request.args.get('end_date'), end=True)
+        if sql is not None:
+            width = timeseries.granularity_width(granularity)
+            return jsonify(sql.trends(granularity, width, start, end, by_subreddit, timeseries.bucket_rows))
+        if _sample():
+            return jsonify(sampling.trends(_sample(), granularity, start, end, by_subreddit))
+        return jsonify(timeseries.trend_rows(df, granularity, start, end, by_subreddit))
+    except ValueError as e:
+        return jsonify({'ok': False, 'error': str(e)}), 400
+
+
+@api.route('/api/emotions', methods=['GET'])
 def emotions():
-    df = get_df()
+    if _sql():
+        return jsonify(_sql().emotions(EMOTION_LEXICON))
+    return jsonify(_aggregate('emotions'))
+
 
+def emotions_payload(df: pd.DataFrame | None, text: dict | None = None) -> dict:
     if df is None:
-        return jsonify({'radar': [], 'heatmap': {}, 'outliers': []})
+        return {'radar': [], 'heatmap': {}, 'outliers': []}
 
     if df.empty:
-        return jsonify({'radar': [], 'heatmap': {}, 'outliers': []})
-
-    EMOTION_LEXICON = {
-        'Joy':      ['love', 'great', 'amazing', 'awesome', 'happy', 'excellent', 'wonderful', 'fantastic', 'good', 'enjoy', 'best', 'brilliant', 'delightful', 'superb'],
-        'Anger':    ['hate', 'angry', 'furious', 'outraged', 'terrible', 'horrible', 'disgusting', 'awful', 'worst', 'ridiculous', 'pathetic', 'useless', 'idiotic'],
-        'Fear':     ['scared', 'afraid', 'worried', 'anxious', 'terrified', 'nervous', 'panic', 'dread', 'horror', 'frightened', 'concerned', 'dangerous'],
-        'Sadness':  ['sad', 'depressed', 'miserable', 'unhappy', 'disappointed', 'heartbroken', 'tragic', 'grief', 'sorry', 'regret', 'unfortunate', 'crying'],
-        'Surprise': ['wow', 'shocking', 'unbelievable', 'unexpected', 'amazing', 'incredible', 'surprising', 'astonishing', 'mind-blowing', 'never expected'],
-        'Neutral':  []
-    }
+        return {'radar': [], 'heatmap': {}, 'outliers': []}
 
-    def detect_emotion(text: str) -> str:
-        text_lower = str(text).lower()
-        scores = {e: sum(1 for w in words if w in text_lower) for e, words in EMOTION_LEXICON.items() if words}
-        return max(scores, key=scores.get) if any(scores.values()) else 'Neutral'
 
-    text_col = 'comment' if 'comment' in df.columns else 'title'
-    df = df.copy()
-    df['emotion'] = df[text_col].apply(detect_emotion)
+    top = _top_k(df)
+
+    # Score every row at once: one substring mask per lexicon word, summed per emotion.
+    # argmax picks the first emotion on ties, like max() over the dict did.
+    text_col = 'comment'
+    scored = [e for e, words in EMOTION_LEXICON.items() if words]
+    search = datasets.text_searcher(df, text, text_col)
+    word_hits = {w: search(w) for w in {w for e in scored for w in EMOTION_LEXICON[e]}}
+    scores = np.column_stack([
+        np.sum([word_hits[w] for w in EMOTION_LEXICON[e]], axis=0) for e in scored
+    ])
+    labels = np.array(scored + ['Neutral'], dtype=object)
+    best = np.where(scores.any(axis=1), scores.argmax(axis=1), len(scored))
+    df = df.assign(emotion=labels[best])
 
     # Radar data
     emotion_counts = df['emotion'].value_counts()
@@ -394,21 +931,34 @@ def emotions():
         sub_counts = sub_df['emotion'].value_counts()
         heatmap[str(sub)] = {e: round(sub_counts.get(e, 0) / sub_total, 3) for e in EMOTION_LEXICON}
 
-    # Outliers — top 8 extreme sentiment
+    # Outliers — top 8 extreme sentiment, off the top-K heaps (nlargest/nsmallest when they can't answer)
     score_col = 'sentiment_score'
-    outliers_df = df.nlargest(4, score_col)._append(df.nsmallest(4, score_col))
-    outliers = []
-    for _, row in outliers_df.iterrows():
-        outliers.append({
-            'comment':      str(row.get(text_col, '')),
-            'sentiment':    str(row.get('sentiment_label', '')),
-            'score':        float(row.get(score_col, 0)),
-            'author':       str(row.get('author', 'unknown')),
-            'subreddit':    str(row.get('subreddit', '')),
-            'created_time': str(row.get('created_time', '')),
-            'emotion':      str(row.get('emotion', 'Neutral')),
-            'emotion_label': str(row.get('emotion', 'Neutral')),
-        })
+    highest, lowest = top.rows(score_col, 'high', stop=4), top.rows(score_col, 'low', stop=4)
+    if highest is None or lowest is None:
+        scores = pd.to_numeric(df[score_col], errors='coerce').reset_index(drop=True)
+        highest, lowest = list(scores.nlargest(4).index), list(scores.nsmallest(4).index)
+    outliers_df = df.iloc[highest + lowest]
+    outliers = [
+        {
+            'comment':      comment,
+            'sentiment':    label,
+            'score':        float(score),
+            'author':       author,
+            'subreddit':    sub,
+            'created_time': created,
+            'emotion':      emotion,
+            'emotion_label': emotion,
+        }
+        for comment, label, score, author, sub, created, emotion in zip(
+            datasets.text_values(outliers_df, text, text_col),
+            outliers_df['sentiment_label'].astype(str),
+            outliers_df[score_col],
+            datasets.text_values(outliers_df, text, 'author', 'unknown'),
+            outliers_df['subreddit'].astype(str),
+            datasets.text_values(outliers_df, text, 'created_time'),
+            outliers_df['emotion'],
+        )
+    ]
 
     # Sentiment Rates
     sent_counts = df['sentiment_label'].value_counts()
@@ -418,82 +968,123 @@ def emotions():
         'Negative': round(float(sent_counts.get('Negative', 0) / total * 100), 1) if total else 0
     }
 
-    return jsonify({
+    return {
         'radar': radar,
         'heatmap': heatmap,
         'outliers': outliers,
         'sentiment_rates': sentiment_rates,
         'total': total
-    })
+    }
 
 
-@app.route('/api/threads', methods=['GET'])
-def threads():
-    df = get_df()
+# Whole-dataset payloads (they take no query params), precomputed per dataset by registry.py
+AGGREGATES = {
+    'overview':   overview_payload,
+    'sentiment':  sentiment_payload,
+    'subreddits': subreddits_payload,
+    'emotions':   emotions_payload,
+}
 
-    if df is None:
-        return jsonify({'total': 0, 'threads': []})
 
-    if df.empty:
+# In-memory structures built per resident dataset (dropped on eviction)
+DERIVED = {
+    'bitmaps': bitmaps.BitmapIndex,
+    'topk':    topk.TopK.from_frame,
+    'sample':  sampling.StratifiedSample,
+}
+
+
+def _aggregate(name: str) -> dict:
+    """AGGREGATES[name] of the request's dataset, from registry.py's cache when it has it."""
+    return registry.aggregate(_dataset_id(), name, AGGREGATES[name])
+
+
+@api.route('/api/threads', methods=['GET'])
+def threads():
+    df, text = get_dataset()
+    sql = _sql()
+
+    if sql is None and (df is None or df.empty):
         return jsonify({'total': 0, 'threads': []})
 
     sub_f  = request.args.get('subreddit', '')
     sort   = request.args.get('sort', 'hot')
     page   = int(request.args.get('page', 1))
     per_page = int(request.args.get('per_page', 10))
+    try:
+        start_ts = timeseries.parse_bound(request.args.get('start_date'))
+        end_ts   = timeseries.parse_bound(request.args.get('end_date'), end=True)
+    except ValueError as e:
+        return jsonify({'ok': False, 'error': str(e)}), 400
 
-    tdf = df.copy()
-    if sub_f and sub_f != 'All':
-        tdf = tdf[tdf['subreddit'] == sub_f]
+    if sql is not None:
+        return jsonify(sql.threads(sub_f, sort, page, per_page, start_ts, end_ts))
 
     sort_col = 'sentiment_score'
-    if 'upvotes' in tdf.columns and sort == 'top':
+    if 'upvotes' in df.columns and sort == 'top':
         sort_col = 'upvotes'
-    tdf = tdf.sort_values(sort_col, ascending=(sort == 'new'))
-
-    total = len(tdf)
-    total_pages = max(1, (total + per_page - 1) // per_page)
+    subreddit = sub_f if sub_f and sub_f != 'All' else None
     start = (page - 1) * per_page
-    paged = tdf.iloc[start:start + per_page]
-
-    thread_list = []
-    for _, row in paged.iterrows():
-        thread_list.append({
-            'id':        str(row.get('post_id', '')),
-            'title':     str(row.get('comment', ''))[:120],
-            'subreddit': str(row.get('subreddit', '')),
-            'author':    str(row.get('author', 'unknown')),
-            'upvotes':   int(row.get('upvotes', 0)),
+
+    # Pages within the top K come straight off the heaps; deeper pages and date filters use the listing
+    ranked = None
+    if start_ts is None and end_ts is None:
+        top = _top_k(df)
+        ranked = top.rows(sort_col, 'low' if sort == 'new' else 'high', subreddit, start, start + per_page)
+    if ranked is not None:
+        total = top.count(subreddit)
+        paged = df.iloc[ranked]
+    else:
+        rows = _listing_rows(df, text, start=start_ts, end=end_ts, subreddit=subreddit,
+                             sort_col=sort_col, descending=(sort != 'new'))
+        total = len(rows)
+        paged = df.iloc[rows[start:start + per_page]]
+
+    thread_list = [
+        {
+            'id':        post_id,
+            'title':     comment[:120],
+            'subreddit': sub,
+            'author':    author,
+            'upvotes':   int(upvotes),
             'comments':  1,
-            'sentiment': str(row.get('sentiment_label', '')),
-            'score':     float(row.get('sentiment_score', 0)),
-            'time':      str(row.get('created_time', ''))
-        })
+            'sentiment': label,
+            'score':     float(score),
+            'time':      created,
+        }
+        for post_id, comment, sub, author, upvotes, label, score, created in zip(
+            datasets.text_values(paged, text, 'post_id'),
+            datasets.text_values(paged, text, 'comment'),
+            paged['subreddit'].astype(str),
+            datasets.text_values(paged, text, 'author', 'unknown'),
+            paged['upvotes'].fillna(0) if 'upvotes' in paged.columns else [0] * len(paged),
+            paged['sentiment_label'].astype(str),
+            paged['sentiment_score'],
+            datasets.text_values(paged, text, 'created_time'),
+        )
+    ]
 
     return jsonify({'total': total, 'threads': thread_list})
 
 
-@app.route('/api/analyze-text', methods=['POST'])
+@api.route('/api/analyze-text', methods=['POST'])
 def analyze_text():
     data = request.get_json(force=True, silent=True)
     raw_text = (data or {}).get('text', '').strip()
     if not raw_text:
         return jsonify({'ok': False, 'error': 'Text is empty'}), 400
 
-    scores = vader.polarity_scores(clean_text(raw_text) or raw_text)
-    score  = round(scores['compound'], 4)
-    label  = 'Positive' if score >= 0.05 else ('Negative' if score <= -0.05 else 'Neutral')
+    scores = score_text(raw_text)
+    score  = scores['score']
+    label  = scores['label']
 
     # Segment analysis
     segments = [s.strip() for s in raw_text.split('\n') if s.strip()][:100]
     seg_results = []
     summary = {'Positive': 0, 'Neutral': 0, 'Negative': 0}
-    for seg in segments:
-        s = vader.polarity_scores(clean_text(seg) or seg)
-        c = round(s['compound'], 4)
-        l = 'Positive' if c >= 0.05 else ('Negative' if c <= -0.05 else 'Neutral')
-        seg_results.append({'text': seg[:200], 'label': l, 'score': c})
-        summary[l] += 1
+    for seg, s in zip(segments, score_many(segments)):
+        seg_results.append({'text': seg[:200], 'label': s['label'], 'score': s['score']})
+        summary[s['label']] += 1
 
     return jsonify({
         'ok': True,
@@ -506,17 +1097,200 @@ def analyze_text():
     })
 
 
+# Per-request limits for /api/analyze-batch
+BATCH_MAX_BYTES = 20 * 1024 * 1024
+BATCH_MAX_TEXTS = 50000
+BATCH_MAX_CHARS = 5000      # longer texts are truncated before scoring
+BATCH_CHUNK     = 2000      # texts scored (and streamed back) per round
+BATCH_MAX_LINE  = 1024 * 1024   # bytes per NDJSON line; longer lines are rejected as items
+
+
+class BatchTooLarge(Exception):
+    """The analyze-batch body went past BATCH_MAX_BYTES (counted as read, chunked bodies too)."""
+
+
+def _batch_items():
+    """
+    Yield (id, text, error) for each item of an analyze-batch request body.
+    Accepts a JSON array (or {"texts": [...]}) or NDJSON, one item per line.
+    Items are strings or objects with a 'text' and optional 'id'.
+    Bytes are counted as they are read, so a chunked body without a
+    Content-Length still stops at BATCH_MAX_BYTES (raises BatchTooLarge).
+    """
+    def _item(i, obj):
+        if isinstance(obj, dict):
+            item_id, text = obj.get('id', i), obj.get('text')
+        else:
+            item_id, text = i, obj
+        if not isinstance(text, str) or not text.strip():
+            return item_id, None, 'Text is empty'
+        return item_id, text.strip()[:BATCH_MAX_CHARS], None
+
+    stream = request.stream
+    read = 0
+
+    def _count(n: int):
+        nonlocal read
+        read += n
+        if read > BATCH_MAX_BYTES:
+            raise BatchTooLarge(f'Request body exceeds {BATCH_MAX_BYTES} bytes.')
+
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        i = 0
+        while True:
+            line = stream.readline(BATCH_MAX_LINE)
+            if not line:
+                return
+            _count(len(line))
+            if not line.endswith(b'\n') and len(line) == BATCH_MAX_LINE:
+                # Over-long line: consume the rest of it, report it as one bad item
+                while line and not line.endswith(b'\n'):
+                    line = stream.readline(BATCH_MAX_LINE)
+                    _count(len(line))
+                yield i, None, f'Line exceeds {BATCH_MAX_LINE} bytes'
+                i += 1
+                continue
+            line = line.strip()
+            if line:
+                try:
+                    yield _item(i, json.loads(line))
+                except ValueError:
+                    yield i, None, 'Invalid JSON line'
+            i += 1
+        return
+
+    body = stream.read(BATCH_MAX_BYTES + 1)
+    _count(len(body))
+    try:
+        data = json.loads(body) if body else None
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        data = data.get('texts')
+    if not isinstance(data, list):
+        raise ValueError('Body must be a JSON array of texts, {"texts": [...]}, or NDJSON.')
+    for i, obj in enumerate(data):
+        yield _item(i, obj)
+
+
+@api.route('/api/analyze-batch', methods=['POST'])
+def analyze_batch():
+    """
+    Score many texts in one request. Results stream back as NDJSON, one line
+    per input in input order, followed by a summary line with throughput.
+
+    Bodies past BATCH_MAX_BYTES get a 413 when that is known before the
+    response starts (Content-Length, or a JSON body). An NDJSON stream that
+    goes over the limit later ends with an error line instead.
+    """
+    if request.content_length and request.content_length > BATCH_MAX_BYTES:
+        return jsonify({'ok': False, 'error': f'Request body exceeds {BATCH_MAX_BYTES} bytes.'}), 413
+
+    items = _batch_items()
+    try:
+        first = next(items, None)
+    except BatchTooLarge as e:
+        return jsonify({'ok': False, 'error': str(e)}), 413
+    except ValueError as e:
+        return jsonify({'ok': False, 'error': str(e)}), 400
+
+    def generate():
+        started = time.perf_counter()
+        stats = {'cache_hits': 0, 'scored': 0}
+        summary = {'Positive': 0, 'Neutral': 0, 'Negative': 0}
+        count, errors, truncated, too_large = 0, 0, False, None
+
+        def flush(chunk):
+            nonlocal errors
+            valid = [text for _, (_, text, err) in chunk if err is None]
+            results = iter(score_many(valid, stats))
+            lines = []
+            for index, (item_id, text, err) in chunk:
+                if err is not None:
+                    errors += 1
+                    lines.append({'index': index, 'id': item_id, 'error': err})
+                    continue
+                r = next(results)
+                summary[r['label']] += 1
+                lines.append({'index': index, 'id': item_id, **r})
+            return ''.join(json.dumps(line) + '\n' for line in lines)
+
+        chunk = []
+        pending = [first] if first is not None else []
+        try:
+            for item in (x for src in (pending, items) for x in src):
+                if count >= BATCH_MAX_TEXTS:
+                    truncated = True
+                    break
+                chunk.append((count, item))
+                count += 1
+                if len(chunk) >= BATCH_CHUNK:
+                    yield flush(chunk)
+                    chunk = []
+        except BatchTooLarge as e:
+            too_large, truncated = str(e), True
+        if chunk:
+            yield flush(chunk)
+
+        elapsed = time.perf_counter() - started
+        yield json.dumps({
+            'done': True,
+            'count': count,
+            'errors': errors,
+            'truncated': truncated,
+            'max_texts': BATCH_MAX_TEXTS,
+            **({'error': too_large, 'status': 413} if too_large else {}),
+            'summary': summary,
+            'cache_hits': stats['cache_hits'],
+            'scored': stats['scored'],
+            'elapsed_ms': round(elapsed * 1000, 1),
+            'texts_per_sec': round(count / elapsed, 1) if elapsed > 0 else 0,
+        }) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@api.route('/api/analyze-url', methods=['POST'])
+def analyze_url():
+    """
+    Queue a Reddit post URL for sentiment analysis.
+    Returns the cached result immediately if the post was analyzed recently,
+    otherwise a job id to poll at GET /api/analyze-url/<job_id>.
+    """
+    data = request.get_json(force=True, silent=True)
+    url = str((data or {}).get('url', '')).strip()
+    if not url:
+        return jsonify({'ok': False, 'error': 'URL is empty'}), 400
+
+    job = url_analysis.submit(url)
+    if not job['ok']:
+        return jsonify(job), 400
+    if job['status'] == 'done':
+        return jsonify(job)
+    job['poll_url'] = f"/api/analyze-url/{job['job_id']}"
+    return jsonify(job), 202
+
+
+@api.route('/api/analyze-url/<job_id>', methods=['GET'])
+def analyze_url_job(job_id):
+    """Poll an analyze-url job: status is queued, running, done or error."""
+    job = url_analysis.get_job(job_id)
+    if job is None:
+        return jsonify({'ok': False, 'error': f'Unknown job id: {job_id}'}), 404
+    return jsonify({'ok': job['status'] != 'error', 'cached': False, **job})
+
+
 # ─── LEGACY DB ENDPOINTS ─────────────────────────────────────────────────────
 
-@app.route('/posts', methods=['GET'])
+@api.route('/posts', methods=['GET'])
 def posts_list():
     return jsonify(get_all_posts())
 
-@app.route('/stats', methods=['GET'])
+@api.route('/stats', methods=['GET'])
 def posts_stats():
     return jsonify(get_stats())
 
-@app.route('/api/debug-fetch', methods=['GET'])
+@api.route('/api/debug-fetch', methods=['GET'])
 def debug_fetch():
     from db import get_stats as _gs
     before = _gs()['total_posts']
@@ -534,4 +1308,4 @@ if __name__ == '__main__':
     print("  Clear Data → POST /api/clear-data")
     print("="*55 + "\n")
     # use_reloader=False is mandatory to avoid double triggering the APScheduler thread
-    app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=False)
+    create_app().run(debug=True, host='0.0.0.0', port=5000, use_reloader=False)
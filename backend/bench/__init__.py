@@ -0,0 +1,12 @@
+"""
+bench — REPRODUCIBLE BENCHMARKS FOR THE BACKEND
+================================================
+  - synth.py → seeded synthetic Reddit datasets (CSV or SQLite), 10k–10M rows
+  - run.py   → timed benchmarks of cleaning, scoring, upload and every /api/*
+               endpoint, written as JSON for regression comparison
+
+Run from backend/:
+    python -m bench.synth --rows 1000000 --out data/bench_1m.csv
+    python -m bench.run --rows 100000
+    python -m bench.run --compare bench/results/old.json bench/results/new.json
+"""
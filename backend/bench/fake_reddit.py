@@ -0,0 +1,241 @@
+"""
+bench/fake_reddit.py — LOCAL STAND-IN FOR THE REDDIT API
+=========================================================
+A small threaded HTTP server that speaks just enough of Reddit's OAuth API
+for praw to run against it, so live mode can be load tested without
+credentials or network access.
+
+Endpoints served:
+  - POST /api/v1/access_token  → a fake bearer token
+  - GET  /r/<sub>/hot|new|top  → listings of fresh t3 posts (`limit` param)
+  - GET  /comments/<id>/       → [post listing, comment tree]
+
+Knobs (FakeRedditConfig):
+  - latency_ms / jitter_ms     → delay added to every response
+  - error_rate                 → share of API calls answered with a 503
+  - rate_limit / rate_window   → Reddit-style x-ratelimit-* headers, and
+                                 429s once `rate_limit` calls were made in
+                                 the current window (0 = unlimited, no headers)
+  - comments / depth / replies → top-level comments per post, reply depth
+                                 and replies per comment; trees that were cut
+                                 short end in a "more" stub like Reddit's
+
+FakeReddit.install() points every praw.Reddit() in the process at the
+server: praw takes oauth_url / reddit_url from a praw.ini, so one is
+written to a temp XDG_CONFIG_HOME and the credential env vars are set to
+fake values. It must run before praw first reads its config. Listings
+always return new post ids, so every scheduler cycle ingests fresh posts.
+"""
+
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from bench.synth import VOCAB, subreddit_names
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+BASE_EPOCH = 1_767_225_600          # 2026-01-01 00:00:00 UTC
+
+
+@dataclass
+class FakeRedditConfig:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    rate_limit: int = 0
+    rate_window: int = 600
+    comments: int = 20
+    depth: int = 2
+    replies: int = 2
+    seed: int = 42
+
+
+# ─── PAYLOADS ────────────────────────────────────────────────────────────────
+
+def _text(rng: random.Random, low: int, high: int) -> str:
+    return ' '.join(rng.choice(VOCAB) for _ in range(rng.randint(low, high))).capitalize()
+
+
+def _post(post_id: str, sub: str, rng: random.Random) -> dict:
+    return {'kind': 't3', 'data': {
+        'id': post_id, 'name': f't3_{post_id}', 'subreddit': sub, 'subreddit_id': 't5_fake',
+        'title': _text(rng, 4, 14), 'selftext': _text(rng, 0, 60),
+        'author': f'user_{rng.randint(1, 50_000)}', 'score': rng.randint(0, 20_000),
+        'num_comments': rng.randint(0, 500), 'created_utc': BASE_EPOCH + rng.randint(0, 86400 * 30),
+        'permalink': f'/r/{sub}/comments/{post_id}/fake/', 'url': f'https://example.com/{post_id}',
+    }}
+
+
+def _listing(children: list) -> dict:
+    return {'kind': 'Listing', 'data': {'after': None, 'before': None, 'dist': len(children),
+                                        'children': children}}
+
+
+def _comment_tree(cfg: FakeRedditConfig, post_id: str, sub: str, rng: random.Random) -> list:
+    counter = [0]
+
+    def build(parent: str, depth: int, count: int) -> list:
+        children = []
+        for _ in range(count):
+            counter[0] += 1
+            cid = f'{post_id}c{counter[0]:x}'
+            replies = build(f't1_{cid}', depth + 1, cfg.replies) if depth < cfg.depth else []
+            children.append({'kind': 't1', 'data': {
+                'id': cid, 'name': f't1_{cid}', 'parent_id': parent, 'link_id': f't3_{post_id}',
+                'subreddit': sub, 'body': _text(rng, 3, 60), 'author': f'user_{rng.randint(1, 50_000)}',
+                'score': rng.randint(-20, 3000), 'created_utc': BASE_EPOCH + rng.randint(0, 86400 * 30),
+                'depth': depth, 'replies': _listing(replies) if replies else '',
+            }})
+        if depth == 0 and count:
+            children.append({'kind': 'more', 'data': {
+                'count': count, 'name': 't1__', 'id': '_', 'parent_id': parent, 'depth': 0,
+                'children': [f'{post_id}m{i}' for i in range(3)],
+            }})
+        return children
+
+    return build(f't3_{post_id}', 0, cfg.comments)
+
+
+# ─── SERVER ──────────────────────────────────────────────────────────────────
+
+class FakeReddit:
+    """The fake API server. start() runs it on a daemon thread; stats counts what it served."""
+
+    def __init__(self, config: FakeRedditConfig | None = None, host: str = '127.0.0.1', port: int = 0):
+        self.config = config or FakeRedditConfig()
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self.subreddits = [s[2:] for s in subreddit_names()]
+        self._next_id = 0
+        self._window_start = time.monotonic()
+        self._window_used = 0
+        self._rng = random.Random(self.config.seed)
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def install(self):
+        """
+        Send every praw.Reddit() (and our credential checks) to this server,
+        through praw's own config lookup: a praw.ini in XDG_CONFIG_HOME.
+        praw reads that file once per process, so call this before the first
+        client is built (bench/load.py does it at startup).
+        """
+        config_home = tempfile.mkdtemp(prefix='fake_reddit_')
+        with open(os.path.join(config_home, 'praw.ini'), 'w') as f:
+            f.write(f'[DEFAULT]\noauth_url={self.url}\nreddit_url={self.url}\n')
+        os.environ.update({
+            'XDG_CONFIG_HOME': config_home,
+            'REDDIT_CLIENT_ID': 'fake_client_id_0001', 'REDDIT_CLIENT_SECRET': 'fake_secret',
+            'REDDIT_USER_AGENT': 'RedditAlytics-loadtest/1.0',
+        })
+        return self
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True, name='fake-reddit')
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats.clear()
+
+    # ── per-request policy ───────────────────────────────────────────────────
+    def _admit(self) -> tuple[int | None, dict]:
+        """Decide latency / errors / rate limiting for one API call. Returns (error status, headers)."""
+        cfg = self.config
+        with self.lock:
+            headers = {}
+            if cfg.rate_limit:
+                now = time.monotonic()
+                if now - self._window_start >= cfg.rate_window:
+                    self._window_start, self._window_used = now, 0
+                self._window_used += 1
+                reset = max(1, int(cfg.rate_window - (now - self._window_start)))
+                headers = {'x-ratelimit-used': str(self._window_used),
+                           'x-ratelimit-remaining': str(max(0, cfg.rate_limit - self._window_used)),
+                           'x-ratelimit-reset': str(reset)}
+                if self._window_used > cfg.rate_limit:
+                    return 429, headers
+            if cfg.error_rate and self._rng.random() < cfg.error_rate:
+                return 503, headers
+        return None, headers
+
+    def _new_ids(self, n: int) -> list:
+        with self.lock:
+            start, self._next_id = self._next_id, self._next_id + n
+        return [f'fk{i:06x}' for i in range(start, start + n)]
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body, headers: dict | None = None, kind: str = 'api'):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Content-Length', str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+                with fake.lock:
+                    fake.stats[f'{kind}:{status}'] += 1
+                    fake.stats['bytes_sent'] += len(data)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                self.rfile.read(length)
+                if urlparse(self.path).path.rstrip('/') == '/api/v1/access_token':
+                    return self._send(200, {'access_token': 'fake-token', 'token_type': 'bearer',
+                                            'expires_in': 86400, 'scope': '*'}, kind='token')
+                self._send(404, {'message': 'Not Found', 'error': 404})
+
+            def do_GET(self):
+                cfg = fake.config
+                if cfg.latency_ms or cfg.jitter_ms:
+                    time.sleep((cfg.latency_ms + random.uniform(0, cfg.jitter_ms)) / 1000)
+                status, headers = fake._admit()
+                if status:
+                    return self._send(status, {'message': 'error', 'error': status}, headers)
+
+                url = urlparse(self.path)
+                params = parse_qs(url.query)
+                parts = [p for p in url.path.split('/') if p]
+                if len(parts) == 3 and parts[0] == 'r' and parts[2] in ('hot', 'new', 'top', 'rising'):
+                    limit = min(100, int(params.get('limit', ['25'])[0]))
+                    rng = random.Random(f'{cfg.seed}:{parts[1]}:{fake._next_id}')
+                    posts = [_post(pid, parts[1], rng) for pid in fake._new_ids(limit)]
+                    return self._send(200, _listing(posts), headers)
+                if len(parts) >= 2 and parts[0] == 'comments':
+                    post_id = parts[1]
+                    rng = random.Random(zlib.crc32(f'{cfg.seed}:{post_id}'.encode()))
+                    sub = fake.subreddits[rng.randrange(len(fake.subreddits))]
+                    body = [_listing([_post(post_id, sub, rng)]),
+                            _listing(_comment_tree(cfg, post_id, sub, rng))]
+                    return self._send(200, body, headers)
+                self._send(404, {'message': 'Not Found', 'error': 404}, headers)
+
+        return Handler
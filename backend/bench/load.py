@@ -0,0 +1,209 @@
+"""
+bench/load.py — INGESTION LOAD TEST AGAINST THE FAKE REDDIT API
+================================================================
+Runs the three live-mode code paths against bench/fake_reddit.py and
+reports throughput, tail latency and error rates:
+
+  - scheduler → scheduler.fetch_reddit_data() for N cycles
+                (posts/sec inserted, p50/p99 cycle time, posts missing
+                from cycles because a subreddit call failed)
+  - rt_fetch  → rt_fetch._try_live_fetch() for N cycles
+                (comments/sec, p99 cycle time, failed cycles)
+  - api_fetch → api_fetch.fetch_post_data() N times from a thread pool
+                (calls/sec, comments/sec, p99 latency, failed calls);
+                each pool thread uses its own praw client, as the
+                url-analysis workers do
+
+Each scenario also records what the server answered (2xx / 429 / 5xx), so
+rate-limit behaviour shows up next to the client-side numbers. Results
+are written as JSON next to bench/run.py's, and SQLite writes go to a
+temp database, never reddit.db.
+
+Usage (from backend/):
+    python -m bench.load --cycles 20 --calls 200 --concurrency 8
+    python -m bench.load --latency-ms 80 --jitter-ms 40 --error-rate 0.02
+    python -m bench.load --rate-limit 100 --rate-window 60 --only scheduler
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime
+
+import numpy as np
+
+from bench.fake_reddit import FakeReddit, FakeRedditConfig
+from bench.run import RESULTS_DIR, _git_commit
+
+SCENARIOS = ('scheduler', 'rt_fetch', 'api_fetch')
+
+
+def _latency(times: list) -> dict:
+    if not times:
+        return {}
+    ms = np.asarray(times) * 1000
+    return {'p50_ms': round(float(np.percentile(ms, 50)), 2),
+            'p99_ms': round(float(np.percentile(ms, 99)), 2),
+            'max_ms': round(float(ms.max()), 2)}
+
+
+@contextlib.contextmanager
+def _quiet(verbose: bool):
+    """The ingestion code logs every post and traceback; keep the report readable unless --verbose."""
+    if verbose:
+        yield
+        return
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        yield
+
+
+# ─── SCENARIOS ───────────────────────────────────────────────────────────────
+
+def load_scheduler(cycles: int, verbose: bool = False) -> dict:
+    import scheduler
+
+    expected = len(scheduler.SUBREDDITS) * 5
+    times, inserted, failed, missing = [], 0, 0, 0
+    started = time.perf_counter()
+    with _quiet(verbose):
+        for _ in range(cycles):
+            t0 = time.perf_counter()
+            scheduler.fetch_reddit_data()
+            times.append(time.perf_counter() - t0)
+            if scheduler.sync_state['error']:
+                failed += 1
+            inserted += scheduler.sync_state['posts_inserted']
+            missing += max(0, expected - scheduler.sync_state['posts_inserted'])
+    elapsed = time.perf_counter() - started
+    return {'cycles': cycles, 'posts': inserted, 'posts_per_sec': round(inserted / elapsed, 1),
+            'failed_cycles': failed, 'error_rate': round(failed / cycles, 4),
+            'missing_posts': missing, 'missing_rate': round(missing / (expected * cycles), 4),
+            'elapsed_s': round(elapsed, 3), **_latency(times)}
+
+
+def load_rt_fetch(cycles: int, verbose: bool = False) -> dict:
+    import pandas as pd
+    import rt_fetch
+
+    output = os.path.join(tempfile.mkdtemp(prefix='load_'), 'analyzed_output.csv')
+    times, comments, failed = [], 0, 0
+    started = time.perf_counter()
+    with _quiet(verbose):
+        for _ in range(cycles):
+            t0 = time.perf_counter()
+            df = rt_fetch._try_live_fetch(output, pd.DataFrame(columns=['post_id']))
+            times.append(time.perf_counter() - t0)
+            if df is None:
+                failed += 1
+            else:
+                comments += len(df)
+    elapsed = time.perf_counter() - started
+    return {'cycles': cycles, 'comments': comments, 'comments_per_sec': round(comments / elapsed, 1),
+            'failed_cycles': failed, 'error_rate': round(failed / cycles, 4),
+            'elapsed_s': round(elapsed, 3), **_latency(times)}
+
+
+def load_api_fetch(calls: int, concurrency: int, comment_limit: int = 50) -> dict:
+    import api_fetch
+
+    api_fetch.reset_reddit_client()     # fresh per-thread clients pointed at the fake server
+
+    def one(i: int):
+        t0 = time.perf_counter()
+        result = api_fetch.fetch_post_data(
+            f'https://www.reddit.com/r/technology/comments/ld{i:05x}/load_test/', comment_limit)
+        return time.perf_counter() - t0, result
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(calls)))
+    elapsed = time.perf_counter() - started
+
+    failed = [r for _, r in outcomes if not r['ok']]
+    comments = sum(len(r['comments']) for _, r in outcomes if r['ok'])
+    errors = {}
+    for r in failed:
+        key = r['error'].split(':')[0]
+        errors[key] = errors.get(key, 0) + 1
+    return {'calls': calls, 'concurrency': concurrency, 'calls_per_sec': round(calls / elapsed, 1),
+            'comments': comments, 'comments_per_sec': round(comments / elapsed, 1),
+            'failed_calls': len(failed), 'error_rate': round(len(failed) / calls, 4), 'errors': errors,
+            'elapsed_s': round(elapsed, 3), **_latency([t for t, _ in outcomes])}
+
+
+# ─── DRIVER ──────────────────────────────────────────────────────────────────
+
+def run(config: FakeRedditConfig, cycles: int, calls: int, concurrency: int,
+        only: list | None = None, verbose: bool = False, out: str | None = None) -> str:
+    here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, here)
+    os.chdir(here)
+
+    fake = FakeReddit(config).start().install()
+    import db
+    db.DB_PATH = os.path.join(tempfile.mkdtemp(prefix='load_'), 'reddit.db')
+    with _quiet(verbose):
+        db.init_db()
+    print(f"[load.py] Fake Reddit at {fake.url} ({asdict(config)})")
+
+    results = {}
+    for name in only or SCENARIOS:
+        fake.reset_stats()
+        if name == 'scheduler':
+            result = load_scheduler(cycles, verbose)
+        elif name == 'rt_fetch':
+            result = load_rt_fetch(cycles, verbose)
+        else:
+            result = load_api_fetch(calls, concurrency)
+        result['server'] = {k: v for k, v in sorted(fake.stats.items())}
+        results[name] = result
+        rate = result.get('posts_per_sec') or result.get('comments_per_sec')
+        print(f"  {name:<10} {rate:>10,.1f} items/s   p99 {result.get('p99_ms', 0):>9.1f} ms   "
+              f"errors {result['error_rate']:.2%}   server {result['server']}")
+    fake.stop()
+
+    report = {
+        'meta': {'created_at': datetime.now().isoformat(), 'git_commit': _git_commit(),
+                 'fake_reddit': asdict(config), 'cycles': cycles, 'calls': calls,
+                 'concurrency': concurrency},
+        'results': results,
+    }
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"load_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"[load.py] Results written to {out}")
+    return out
+
+
+# ─── CLI ─────────────────────────────────────────────────────────────────────
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test live ingestion against a fake Reddit API.')
+    parser.add_argument('--cycles', type=int, default=10, help='scheduler / rt_fetch cycles')
+    parser.add_argument('--calls', type=int, default=100, help='api_fetch.fetch_post_data calls')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--only', nargs='+', choices=SCENARIOS)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--rate-limit', type=int, default=0, help='calls per window before 429s (0 = off)')
+    parser.add_argument('--rate-window', type=int, default=600)
+    parser.add_argument('--comments', type=int, default=20, help='top-level comments per post')
+    parser.add_argument('--depth', type=int, default=2, help='reply depth below top-level comments')
+    parser.add_argument('--replies', type=int, default=2, help='replies per comment')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out')
+    parser.add_argument('--verbose', action='store_true', help='keep the ingestion logs')
+    args = parser.parse_args()
+
+    cfg = FakeRedditConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                           rate_limit=args.rate_limit, rate_window=args.rate_window, comments=args.comments,
+                           depth=args.depth, replies=args.replies, seed=args.seed)
+    run(cfg, args.cycles, args.calls, args.concurrency, args.only, args.verbose, args.out)
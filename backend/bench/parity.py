@@ -0,0 +1,140 @@
+"""
+bench/parity.py — PANDAS vs DUCKDB ENGINE PARITY CHECK
+=======================================================
+Uploads the same dataset once through the pandas path and once through
+duckdb_engine.py (QUERY_ENGINE=duckdb). Then it compares the JSON of every
+dashboard endpoint across a set of query variants. Exits 1 on any mismatch.
+
+The dataset is a synthetic one from bench/synth.py (or --csv). A few rows
+are edited to hit the edges: tied scores, case-insensitive search, the
+exact histogram bin edges, and an unparseable timestamp.
+
+Floats are compared with a small tolerance, because DuckDB sums in a
+different order than numpy. Everything else must match exactly.
+
+Usage (from backend/):
+    python -m bench.parity --rows 50000
+    python -m bench.parity --csv data/export.csv
+"""
+
+import argparse
+import io
+import math
+import os
+import sys
+import tempfile
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+TOLERANCE = 1e-6
+
+GET_URLS = [
+    '/api/overview',
+    '/api/sentiment',
+    '/api/subreddits',
+    '/api/emotions',
+    '/api/trends',
+    '/api/trends?granularity=hour&start_date=2024-01-10&end_date=2024-01-12',
+    '/api/trends?granularity=week&by_subreddit=true',
+    '/api/comments',
+    '/api/comments?search=GREAT&page=2',
+    '/api/comments?search=mind-blowing&per_page=50',
+    '/api/comments?sort_by=upvotes&sort_dir=asc&page=7',
+    '/api/comments?sentiment=Negative&subreddit=r/Python',
+    '/api/comments?start_date=2024-01-05T06:30:00&end_date=2024-01-12&sort_by=upvotes&page=3',
+    '/api/comments?search=great&sentiment=Positive&start_date=2024-01-20&page=4',
+    '/api/threads',
+    '/api/threads?sort=top&page=3',
+    '/api/threads?sort=new&subreddit=r/Python',
+    '/api/threads?sort=top&subreddit=r/Python&start_date=2024-01-03&end_date=2024-01-03T18:00:00',
+]
+
+
+def _dataset(rows: int, seed: int, csv_path: str | None) -> bytes:
+    import pandas as pd
+    from bench import synth
+
+    if csv_path:
+        with open(csv_path, 'rb') as f:
+            return f.read()
+    df = pd.concat(synth.generate(rows, seed, days=30), ignore_index=True)
+    df.loc[0:9, 'sentiment_score'] = 0.25                       # ties for the stable sorts
+    df.loc[10, 'comment'] = 'Honestly MIND-BLOWING and great'
+    df.loc[11:21, 'sentiment_score'] = [-1.0, -0.8, -0.6, -0.4, -0.2, 0.0, 0.2, 0.4, 0.6, 0.8, 1.0]
+    df.loc[22, 'created_time'] = 'not a date'
+    return df.to_csv(index=False).encode()
+
+
+def _collect(client, csv_bytes: bytes) -> dict:
+    r = client.post('/api/upload-csv', data={'file': (io.BytesIO(csv_bytes), 'parity.csv')},
+                    content_type='multipart/form-data')
+    assert r.status_code == 200, r.get_data(as_text=True)
+    out = {}
+    for url in GET_URLS:
+        resp = client.get(url)
+        out[url] = (resp.status_code, resp.get_json())
+    client.post('/api/clear-data')
+    return out
+
+
+def _diff(a, b, path: str = '') -> list:
+    if isinstance(a, float) or isinstance(b, float):
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+            if math.isclose(a, b, rel_tol=TOLERANCE, abs_tol=TOLERANCE) or (a != a and b != b):
+                return []
+        return [f'{path}: {a!r} != {b!r}']
+    if isinstance(a, dict) and isinstance(b, dict):
+        if a.keys() != b.keys():
+            return [f'{path}: keys {sorted(a.keys() ^ b.keys())} differ']
+        return [d for k in a for d in _diff(a[k], b[k], f'{path}.{k}')]
+    if isinstance(a, list) and isinstance(b, list):
+        if len(a) != len(b):
+            return [f'{path}: length {len(a)} != {len(b)}']
+        return [d for i, (x, y) in enumerate(zip(a, b)) for d in _diff(x, y, f'{path}[{i}]')]
+    return [] if a == b else [f'{path}: {a!r} != {b!r}']
+
+
+def run(rows: int, seed: int, csv_path: str | None = None) -> int:
+    """Compare both engines; returns the number of mismatching endpoints."""
+    here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, here)
+    os.chdir(here)
+
+    import duckdb_engine
+    if not duckdb_engine.DUCKDB_AVAILABLE:
+        print("[parity.py] duckdb is not installed (pip install duckdb)")
+        return 1
+
+    tmp = tempfile.mkdtemp(prefix='parity_')
+    import db
+    import datasets
+    db.DB_PATH = os.path.join(tmp, 'reddit.db')
+    datasets.DATASET_DIR = os.path.join(tmp, 'datasets')
+    import app as appmod
+    client = appmod.create_app(start_scheduler=False).test_client()
+    csv_bytes = _dataset(rows, seed, csv_path)
+
+    duckdb_engine.QUERY_ENGINE = 'pandas'
+    expected = _collect(client, csv_bytes)
+    duckdb_engine.QUERY_ENGINE = 'duckdb'
+    duckdb_engine.engine = duckdb_engine.DuckEngine(os.path.join(tmp, 'duckdb'))
+    actual = _collect(client, csv_bytes)
+
+    failures = 0
+    for url in GET_URLS:
+        diffs = _diff(expected[url], actual[url], url)
+        print(f"  {'ok  ' if not diffs else 'FAIL'} {url}")
+        for d in diffs[:5]:
+            print(f"         {d}")
+        failures += bool(diffs)
+    print(f"[parity.py] {len(GET_URLS) - failures}/{len(GET_URLS)} endpoints match")
+    return failures
+
+
+# ─── CLI ─────────────────────────────────────────────────────────────────────
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare the pandas and DuckDB query engines.')
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--csv', help='use an existing CSV instead of a synthetic one')
+    args = parser.parse_args()
+    sys.exit(1 if run(args.rows, args.seed, args.csv) else 0)
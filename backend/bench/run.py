@@ -0,0 +1,270 @@
+"""
+bench/run.py — TIMED BENCHMARKS WITH JSON RESULTS
+==================================================
+Times the hot paths against a synthetic dataset from bench/synth.py and
+writes one JSON file per run, so two runs can be diffed for regressions.
+
+What is measured:
+  - clean_text     → per-call cleaning over sample comments
+  - clean_series   → vectorised cleaning of the same comments
+  - vader          → raw VADER polarity (no cache)
+  - score_many     → scoring.score_many, cold cache then warm cache
+  - upload_csv     → POST /api/upload-csv of the whole dataset, as a new file
+                     and again as a duplicate (served from the content hash)
+  - every /api/*   → each route in app.url_map, through the Flask test
+                     client against the uploaded dataset (routes that block
+                     or hit the network are listed in SKIP_ROUTES)
+
+Each benchmark runs `repeats` times; results keep min / median / p95 /
+mean in ms and, where it makes sense, items per second.
+
+The app is built with db.DB_PATH and datasets.DATASET_DIR pointing into a temp
+directory and without the scheduler, so a run never touches reddit.db or Reddit.
+
+Usage (from backend/):
+    python -m bench.run --rows 100000 --repeats 5
+    python -m bench.run --compare bench/results/A.json bench/results/B.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+RESULTS_DIR  = os.path.join(os.path.dirname(__file__), 'results')
+TEXT_SAMPLE  = 20_000       # comments used by the cleaning / scoring benchmarks
+REGRESSION   = 1.10         # --compare flags medians more than 10% slower
+
+# Streaming or network-bound routes that can't be timed meaningfully here
+SKIP_ROUTES = {
+    '/api/stream':      'infinite SSE stream',
+    '/api/debug-fetch': 'calls Reddit',
+    '/api/analyze-url': 'calls Reddit',
+}
+
+# Extra query variants worth timing separately
+GET_VARIANTS = {
+    '/api/comments': ['', '?search=great&sort_by=score&page=3', '?sentiment=Negative&subreddit=r/Python'],
+    '/api/trends':   ['', '?granularity=hour', '?granularity=week&by_subreddit=true'],
+}
+
+
+def _timed(fn, repeats: int) -> list:
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def _summary(name: str, group: str, times: list, items: int | None = None, **extra) -> dict:
+    ordered = sorted(times)
+    median = statistics.median(ordered)
+    result = {
+        'name': name,
+        'group': group,
+        'repeats': len(times),
+        'min_ms': round(ordered[0] * 1000, 3),
+        'median_ms': round(median * 1000, 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+    }
+    if items:
+        result['items'] = items
+        result['items_per_sec'] = round(items / median, 1) if median else None
+    result.update(extra)
+    print(f"  {name:<55} median {result['median_ms']:>10.2f} ms"
+          + (f"  ({result['items_per_sec']:,.0f}/s)" if items and median else ''))
+    return result
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=os.path.dirname(__file__), timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+# ─── BENCHMARK GROUPS ────────────────────────────────────────────────────────
+
+def bench_text(comments: list, repeats: int) -> list:
+    import pandas as pd
+    import scoring
+    from clean import clean_text, clean_series
+
+    print("[run.py] Text pipeline")
+    series = pd.Series(comments)
+    results = [
+        _summary('clean_text', 'text', _timed(lambda: [clean_text(c) for c in comments], repeats), len(comments)),
+        _summary('clean_series', 'text', _timed(lambda: clean_series(series), repeats), len(comments)),
+        _summary('vader', 'text', _timed(lambda: [scoring._polarity(c) for c in comments], repeats), len(comments)),
+    ]
+
+    def cold():
+        scoring._cache.clear()
+        scoring.score_many(comments)
+    results.append(_summary('score_many_cold', 'text', _timed(cold, repeats), len(comments)))
+    results.append(_summary('score_many_warm', 'text', _timed(lambda: scoring.score_many(comments), repeats),
+                            len(comments)))
+    return results
+
+
+def bench_api(client, app, csv_bytes: bytes, rows: int, comments: list, repeats: int) -> list:
+    import io
+    import registry
+
+    print("[run.py] API")
+    results = []
+
+    def upload(body: bytes):
+        r = client.post('/api/upload-csv', data={'file': (io.BytesIO(body), 'bench.csv')},
+                        content_type='multipart/form-data')
+        assert r.status_code == 200, r.get_data(as_text=True)[:200]
+
+    # Cold: trailing blank lines make every repeat a new file (same rows), so nothing is
+    # deduplicated. The background snapshot of the previous repeat finishes untimed.
+    cold = []
+    for i in range(repeats):
+        registry.flush()
+        started = time.perf_counter()
+        upload(csv_bytes + b'\n' * i)
+        cold.append(time.perf_counter() - started)
+    results.append(_summary('POST /api/upload-csv', 'api', cold, rows, bytes=len(csv_bytes)))
+    results.append(_summary('POST /api/upload-csv (duplicate)', 'api',
+                            _timed(lambda: upload(csv_bytes), repeats), rows, bytes=len(csv_bytes)))
+    registry.flush()
+
+    gets = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if not rule.rule.startswith('/api/') or 'GET' not in rule.methods:
+            continue
+        if rule.rule in SKIP_ROUTES or rule.arguments:
+            continue
+        gets.extend(rule.rule + q for q in GET_VARIANTS.get(rule.rule, ['']))
+
+    for url in gets:
+        status = client.get(url).status_code     # warm-up, and recorded so failures stand out
+        results.append(_summary(f'GET {url}', 'api', _timed(lambda: client.get(url), repeats), status=status))
+
+    one = comments[0]
+    multi = '\n'.join(comments[:100])
+    batch = comments[:2000]
+    posts = [
+        ('POST /api/analyze-text', lambda: client.post('/api/analyze-text', json={'text': one}), None),
+        ('POST /api/analyze-text (100 lines)', lambda: client.post('/api/analyze-text', json={'text': multi}), 100),
+        ('POST /api/analyze-batch (2000)', lambda: client.post('/api/analyze-batch', json=batch).get_data(), 2000),
+    ]
+    for name, fn, items in posts:
+        results.append(_summary(name, 'api', _timed(fn, repeats), items))
+
+    client.post('/api/clear-data')
+    return results
+
+
+def run(rows: int, seed: int, repeats: int, out: str | None = None, csv_path: str | None = None) -> str:
+    """Generate (or load) a dataset, run every benchmark group and write the JSON results."""
+    here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, here)
+    os.chdir(here)
+    from bench import synth
+
+    tmp = tempfile.mkdtemp(prefix='bench_')
+    generated = False
+    if csv_path is None:
+        csv_path = os.path.join(tmp, f'synthetic_{rows}_{seed}.csv')
+        started = time.perf_counter()
+        synth.write_csv(csv_path, rows, seed)
+        generated = True
+        print(f"[run.py] Generated {rows:,} rows in {time.perf_counter() - started:.1f}s")
+    with open(csv_path, 'rb') as f:
+        csv_bytes = f.read()
+
+    import pandas as pd
+    comments = pd.read_csv(csv_path, usecols=['comment'], nrows=TEXT_SAMPLE)['comment'].astype(str).tolist()
+    if not generated:
+        # Records, not lines: quoted comments can span lines
+        rows = sum(len(chunk) for chunk in pd.read_csv(csv_path, usecols=['post_id'], chunksize=500_000))
+
+    # Build the app against a throwaway database and dataset dir, without the scheduler
+    import db
+    import datasets
+    db.DB_PATH = os.path.join(tmp, 'reddit.db')
+    datasets.DATASET_DIR = os.path.join(tmp, 'datasets')
+    import app as appmod
+    flask_app = appmod.create_app(start_scheduler=False)
+    client = flask_app.test_client()
+
+    results = bench_text(comments, repeats) + bench_api(client, flask_app, csv_bytes, rows, comments, repeats)
+
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'rows': rows,
+            'seed': seed,
+            'repeats': repeats,
+            'dataset': os.path.basename(csv_path),
+        },
+        'results': results,
+    }
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}_{rows}.json")
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"[run.py] Results written to {out}")
+    return out
+
+
+# ─── REGRESSION COMPARISON ───────────────────────────────────────────────────
+
+def compare(old_path: str, new_path: str, threshold: float = REGRESSION) -> int:
+    """Print median ratios new/old per benchmark. Returns the number of regressions."""
+    with open(old_path) as f:
+        old = {r['name']: r for r in json.load(f)['results']}
+    with open(new_path) as f:
+        new = {r['name']: r for r in json.load(f)['results']}
+
+    regressions = 0
+    print(f"{'benchmark':<55} {'old ms':>10} {'new ms':>10} {'ratio':>7}")
+    for name, r in new.items():
+        if name not in old:
+            print(f"{name:<55} {'-':>10} {r['median_ms']:>10.2f}     new")
+            continue
+        ratio = r['median_ms'] / old[name]['median_ms'] if old[name]['median_ms'] else float('inf')
+        flag = ''
+        if ratio > threshold:
+            regressions += 1
+            flag = '  REGRESSION'
+        print(f"{name:<55} {old[name]['median_ms']:>10.2f} {r['median_ms']:>10.2f} {ratio:>6.2f}x{flag}")
+    print(f"[run.py] {regressions} regression(s) over {threshold:.2f}x")
+    return regressions
+
+
+# ─── CLI ─────────────────────────────────────────────────────────────────────
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the backend benchmark suite.')
+    parser.add_argument('--rows', type=int, default=100_000, help='synthetic dataset size')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--csv', help='benchmark an existing CSV instead of generating one')
+    parser.add_argument('--out', help='results JSON path (default bench/results/<timestamp>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two result files')
+    parser.add_argument('--threshold', type=float, default=REGRESSION)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, threshold=args.threshold) else 0)
+    run(args.rows, args.seed, args.repeats, args.out, args.csv)
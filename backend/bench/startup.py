@@ -0,0 +1,101 @@
+"""
+bench/startup.py — COLD-START BENCHMARK
+========================================
+Measures how long a fresh process takes to serve its first request, which
+is what an autoscaled container pays on every scale-out. Each run is a new
+interpreter, so nothing is warm except the OS file cache.
+
+Phases timed inside the child process:
+  - import_app     → `import app` (modules, lexicon, clients)
+  - first_response → create_app() + the first GET /health
+  - first_score    → the first POST /api/analyze-text (builds the analyzer
+                     if nothing did before)
+  - process_total  → interpreter launch to first response, measured by the
+                     parent
+
+Runs once with the lexicon parsed from vaderSentiment and once from a
+VADER_PICKLE file. Results use bench/run.py's JSON format, so
+`python -m bench.run --compare` works on them too.
+
+Usage (from backend/):
+    python -m bench.startup --runs 10
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from bench.run import RESULTS_DIR, _git_commit, _summary
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import json, os, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, os.environ['BENCH_BACKEND'])
+import db
+db.DB_PATH = os.environ['BENCH_DB']
+import app
+t1 = time.perf_counter()
+client = app.create_app(start_scheduler=False).test_client()
+assert client.get('/health').status_code == 200
+t2 = time.perf_counter()
+assert client.post('/api/analyze-text', json={'text': 'startup is fast now'}).status_code == 200
+t3 = time.perf_counter()
+print(json.dumps({'import_app': t1 - t0, 'first_response': t2 - t1, 'first_score': t3 - t2}), flush=True)
+os._exit(0)    # interpreter teardown is not part of a cold start
+'''
+
+
+def _one_run(env: dict) -> dict:
+    started = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', CHILD], env=env, cwd=HERE,
+                         capture_output=True, text=True, check=True).stdout
+    total = time.perf_counter() - started
+    phases = json.loads(out.strip().splitlines()[-1])
+    phases['process_total'] = total
+    return phases
+
+
+def run(runs: int, out: str | None = None) -> str:
+    tmp = tempfile.mkdtemp(prefix='startup_')
+    pickle_path = os.path.join(tmp, 'vader.pkl')
+    base_env = {**os.environ, 'BENCH_BACKEND': HERE, 'BENCH_DB': os.path.join(tmp, 'reddit.db')}
+    base_env.pop('VADER_PICKLE', None)
+
+    results = []
+    for variant, extra in (('lexicon', {}), ('pickle', {'VADER_PICKLE': pickle_path})):
+        env = {**base_env, **extra}
+        if extra:
+            _one_run(env)                         # first run writes the pickle
+        samples = [_one_run(env) for _ in range(runs)]
+        print(f"[startup.py] {variant}")
+        for phase in ('import_app', 'first_response', 'first_score', 'process_total'):
+            results.append(_summary(f'startup {phase} ({variant})', 'startup', [s[phase] for s in samples]))
+
+    report = {
+        'meta': {'created_at': datetime.now().isoformat(), 'git_commit': _git_commit(),
+                 'python': sys.version.split()[0], 'runs': runs},
+        'results': results,
+    }
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"startup_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"[startup.py] Results written to {out}")
+    return out
+
+
+# ─── CLI ─────────────────────────────────────────────────────────────────────
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure cold-start time to first response.')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--out')
+    args = parser.parse_args()
+    run(args.runs, args.out)
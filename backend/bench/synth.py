@@ -0,0 +1,179 @@
+"""
+bench/synth.py — SEEDED SYNTHETIC REDDIT DATASETS
+==================================================
+scheduler._generate_synthetic_data() only knows 25 fixed titles, which is
+fine for a demo but useless for load testing. This module produces
+datasets of any size (10k to 10M rows) with production-like shape:
+
+  - Subreddit skew:  SUBREDDIT_COUNT communities with Zipf popularity, so
+                     a few subreddits dominate like they do on Reddit.
+  - Text lengths:    lognormal word counts (median ~18 words, long tail up
+                     to MAX_WORDS), drawn from neutral, positive, negative
+                     and stopword vocabularies, with occasional URLs.
+  - Timestamps:      spread over `days` with a day/night cycle.
+  - Labels/scores:   derived from the positive/negative words in each text,
+                     so labels agree with the text roughly like VADER would.
+
+The same (rows, seed) always produces the same dataset. Rows are produced
+in chunks of CHUNK_ROWS, so memory stays flat no matter the size.
+
+Usage (from backend/):
+    python -m bench.synth --rows 1000000 --out data/bench_1m.csv
+    python -m bench.synth --rows 200000 --format sqlite --out data/bench.db
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+CHUNK_ROWS      = 100_000
+SUBREDDIT_COUNT = 60
+ZIPF_EXPONENT   = 1.1
+MEDIAN_WORDS    = 18
+WORDS_SIGMA     = 0.8
+MAX_WORDS       = 300
+URL_RATE        = 0.05
+START_EPOCH     = 1_704_067_200          # 2024-01-01 00:00:00 UTC
+
+BASE_SUBREDDITS = [
+    'technology', 'Python', 'science', 'news', 'gaming', 'worldnews', 'AskReddit',
+    'programming', 'movies', 'funny', 'datascience', 'MachineLearning', 'space',
+    'Futurology', 'books', 'music', 'sports', 'politics', 'investing', 'personalfinance',
+]
+
+NEUTRAL_WORDS = (
+    'post update release thread version market data model team city game player '
+    'phone price report study system people today week year server code user time '
+    'people article video question answer project company market paper question'
+).split()
+POSITIVE_WORDS = 'good great love amazing excellent awesome happy best nice helpful win brilliant'.split()
+NEGATIVE_WORDS = 'bad terrible hate awful worst broken sad angry fail horrible useless disaster'.split()
+STOP_WORDS     = 'the a is to and of in it that this for with on was but'.split()
+
+VOCAB    = np.array(NEUTRAL_WORDS + POSITIVE_WORDS + NEGATIVE_WORDS + STOP_WORDS + ['https://example.com/x'])
+POLARITY = np.array([0] * len(NEUTRAL_WORDS) + [1] * len(POSITIVE_WORDS)
+                    + [-1] * len(NEGATIVE_WORDS) + [0] * len(STOP_WORDS) + [0], dtype=np.int8)
+URL_INDEX = len(VOCAB) - 1
+COLUMNS  = ['post_id', 'subreddit', 'comment', 'sentiment_label', 'sentiment_score',
+            'created_time', 'author', 'upvotes']
+
+
+def subreddit_names(count: int = SUBREDDIT_COUNT) -> list:
+    names = [f'r/{s}' for s in BASE_SUBREDDITS]
+    names += [f'r/community_{i}' for i in range(len(names), count)]
+    return names[:count]
+
+
+def _word_probs() -> np.ndarray:
+    """Vocabulary weights: stopwords and neutral words dominate, like real text."""
+    w = np.ones(len(VOCAB))
+    w[POLARITY == 1] = 0.35
+    w[POLARITY == -1] = 0.3
+    w[len(NEUTRAL_WORDS) + len(POSITIVE_WORDS) + len(NEGATIVE_WORDS):URL_INDEX] = 3.0
+    w[URL_INDEX] = 0
+    return w / w.sum()
+
+
+# ─── GENERATOR ───────────────────────────────────────────────────────────────
+
+def generate(rows: int, seed: int = 42, days: int = 90, chunk_rows: int = CHUNK_ROWS):
+    """Yield DataFrames of up to `chunk_rows` synthetic rows with the upload CSV columns."""
+    rng = np.random.default_rng(seed)
+    subs = np.array(subreddit_names())
+    ranks = np.arange(1, len(subs) + 1)
+    sub_probs = ranks ** -ZIPF_EXPONENT / (ranks ** -ZIPF_EXPONENT).sum()
+    word_probs = _word_probs()
+    hour_weights = 0.6 + 0.4 * np.sin((np.arange(24) - 9) / 24 * 2 * np.pi)   # busy evenings
+    hour_probs = hour_weights / hour_weights.sum()
+
+    for offset in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - offset)
+        lengths = np.clip(rng.lognormal(np.log(MEDIAN_WORDS), WORDS_SIGMA, n).astype(np.int64), 1, MAX_WORDS)
+        words = rng.choice(len(VOCAB), size=int(lengths.sum()), p=word_probs)
+        # Sprinkle a URL into a few comments (replaces their first word)
+        ends = np.cumsum(lengths)
+        starts = ends - lengths
+        words[starts[rng.random(n) < URL_RATE]] = URL_INDEX
+
+        polarity = np.add.reduceat(POLARITY[words].astype(np.int64), starts)
+        scores = np.round(np.tanh(polarity / 3.0 + rng.normal(0, 0.05, n)), 4)
+        labels = np.where(scores >= 0.05, 'Positive', np.where(scores <= -0.05, 'Negative', 'Neutral'))
+
+        tokens = VOCAB[words].tolist()
+        comments = [' '.join(tokens[s:e]).capitalize() + '.' for s, e in zip(starts.tolist(), ends.tolist())]
+
+        epochs = (START_EPOCH
+                  + rng.integers(0, days, n) * 86400
+                  + rng.choice(24, n, p=hour_probs) * 3600
+                  + rng.integers(0, 3600, n))
+        yield pd.DataFrame({
+            'post_id':         [f't1_{i:08x}' for i in range(offset, offset + n)],
+            'subreddit':       subs[rng.choice(len(subs), n, p=sub_probs)],
+            'comment':         comments,
+            'sentiment_label': labels,
+            'sentiment_score': scores,
+            'created_time':    np.char.replace(np.datetime_as_string(epochs.astype('datetime64[s]'), unit='s'), 'T', ' '),
+            'author':          np.char.add('u/user_', rng.integers(1, max(1000, rows // 20), n).astype(str)),
+            'upvotes':         np.clip(rng.lognormal(2.5, 1.6, n).astype(np.int64), 0, 200_000),
+        }, columns=COLUMNS)
+
+
+# ─── WRITERS ─────────────────────────────────────────────────────────────────
+
+def write_csv(path: str, rows: int, seed: int = 42, days: int = 90) -> str:
+    """Write the dataset as an upload-ready CSV. Returns the path."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for i, chunk in enumerate(generate(rows, seed, days)):
+            chunk.to_csv(f, header=(i == 0), index=False)
+    return path
+
+
+def write_sqlite(path: str, rows: int, seed: int = 42, days: int = 90) -> str:
+    """Write the dataset into reddit.db-compatible monthly `posts` partitions. Returns the path."""
+    import db
+    from clean import clean_series
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    previous, db.DB_PATH = db.DB_PATH, path
+    try:
+        db.init_db()
+        for chunk in generate(rows, seed, days):
+            scores = chunk['sentiment_score'].to_numpy()
+            pos = np.clip(scores, 0, None).round(3)
+            neg = np.clip(-scores, 0, None).round(3)
+            db.insert_many(list(zip(
+                chunk['post_id'], chunk['subreddit'], chunk['comment'].str.slice(0, 80),
+                chunk['author'], chunk['comment'], clean_series(chunk['comment']),
+                scores.tolist(), chunk['sentiment_label'], pos.tolist(),
+                (1 - pos - neg).round(3).tolist(), neg.tolist(),
+                chunk['upvotes'].tolist(), chunk['created_time'],
+            )))
+    finally:
+        db.DB_PATH = previous
+    return path
+
+
+# ─── CLI ─────────────────────────────────────────────────────────────────────
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic Reddit dataset.')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--days', type=int, default=90, help='timestamp spread')
+    parser.add_argument('--format', choices=('csv', 'sqlite'), default='csv')
+    parser.add_argument('--out', required=True)
+    args = parser.parse_args()
+
+    if not 1 <= args.rows <= 50_000_000:
+        sys.exit('--rows must be between 1 and 50,000,000')
+    started = time.perf_counter()
+    writer = write_csv if args.format == 'csv' else write_sqlite
+    writer(args.out, args.rows, args.seed, args.days)
+    elapsed = time.perf_counter() - started
+    print(f"[synth.py] Wrote {args.rows:,} rows to {args.out} in {elapsed:.1f}s "
+          f"({args.rows / elapsed:,.0f} rows/s)")
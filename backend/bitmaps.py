@@ -0,0 +1,178 @@
+"""
+bitmaps.py — BITMAP FILTER INDEXES FOR /api/comments AND /api/threads
+======================================================================
+Filtering an uploaded dataset by sentiment, subreddit and date used to
+build boolean masks over the whole frame on every request, and then
+sort the survivors. A BitmapIndex is built once per dataset instead, so
+a request only combines precomputed bitsets.
+
+How it works:
+  - A bitmap is a packed bitset: one bit per row, in uint64 words
+    (np.packbits, little bit order). AND / OR are numpy word ops over
+    n/64 words, and counts are popcounts (np.bitwise_count; unpackbits
+    and a sum on NumPy < 2).
+  - build: one bitmap per sentiment_label value and per subreddit value,
+    plus popcount totals per label (the 'counts' block of /api/comments).
+  - Day buckets are kept in CSR form: row ids sorted by UTC day
+    (epoch // 86400), plus the offset where each day starts. A date range
+    is one contiguous slice of that order, with only the two edge days
+    checked row by row, and it becomes a bitmap in one scatter. One dense
+    bitmap per day would cost n/8 bytes per day. The last RANGE_CACHE
+    range bitmaps are kept, so paging through one range builds it once.
+  - Sort orders (pandas' stable sort, NaN last) are built on first use
+    per (column, direction) and cached. The stable order of a filtered
+    subset is the full order with the other rows skipped, so ordered()
+    only tests each row's bit along it; nothing is re-sorted. app.py
+    keeps those row-id vectors in result_cache.py and slices pages off.
+
+Indexes live next to their dataset in registry.py (registry.derived), so
+they are dropped on eviction and their bytes count against the budget.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+import timeseries
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+FILTER_COLUMNS = ('sentiment_label', 'subreddit')
+DAY            = 86400
+RANGE_CACHE    = 16             # date-range bitmaps kept per index (paging reuses the same range)
+HAS_BITWISE_COUNT = hasattr(np, 'bitwise_count')                  # NumPy >= 2
+
+
+# ─── BITSETS ─────────────────────────────────────────────────────────────────
+
+def pack(mask: np.ndarray) -> np.ndarray:
+    """Boolean mask → bitmap (uint64 words, bit i = row i)."""
+    packed = np.packbits(np.asarray(mask, dtype=bool), bitorder='little')
+    padded = np.zeros(-(-len(packed) // 8) * 8, dtype=np.uint8)
+    padded[:len(packed)] = packed
+    return padded.view('<u8')
+
+
+def from_rows(rows: np.ndarray, n: int) -> np.ndarray:
+    mask = np.zeros(n, dtype=bool)
+    mask[rows] = True
+    return pack(mask)
+
+
+def count(bitmap: np.ndarray) -> int:
+    if HAS_BITWISE_COUNT:
+        return int(np.bitwise_count(bitmap).sum())
+    return _count_unpacked(bitmap)
+
+
+def _count_unpacked(bitmap: np.ndarray) -> int:
+    """Popcount for NumPy < 2: one byte per bit, summed (8x the bitmap in scratch)."""
+    return int(np.unpackbits(bitmap.view(np.uint8)).sum())
+
+
+def test(bitmap: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Boolean array: is each of `rows` set in the bitmap?"""
+    rows = rows.astype(np.int64, copy=False)
+    return ((bitmap[rows >> 6] >> (rows & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+
+# ─── INDEX ───────────────────────────────────────────────────────────────────
+
+class BitmapIndex:
+    """Per-value bitmaps, day buckets and cached sort orders for one dataset frame."""
+
+    def __init__(self, df: pd.DataFrame, text: dict | None = None):
+        self.n = len(df)
+        self.frame = df
+        self.all = pack(np.ones(self.n, dtype=bool))
+        self.values: dict = {}
+        for col in FILTER_COLUMNS:
+            codes, uniques = pd.factorize(df[col])
+            self.values[col] = {value: pack(codes == code) for code, value in enumerate(uniques)}
+        self.label_counts = {label: count(bm) for label, bm in self.values['sentiment_label'].items()}
+
+        epochs = timeseries.ensure_epochs(df)
+        valid = np.flatnonzero(epochs != timeseries.EPOCH_NA)
+        days = epochs[valid] // DAY
+        by_day = np.argsort(days, kind='stable')
+        row_dtype = np.int32 if self.n < 2 ** 31 else np.int64
+        self.day_rows = valid[by_day].astype(row_dtype)
+        self.day_keys, starts = np.unique(days[by_day], return_index=True)
+        self.day_offsets = np.append(starts, len(by_day))
+        self.epochs = epochs
+        self._orders: dict = {}
+        self._ranges: dict = {}          # (start, end) → bitmap, least recently used first
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        total = self.all.nbytes + self.day_rows.nbytes + self.day_keys.nbytes + self.day_offsets.nbytes
+        total += sum(bm.nbytes for bitmaps in self.values.values() for bm in bitmaps.values())
+        total += sum(bm.nbytes for bm in list(self._ranges.values()))
+        return total + sum(order.nbytes for order in self._orders.values())
+
+    # ─── FILTERS ─────────────────────────────────────────────────────────────
+
+    def equals(self, col: str, value) -> np.ndarray:
+        """Rows where `col` == value (an empty bitmap for unseen values)."""
+        return self.values[col].get(value, np.zeros_like(self.all))
+
+    def date_range(self, start: int | None, end: int | None) -> np.ndarray:
+        """Rows with a parsed timestamp in [start, end), like /api/trends. Recent ranges are cached."""
+        key = (start, end)
+        with self._lock:
+            cached = self._ranges.pop(key, None)
+            if cached is not None:
+                self._ranges[key] = cached
+                return cached
+        days = self.day_keys
+        lo = 0 if start is None else np.searchsorted(days, start // DAY)
+        hi = len(days) if end is None else np.searchsorted(days, -(-end // DAY))
+        # Whole days go straight in; only the first and last day can be partly outside the range
+        full_lo = lo + bool(start is not None and start % DAY and lo < hi and days[lo] == start // DAY)
+        full_hi = hi - bool(end is not None and end % DAY and full_lo < hi and days[hi - 1] == end // DAY)
+        mask = np.zeros(self.n, dtype=bool)
+        mask[self.day_rows[self.day_offsets[full_lo]:self.day_offsets[full_hi]]] = True
+        for day in {lo, hi - 1} - set(range(full_lo, full_hi)):
+            if lo <= day < hi:
+                rows = self.day_rows[self.day_offsets[day]:self.day_offsets[day + 1]]
+                ts = self.epochs[rows]
+                inside = np.ones(len(rows), dtype=bool)
+                if start is not None:
+                    inside &= ts >= start
+                if end is not None:
+                    inside &= ts < end
+                mask[rows[inside]] = True
+        bitmap = pack(mask)
+        with self._lock:
+            self._ranges[key] = bitmap
+            while len(self._ranges) > RANGE_CACHE:
+                self._ranges.pop(next(iter(self._ranges)))
+        return bitmap
+
+    def select(self, start: int | None = None, end: int | None = None, **equal) -> np.ndarray:
+        """AND of column == value filters (None values are skipped) and an optional date range."""
+        result = self.all
+        for col, value in equal.items():
+            if value is not None:
+                result = result & self.equals(col, value)
+        if start is not None or end is not None:
+            result = result & self.date_range(start, end)
+        return result
+
+    # ─── ORDER ───────────────────────────────────────────────────────────────
+
+    def order(self, col: str, descending: bool) -> np.ndarray:
+        """Row ids in df.sort_values(col, kind='stable') order (NaN last), cached."""
+        key = (col, descending)
+        with self._lock:
+            order = self._orders.get(key)
+            if order is None:
+                series = self.frame[col].reset_index(drop=True)
+                order = series.sort_values(ascending=not descending, kind='stable').index.to_numpy()
+                order = self._orders[key] = order.astype(self.day_rows.dtype)
+        return order
+
+    def ordered(self, bitmap: np.ndarray, order: np.ndarray) -> np.ndarray:
+        """The bitmap's rows, in `order`."""
+        return order[test(bitmap, order)]
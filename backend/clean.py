@@ -12,13 +12,20 @@ What this does:
 - Removes stopwords (is, the, an, a, ...)
 - Removes empty/null comments
 - Returns a cleaned pandas DataFrame ready for analysis
+- For raw dumps larger than RAM, iter_clean_chunks() streams the CSV in
+  fixed-size chunks and cleans them across a process pool
 
 In your VIVA, explain this as: "We remove noise from raw Reddit text
 so the sentiment model gets clean, meaningful words to analyze."
 """
 
+import os
 import re
 import string
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 
 
@@ -37,23 +44,26 @@ STOPWORDS = {
 }
 
 
+# ─── PRECOMPILED PATTERNS ────────────────────────────────────────────────────
+# Built once at import time instead of on every call.
+URL_RE        = re.compile(r'http\S+|www\.\S+')
+WHITESPACE_RE = re.compile(r'\s+')
+PUNCT_TABLE   = str.maketrans('', '', string.punctuation)
+
+
 def remove_urls(text: str) -> str:
     """Remove all URLs from text (http, https, www)."""
-    text = re.sub(r'http\S+', '', text)
-    text = re.sub(r'www\.\S+', '', text)
-    return text
+    return URL_RE.sub('', text)
 
 
 def remove_punctuation(text: str) -> str:
     """Remove all punctuation characters."""
-    return text.translate(str.maketrans('', '', string.punctuation))
+    return text.translate(PUNCT_TABLE)
 
 
 def remove_stopwords(text: str) -> str:
     """Remove common English stopwords from text."""
-    words = text.split()
-    filtered = [w for w in words if w not in STOPWORDS]
-    return ' '.join(filtered)
+    return ' '.join(w for w in text.split() if w not in STOPWORDS)
 
 
 def clean_text(text: str) -> str:
@@ -64,18 +74,31 @@ def clean_text(text: str) -> str:
       2. Remove URLs
       3. Lowercase
       4. Remove punctuation
-      5. Remove stopwords
-      6. Remove extra whitespace
+      5. Remove stopwords + collapse whitespace (one split/join)
     """
-    if not isinstance(text, str) or text.strip() == '':
+    if not isinstance(text, str):
         return ''
+    words = URL_RE.sub('', text).lower().translate(PUNCT_TABLE).split()
+    return ' '.join(w for w in words if w not in STOPWORDS)
 
-    text = remove_urls(text)           # Step 1: URLs gone
-    text = text.lower()                # Step 2: lowercase
-    text = remove_punctuation(text)    # Step 3: no punctuation
-    text = remove_stopwords(text)      # Step 4: stopwords removed
-    text = re.sub(r'\s+', ' ', text)   # Step 5: collapse spaces
-    return text.strip()
+
+def clean_series(texts: pd.Series) -> pd.Series:
+    """
+    Column version of clean_text — same output as texts.apply(clean_text).
+    URL removal, lowercasing and punctuation stripping run as pandas string
+    ops over the whole column; stopword filtering and whitespace collapsing
+    are then one split/join per row. Missing values become ''.
+    """
+    texts = texts.astype(object).where(texts.map(lambda t: isinstance(t, str)), '')
+    stripped = (
+        texts.str.replace(URL_RE, '', regex=True)
+        .str.lower()
+        .str.translate(PUNCT_TABLE)
+    )
+    return pd.Series(
+        [' '.join([w for w in t.split() if w not in STOPWORDS]) for t in stripped],
+        index=texts.index, dtype=object,
+    )
 
 
 def load_and_clean(csv_path: str = 'reddit_data.csv') -> pd.DataFrame:
@@ -90,26 +113,121 @@ def load_and_clean(csv_path: str = 'reddit_data.csv') -> pd.DataFrame:
 
     print(f"[clean.py] Loaded {len(df)} rows.")
 
-    # Drop rows where comment is empty/null
+    # Drop empty/null comments, clean the column, drop rows that cleaned to ''
     original_count = len(df)
+    df = _clean_frame(df)
+    print(f"[clean.py] Removed {original_count - len(df)} empty rows.")
+
+    print(f"[clean.py] Cleaning complete. {len(df)} valid comments ready for analysis.")
+    return df
+
+
+def _clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop empty comments, add 'cleaned_comment' and drop rows that clean to ''."""
     df = df.dropna(subset=['comment'])
-    df = df[df['comment'].str.strip() != '']
-    print(f"[clean.py] Removed {original_count - len(df)} empty rows. {len(df)} rows remain.")
+    df = df[df['comment'].astype(str).str.strip() != '']
+    df = df.assign(cleaned_comment=clean_series(df['comment']))
+    return df[df['cleaned_comment'] != '']
 
-    # Apply the cleaning pipeline to each comment
-    df['cleaned_comment'] = df['comment'].apply(clean_text)
 
-    # Drop rows where cleaning resulted in empty string
-    df = df[df['cleaned_comment'] != '']
+def _clean_chunk(chunk: pd.DataFrame, then=None) -> pd.DataFrame:
+    """Process-pool worker: clean one chunk, then apply the optional `then` step."""
+    chunk = _clean_frame(chunk)
+    return then(chunk) if then is not None else chunk
 
-    print(f"[clean.py] Cleaning complete. {len(df)} valid comments ready for analysis.")
-    return df
+
+def _skip_records(reader, skip: int):
+    """
+    Drop the first `skip` records of a chunked reader. Counted in parsed
+    records, not file lines: read_csv's skiprows sees physical lines, and a
+    quoted comment spanning several lines would shift the resume point.
+    """
+    for chunk in reader:
+        if skip >= len(chunk):
+            skip -= len(chunk)
+            continue
+        if skip:
+            chunk, skip = chunk.iloc[skip:], 0
+        yield chunk
+
+
+def iter_clean_chunks(csv_path: str, chunksize: int = 50_000, workers: int | None = None,
+                      then=None, skip_rows: int = 0):
+    """
+    Stream a raw CSV in `chunksize`-row chunks, cleaning them across a
+    process pool. Yields (raw_rows, cleaned_df) tuples in file order, where
+    raw_rows is how many input rows the chunk consumed.
+
+    At most 2 × workers chunks are in flight, so memory stays bounded no
+    matter how large the file is. `then` is an optional top-level function
+    run on each cleaned chunk inside the worker (analyze.py uses it to score
+    there too). `skip_rows` skips that many records after the header.
+    """
+    workers = workers or os.cpu_count() or 1
+    reader = _skip_records(pd.read_csv(csv_path, chunksize=chunksize), skip_rows)
+    print(f"[clean.py] Streaming {csv_path} in chunks of {chunksize} rows across {workers} workers")
+
+    started = time.perf_counter()
+    rows_read = rows_kept = 0
+    chunk_no = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+
+        def _collect():
+            nonlocal rows_read, rows_kept, chunk_no
+            future, raw_rows = pending.popleft()
+            cleaned = future.result()
+            chunk_no += 1
+            rows_read += raw_rows
+            rows_kept += len(cleaned)
+            rate = rows_read / max(time.perf_counter() - started, 1e-9)
+            print(f"[clean.py] chunk #{chunk_no}: {rows_read} rows read, {rows_kept} kept ({rate:,.0f} rows/s)")
+            return raw_rows, cleaned
+
+        for chunk in reader:
+            pending.append((pool.submit(_clean_chunk, chunk, then), len(chunk)))
+            if len(pending) >= workers * 2:
+                yield _collect()
+        while pending:
+            yield _collect()
+
+    print(f"[clean.py] Cleaning complete. {rows_kept} of {rows_read} rows kept.")
+
+
+def benchmark(rows: int = 100_000) -> dict:
+    """
+    Measure cleaning throughput in rows/sec on `rows` synthetic comments,
+    per-row clean_text vs the vectorised clean_series.
+    """
+    base = [
+        "This is INCREDIBLE!!! Check out https://openai.com for more info.",
+        "The new API pricing changes are absolutely devastating for developers.",
+        "I don't know... it's okay I guess. Nothing special.",
+        "Honestly www.example.com/thread has the best write-up on this, 10/10",
+        "",
+    ]
+    texts = pd.Series([base[i % len(base)] + f" #{i}" for i in range(rows)])
+
+    results = {'rows': rows}
+    for name, fn in (('clean_text', lambda s: s.apply(clean_text)), ('clean_series', clean_series)):
+        started = time.perf_counter()
+        fn(texts)
+        elapsed = time.perf_counter() - started
+        results[name] = {'seconds': round(elapsed, 3), 'rows_per_sec': round(rows / elapsed)}
+    return results
 
 
 # ─── STANDALONE TEST ─────────────────────────────────────────────────────────
 if __name__ == '__main__':
-    # Run: python clean.py
-    # This lets you test the cleaner on its own during development
+    # Run: python clean.py            → cleaning demo
+    #      python clean.py --bench N  → throughput benchmark on N rows
+    if '--bench' in sys.argv:
+        idx = sys.argv.index('--bench')
+        n = int(sys.argv[idx + 1]) if len(sys.argv) > idx + 1 else 100_000
+        for name, r in benchmark(n).items():
+            print(f"  {name:<13}: {r}")
+        sys.exit(0)
+
     sample_texts = [
         "This is INCREDIBLE!!! Check out https://openai.com for more info.",
         "The new API pricing changes are absolutely devastating for developers.",
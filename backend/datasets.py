@@ -0,0 +1,367 @@
+"""
+datasets.py — SHARED, MEMORY-MAPPED UPLOADED DATASETS
+======================================================
+In multi-worker mode (RUN_MODE=multi) an upload can land on any worker.
+So the uploaded DataFrame is published to DATASET_DIR as a columnar store,
+and every worker memory-maps the same files read-only. The OS page cache
+holds one copy, so total memory stays ~1× the dataset no matter how many
+workers attach.
+
+Layout of DATASET_DIR/<version>/:
+    meta.json                  → rows, column order and kinds
+    <col>.npy                  → numeric columns (float64 / int64 / bool)
+    <col>.codes.npy + .cats    → CATEGORY_COLUMNS as categorical codes; the
+                                 handful of category strings is decoded per worker
+    <col>.bin + .offsets.npy   → every other string column: UTF-8 rows joined
+                                 by NUL bytes, plus row start offsets
+    <col>.lower.bin + ...      → lowercased copy for LOWER_COLUMNS (searched)
+    _row.npy                   → 0..n-1, so filtered / sorted frames can find
+                                 their rows in the text columns
+    upload.json                → the upload meta (filename, rows, ...), so a
+                                 version can be listed without attaching it
+    aggregates.json            → precomputed whole-dataset payloads (registry.py)
+DATASET_DIR/current.json       → {"version": ...} of the ACTIVE upload; version
+                                 is null after /api/clear-data
+
+How it works:
+  - load() builds a DataFrame whose numeric and categorical columns are
+    views over the mmaps (no copy). Free-text columns are not DataFrame
+    columns at all: they stay as TextColumn objects over the mmap.
+    text_values() decodes only the rows an endpoint returns, and
+    text_contains() / text_searcher() search the raw bytes with a
+    compiled regex.
+  - save() writes a version directory under a temp name and renames it
+    into place, so a directory that exists is always complete.
+    activate() then swaps current.json with an atomic os.replace().
+    Readers see the old dataset or the new one, never half of one.
+  - Versions are named datasets (see registry.py): they stay on disk
+    until remove() deletes them, whichever one is active.
+  - read_pointer() costs one os.stat() per call. Workers call it before
+    each request and attach to the new version when it moves. Old
+    directories can be deleted while attached, because the mappings stay
+    valid until unmapped.
+
+In single-process mode uploads stay plain DataFrames, and a version is
+only written here when registry.py evicts one from memory. text_values()
+and text_contains() accept both forms (text=None → regular columns).
+"""
+
+import json
+import mmap
+import os
+import re
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+DATASET_DIR      = os.getenv('DATASET_DIR', os.path.join(os.path.dirname(__file__), 'datasets'))
+POINTER          = 'current.json'
+UPLOAD_FILE      = 'upload.json'
+AGGREGATES_FILE  = 'aggregates.json'
+CATEGORY_COLUMNS = ('subreddit', 'sentiment_label')   # compared / grouped by the endpoints
+LOWER_COLUMNS    = ('comment',)                       # searched case-insensitively
+ROW_COLUMN       = '_row'
+
+_pointer_cache = (None, None)     # (stat key, parsed pointer)
+_lock = threading.Lock()
+
+
+# ─── TEXT COLUMNS ────────────────────────────────────────────────────────────
+
+def _map(path: str):
+    """Read-only mmap of a file (b'' for an empty file, which mmap refuses)."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _write_text(path: str, values: list):
+    encoded = [v.replace('\x00', '').encode('utf-8') for v in values]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum(lengths + 1, out=offsets[1:])
+    with open(path + '.bin', 'wb') as f:
+        for chunk_start in range(0, len(encoded), 100_000):
+            chunk = encoded[chunk_start:chunk_start + 100_000]
+            f.write(b'\x00'.join(chunk) + b'\x00')
+    np.save(path + '.offsets.npy', offsets)
+
+
+class TextColumn:
+    """A read-only string column over a memory-mapped UTF-8 blob."""
+
+    def __init__(self, path: str, lower_path: str | None = None):
+        self.buf = _map(path + '.bin')
+        self.offsets = np.load(path + '.offsets.npy', mmap_mode='r')
+        self.lower = None
+        if lower_path:
+            self.lower = (_map(lower_path + '.bin'), np.load(lower_path + '.offsets.npy', mmap_mode='r'))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        total = len(self.buf) + self.offsets.nbytes
+        if self.lower:
+            total += len(self.lower[0]) + self.lower[1].nbytes
+        return total
+
+    def take(self, rows) -> list:
+        """Decode just these rows."""
+        o, buf = self.offsets, self.buf
+        return [buf[o[i]:o[i + 1] - 1].decode('utf-8') for i in rows]
+
+    def contains(self, needle: str) -> np.ndarray:
+        """
+        Boolean mask over ALL rows: does the row contain `needle`? Uses the
+        lowercased copy when there is one (callers pass a lowercase needle).
+        One regex pass over the bytes; each hit jumps to the row's end, so
+        a row is reported once and matches never span rows.
+        """
+        buf, offsets = self.lower if self.lower else (self.buf, self.offsets)
+        mask = np.zeros(len(self), dtype=bool)
+        needle_b = needle.replace('\x00', '').encode('utf-8')
+        if not needle_b:
+            mask[:] = True
+            return mask
+        pattern = re.compile(re.escape(needle_b) + rb'[^\x00]*')
+        ends = np.fromiter((m.end() for m in pattern.finditer(buf)), dtype=np.int64)
+        mask[np.searchsorted(offsets, ends, side='right') - 1] = True
+        return mask
+
+
+class SharedDataset:
+    """An attached version: .frame (zero-copy DataFrame) + .text (TextColumns)."""
+
+    def __init__(self, version: str, frame: pd.DataFrame, text: dict, nbytes: int):
+        self.version = version
+        self.frame = frame
+        self.text = text
+        self.nbytes = nbytes
+
+
+# ─── POINTER ─────────────────────────────────────────────────────────────────
+
+def _pointer_path() -> str:
+    return os.path.join(DATASET_DIR, POINTER)
+
+
+def _write_pointer(data: dict):
+    os.makedirs(DATASET_DIR, exist_ok=True)
+    tmp = f'{_pointer_path()}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, _pointer_path())
+
+
+def read_pointer() -> dict:
+    """Current {'version', 'meta'}; {'version': None} when nothing was uploaded."""
+    global _pointer_cache
+    try:
+        st = os.stat(_pointer_path())
+    except FileNotFoundError:
+        return {'version': None, 'meta': {}}
+    key = (st.st_mtime_ns, st.st_size, st.st_ino)
+    with _lock:
+        if _pointer_cache[0] == key:
+            return _pointer_cache[1]
+    try:
+        with open(_pointer_path()) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {'version': None, 'meta': {}}
+    with _lock:
+        _pointer_cache = (key, data)
+    return data
+
+
+# ─── PUBLISH / LOAD ──────────────────────────────────────────────────────────
+
+def write_columns(df: pd.DataFrame, path: str) -> dict:
+    """Write df as a columnar store in directory `path`. Returns the layout (meta.json)."""
+    os.makedirs(path, exist_ok=True)
+    layout = {'rows': len(df), 'columns': []}
+    for col in df.columns:
+        series = df[col]
+        target = os.path.join(path, col)
+        if col in CATEGORY_COLUMNS:
+            codes, cats = pd.factorize(series.astype(str))
+            dtype = np.int8 if len(cats) < 127 else (np.int16 if len(cats) < 32767 else np.int32)
+            np.save(target + '.codes.npy', codes.astype(dtype))
+            _write_text(target + '.cats', [str(c) for c in cats])
+            kind = 'category'
+        elif pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            np.save(target + '.npy', series.to_numpy())
+            kind = 'numeric'
+        else:
+            # Missing values are stored as '' so they never read or match as 'nan'
+            values = series.astype(object).where(series.notna(), '').astype(str).tolist()
+            _write_text(target, values)
+            if col in LOWER_COLUMNS:
+                _write_text(target + '.lower', [v.lower() for v in values])
+            kind = 'text'
+        layout['columns'].append({'name': col, 'kind': kind})
+    np.save(os.path.join(path, ROW_COLUMN + '.npy'), np.arange(len(df), dtype=np.int64))
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(layout, f)
+    return layout
+
+
+def open_columns(path: str, version: str = '') -> SharedDataset:
+    """Attach to a columnar store read-only."""
+    with open(os.path.join(path, 'meta.json')) as f:
+        layout = json.load(f)
+    data, text, nbytes = {}, {}, 0
+    for entry in layout['columns']:
+        col, kind = entry['name'], entry['kind']
+        target = os.path.join(path, col)
+        if kind == 'numeric':
+            arr = np.load(target + '.npy', mmap_mode='r')
+            data[col], nbytes = arr, nbytes + arr.nbytes
+        elif kind == 'category':
+            codes = np.load(target + '.codes.npy', mmap_mode='r')
+            cats = TextColumn(target + '.cats')
+            data[col] = pd.Categorical.from_codes(codes, cats.take(range(len(cats))), validate=False)
+            nbytes += codes.nbytes
+        else:
+            lower = target + '.lower' if col in LOWER_COLUMNS else None
+            text[col] = TextColumn(target, lower)
+            nbytes += text[col].nbytes
+    rows = np.load(os.path.join(path, ROW_COLUMN + '.npy'), mmap_mode='r')
+    data[ROW_COLUMN] = rows
+    frame = pd.DataFrame(data, copy=False)
+    return SharedDataset(version, frame, text, nbytes + rows.nbytes)
+
+
+def new_version() -> str:
+    return f'{time.time_ns():x}-{os.getpid()}'
+
+
+def save(df: pd.DataFrame, meta: dict, version: str) -> str:
+    """Write df (and its upload meta) as DATASET_DIR/<version>. Returns the directory."""
+    os.makedirs(DATASET_DIR, exist_ok=True)
+    tmp = os.path.join(DATASET_DIR, f'.{version}.tmp')
+    write_columns(df, tmp)
+    with open(os.path.join(tmp, UPLOAD_FILE), 'w') as f:
+        json.dump(meta, f)
+    path = os.path.join(DATASET_DIR, version)
+    os.replace(tmp, path)
+    return path
+
+
+def activate(version: str | None, meta: dict | None = None):
+    """Point every worker, and the next process, at a saved version (None → SQLite mode)."""
+    _write_pointer({'version': version, 'meta': meta or {}})
+
+
+def exists(version: str) -> bool:
+    return _valid_name(version) and os.path.isfile(os.path.join(DATASET_DIR, version, 'meta.json'))
+
+
+def load(version: str) -> SharedDataset:
+    """Attach to a saved version. Raises FileNotFoundError if it was removed."""
+    if not _valid_name(version):
+        raise FileNotFoundError(version)
+    return open_columns(os.path.join(DATASET_DIR, version), version)
+
+
+def remove(version: str):
+    """Delete a saved version. Workers still attached keep their mappings."""
+    if _valid_name(version):
+        shutil.rmtree(os.path.join(DATASET_DIR, version), ignore_errors=True)
+
+
+def touch(version: str):
+    """Record a use of a saved version (meta.json's mtime), seen by every worker and after restarts."""
+    try:
+        os.utime(os.path.join(DATASET_DIR, version, 'meta.json'))
+    except OSError:
+        pass
+
+
+def last_used(version: str) -> float:
+    """When a saved version was last touch()ed (or written); 0 when it is gone."""
+    try:
+        return os.path.getmtime(os.path.join(DATASET_DIR, version, 'meta.json'))
+    except OSError:
+        return 0.0
+
+
+def saved_versions() -> dict:
+    """{version: upload meta} of every saved version."""
+    if not os.path.isdir(DATASET_DIR):
+        return {}
+    return {name: upload_meta(name) for name in os.listdir(DATASET_DIR) if exists(name)}
+
+
+def upload_meta(version: str) -> dict:
+    try:
+        with open(os.path.join(DATASET_DIR, version, UPLOAD_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_aggregates(version: str, data: dict):
+    """Replace DATASET_DIR/<version>/aggregates.json atomically."""
+    path = os.path.join(DATASET_DIR, version, AGGREGATES_FILE)
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def load_aggregates(version: str) -> dict:
+    try:
+        with open(os.path.join(DATASET_DIR, version, AGGREGATES_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _valid_name(version: str) -> bool:
+    return bool(version) and os.path.basename(version) == version and not version.startswith('.')
+
+
+# ─── ACCESS HELPERS (plain or shared frames) ─────────────────────────────────
+
+def text_values(df: pd.DataFrame, text: dict | None, col: str, default: str = '') -> list:
+    """
+    str() of `col` for each row of df, decoding shared text only for these
+    rows. Missing values (stored as '' in shared text) come back as default.
+    """
+    if text and col in text:
+        return [v or default for v in text[col].take(df[ROW_COLUMN].to_numpy())]
+    if col in df.columns:
+        series = df[col]
+        return [v or default for v in series.astype(object).where(series.notna(), '').astype(str)]
+    return [default] * len(df)
+
+
+def text_searcher(df: pd.DataFrame, text: dict | None, col: str):
+    """
+    needle → mask over df's rows (case-insensitive literal substring match
+    in `col`), for callers that search one column for many needles. A plain
+    column is lowercased once here rather than once per needle; missing
+    values stay missing and never match.
+    """
+    if text and col in text:
+        rows, column = df[ROW_COLUMN].to_numpy(), text[col]
+        return lambda needle: column.contains(needle)[rows]
+    if col not in df.columns:
+        return lambda needle: np.zeros(len(df), dtype=bool)
+    lowered = df[col].astype('string').str.lower()      # NaN → <NA>, not 'nan'
+    return lambda needle: lowered.str.contains(needle, regex=False, na=False).to_numpy(dtype=bool)
+
+
+def text_contains(df: pd.DataFrame, text: dict | None, col: str, needle: str) -> np.ndarray:
+    """Mask over df's rows: case-insensitive literal substring match in `col`."""
+    return text_searcher(df, text, col)(needle)
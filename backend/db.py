@@ -1,41 +1,309 @@
 import sqlite3
 import os
-from datetime import datetime
+import re
+import json
+import time
+from datetime import datetime, timezone
+
+from metrics import DB_QUERY_SECONDS
 
 DB_PATH = os.path.join(os.path.dirname(__file__), 'reddit.db')
 
+# Single-row leases used to elect one process (e.g. the scheduler owner) among workers
+LEASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT,
+    expires_at REAL,
+    state TEXT
+)
+"""
+
+# Downsampled history that outlives the raw rows (filled by retention.py).
+# bucket is the UTC hour 'YYYY-MM-DDTHH' or day 'YYYY-MM-DD'.
+SUMMARY_TABLES = {'hour': 'posts_hourly', 'day': 'posts_daily'}
+SUMMARY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    bucket TEXT NOT NULL,
+    subreddit TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    positive INTEGER NOT NULL,
+    neutral INTEGER NOT NULL,
+    negative INTEGER NOT NULL,
+    score_sum REAL NOT NULL,
+    upvotes_sum INTEGER NOT NULL,
+    PRIMARY KEY (bucket, subreddit)
+)
+"""
+
+# Mergeable stream sketches (sketches.py): one serialized HLL / t-digest per name
+SKETCH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sketches (
+    name TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    data BLOB NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+# Cross-worker event log (events.py relay, RUN_MODE=multi): each worker appends
+# what it publishes and re-publishes the others' rows. Only the newest EVENT_KEEP stay.
+EVENT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    origin TEXT NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+EVENT_KEEP = 500
+
+# analyze-url job records shared between workers (url_analysis.py, RUN_MODE=multi)
+URL_JOB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS url_jobs (
+    job_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+URL_JOB_KEEP = 500
+
+# ─── PARTITIONS ──────────────────────────────────────────────────────────────
+# Raw rows live in one table per UTC month, posts_YYYY_MM, chosen from
+# created_time. Dropping a month is a DROP TABLE rather than millions of
+# DELETEs, and recent-data queries only open the newest table.
+# `posts` is a read-only view over every partition (rebuilt whenever one is
+# added or dropped) for ad-hoc SQL; hot paths loop over partitions_for().
+POSTS_COLUMNS = """(
+    id TEXT PRIMARY KEY,
+    subreddit TEXT,
+    title TEXT,
+    author TEXT,
+    comment TEXT,
+    cleaned_comment TEXT,
+    sentiment_score REAL,
+    sentiment_label TEXT,
+    vader_pos REAL,
+    vader_neu REAL,
+    vader_neg REAL,
+    upvotes INTEGER,
+    created_time TEXT
+)"""
+PARTITION_RE      = re.compile(r'^posts_(\d{4})_(\d{2})$')
+UNDATED_PARTITION = 'posts_0000_00'       # rows whose created_time has no YYYY-MM
+LEGACY_TABLE      = 'posts_legacy'        # pre-partitioning `posts`, drained by init_db()
+MIGRATE_BATCH     = 5000
+
+_known_partitions: dict = {}              # DB_PATH → partitions this process created or saw
+
+
+def _schema_conn() -> sqlite3.Connection:
+    return sqlite3.connect(DB_PATH, timeout=10, isolation_level=None)
+
+
+def partition_for(created_time) -> str:
+    """Partition table for a created_time ('YYYY-MM…' → posts_YYYY_MM)."""
+    m = re.match(r'(\d{4})-(\d{2})', str(created_time or ''))
+    return f'posts_{m.group(1)}_{m.group(2)}' if m else UNDATED_PARTITION
+
+
+def partition_bounds(name: str) -> tuple:
+    """[start, end) of a partition as 'YYYY-MM' prefixes, comparable with created_time."""
+    year, month = map(int, PARTITION_RE.match(name).groups())
+    nxt = (year + month // 12, month % 12 + 1)
+    return f'{year:04d}-{month:02d}', f'{nxt[0]:04d}-{nxt[1]:02d}'
+
+
+def list_partitions(conn: sqlite3.Connection) -> list:
+    """All partition tables, oldest month first."""
+    names = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    return sorted(n for n in names if PARTITION_RE.match(n))
+
+
+def partitions_for(conn: sqlite3.Connection, start: str | None = None, end: str | None = None,
+                   newest_first: bool = False) -> list:
+    """
+    Partitions that can hold rows with start <= created_time < end (ISO
+    strings, either bound optional). The undated partition only matches
+    an unbounded start.
+    """
+    chosen = []
+    for name in list_partitions(conn):
+        if name == UNDATED_PARTITION:
+            if start is None:
+                chosen.append(name)
+            continue
+        lo, hi = partition_bounds(name)
+        if (start is None or hi > start) and (end is None or lo < end):
+            chosen.append(name)
+    return chosen[::-1] if newest_first else chosen
+
+
+def _rebuild_view(conn: sqlite3.Connection):
+    """Point the `posts` view at the current partitions. Caller holds a write transaction."""
+    names = list_partitions(conn)
+    conn.execute("DROP VIEW IF EXISTS posts")
+    if names:
+        conn.execute("CREATE VIEW posts AS " + " UNION ALL ".join(f"SELECT * FROM {n}" for n in names))
+
+
+def _table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+
+def _create_partition(conn: sqlite3.Connection, name: str):
+    """Create partition `name` and refresh the view if missing. Caller holds a write transaction."""
+    if not _table_exists(conn, name):
+        conn.execute(f"CREATE TABLE {name} {POSTS_COLUMNS}")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_created_time ON {name} (created_time)")
+        _rebuild_view(conn)
+
+
+def ensure_partition(name: str) -> str:
+    """Create partition `name` (and refresh the view) unless this process already saw it."""
+    known = _known_partitions.setdefault(DB_PATH, set())
+    if name in known:
+        return name
+    conn = _schema_conn()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        _create_partition(conn, name)
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    known.add(name)
+    return name
+
+
+def drop_partition(name: str, conn: sqlite3.Connection | None = None):
+    """
+    Drop a whole month in O(1) row work. With `conn`, runs inside the
+    caller's write transaction (retention.py rolls the month up first).
+    """
+    own = conn is None
+    if own:
+        conn = _schema_conn()
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {name}")
+        _rebuild_view(conn)
+        if own:
+            conn.execute("COMMIT")
+    except Exception:
+        if own:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        if own:
+            conn.close()
+    _known_partitions.setdefault(DB_PATH, set()).discard(name)
+
+
+def _route(rows) -> dict:
+    """Group 13-column rows by partition, creating missing partitions up front
+    (before the caller opens its write transaction, which would block the DDL)."""
+    by_partition: dict = {}
+    for row in rows:
+        by_partition.setdefault(partition_for(row[12]), []).append(row)
+    for name in by_partition:
+        ensure_partition(name)
+    return by_partition
+
+
+def _insert_routed(conn: sqlite3.Connection, by_partition: dict) -> int:
+    """INSERT OR IGNORE rows grouped by _route(). Returns rows written."""
+    before = conn.total_changes
+    for name, part_rows in by_partition.items():
+        conn.executemany(f"INSERT OR IGNORE INTO {name} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", part_rows)
+    return conn.total_changes - before
+
+
+def _migrate_legacy(conn: sqlite3.Connection):
+    """
+    Move rows of the old single `posts` table into month partitions, batch by
+    batch. Every worker of a multi-process server runs this at startup, so the
+    rename and each batch are one BEGIN IMMEDIATE transaction that looks at
+    sqlite_master again once it holds the lock: whoever gets there first
+    renames, and a legacy table that is already gone counts as migrated.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        kind = dict(conn.execute("SELECT name, type FROM sqlite_master WHERE name IN ('posts', ?)", (LEGACY_TABLE,)))
+        if kind.get('posts') == 'table':
+            conn.execute(f"ALTER TABLE posts RENAME TO {LEGACY_TABLE}")
+            conn.execute("DROP INDEX IF EXISTS idx_posts_created_time")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    moved = 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if not _table_exists(conn, LEGACY_TABLE):
+                conn.execute("COMMIT")
+                break
+            rows = conn.execute(f"SELECT rowid, * FROM {LEGACY_TABLE} LIMIT ?", (MIGRATE_BATCH,)).fetchall()
+            if not rows:
+                conn.execute(f"DROP TABLE {LEGACY_TABLE}")
+                conn.execute("COMMIT")
+                break
+            routed: dict = {}
+            for row in rows:
+                routed.setdefault(partition_for(row[13]), []).append(row[1:])
+            for name in routed:                       # inside this transaction: ensure_partition would wait on it
+                _create_partition(conn, name)
+            _insert_routed(conn, routed)
+            conn.executemany(f"DELETE FROM {LEGACY_TABLE} WHERE rowid = ?", [(r[0],) for r in rows])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        moved += len(rows)
+    if moved:
+        print(f"[db.py] Migrated {moved} rows from the single posts table into monthly partitions")
+
+
+@DB_QUERY_SECONDS.timed(query='init_db')
 def init_db():
-    """Initialize the SQLite database and create the posts table if it doesn't exist."""
+    """Initialize the SQLite database: current month's partition, summaries, leases, sketches and relays."""
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS posts (
-        id TEXT PRIMARY KEY,
-        subreddit TEXT,
-        title TEXT,
-        author TEXT,
-        comment TEXT,
-        cleaned_comment TEXT,
-        sentiment_score REAL,
-        sentiment_label TEXT,
-        vader_pos REAL,
-        vader_neu REAL,
-        vader_neg REAL,
-        upvotes INTEGER,
-        created_time TEXT
-    )
-    """)
+    # WAL: readers never wait on the scheduler's or retention's writes.
+    # auto_vacuum only takes effect on a new file; retention.py converts old ones.
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    cursor.execute("PRAGMA journal_mode = WAL")
+    for table in SUMMARY_TABLES.values():
+        cursor.execute(SUMMARY_SCHEMA.format(table=table))
+    cursor.execute(LEASE_SCHEMA)
+    cursor.execute(SKETCH_SCHEMA)
+    cursor.execute(EVENT_SCHEMA)
+    cursor.execute(URL_JOB_SCHEMA)
     conn.commit()
     conn.close()
+    _known_partitions.pop(DB_PATH, None)
+    conn = _schema_conn()
+    try:
+        _migrate_legacy(conn)
+    finally:
+        conn.close()
+    ensure_partition(partition_for(datetime.now(timezone.utc).isoformat()))
     print(f"[db.py] Database initialized at {DB_PATH}")
 
-def insert_post(post_data: dict):
-    """Insert a single analyzed post/comment into the database. Ignores duplicates."""
+@DB_QUERY_SECONDS.timed(query='insert_post')
+def insert_post(post_data: dict) -> bool:
+    """
+    Insert a single analyzed post/comment into its month partition. Ignores duplicates.
+    Returns True if a new row was written.
+    """
+    table = ensure_partition(partition_for(post_data.get('created_time')))
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
+    inserted = False
     try:
-        cursor.execute("""
-        INSERT OR IGNORE INTO posts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        cursor.execute(f"""
+        INSERT OR IGNORE INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             post_data['id'],
             post_data['subreddit'],
@@ -52,29 +320,69 @@ def insert_post(post_data: dict):
             post_data['created_time']
         ))
         conn.commit()
+        inserted = cursor.rowcount > 0
     except Exception as e:
         print(f"[db.py] Error inserting post {post_data.get('id')}: {e}")
     finally:
         conn.close()
+    return inserted
+
+@DB_QUERY_SECONDS.timed(query='insert_many')
+def insert_many(rows) -> int:
+    """Bulk-insert 13-column post tuples (posts column order), routed by month. Returns rows written."""
+    routed = _route(rows)
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        written = _insert_routed(conn, routed)
+        conn.commit()
+    finally:
+        conn.close()
+    return written
 
+@DB_QUERY_SECONDS.timed(query='get_all_posts')
 def get_all_posts(limit=1000):
-    """Fetch all posts from the database, sorted by time descending."""
+    """Fetch the newest posts, sorted by time descending. Stops at the partition that fills `limit`."""
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM posts ORDER BY created_time DESC LIMIT ?", (limit,))
-    rows = [dict(row) for row in cursor.fetchall()]
+    rows = []
+    for name in partitions_for(conn, newest_first=True):
+        if len(rows) >= limit:
+            break
+        cursor = conn.execute(f"SELECT * FROM {name} ORDER BY created_time DESC LIMIT ?", (limit - len(rows),))
+        rows.extend(dict(row) for row in cursor.fetchall())
     conn.close()
     return rows
 
+def scan_posts(columns: tuple, batch: int = MIGRATE_BATCH):
+    """Yield `columns` tuples of every raw post, partition by partition, in batches."""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        for name in partitions_for(conn):
+            cursor = conn.execute(f"SELECT {', '.join(columns)} FROM {name}")
+            while rows := cursor.fetchmany(batch):
+                yield from rows
+    finally:
+        conn.close()
+
+@DB_QUERY_SECONDS.timed(query='get_stats')
 def get_stats():
     """Calculate aggregate sentiment statistics from the database."""
     conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT COUNT(*) FROM posts")
-    total = cursor.fetchone()[0]
-    
+    total = pos = neg = neu = scored = 0
+    score_sum = 0.0
+    for name in partitions_for(conn):
+        t, p, n, u, c, s = conn.execute(f"""
+        SELECT COUNT(*),
+               COUNT(CASE WHEN sentiment_label = 'Positive' THEN 1 END),
+               COUNT(CASE WHEN sentiment_label = 'Negative' THEN 1 END),
+               COUNT(CASE WHEN sentiment_label = 'Neutral'  THEN 1 END),
+               COUNT(sentiment_score), TOTAL(sentiment_score)
+        FROM {name}
+        """).fetchone()
+        total, pos, neg, neu = total + t, pos + p, neg + n, neu + u
+        scored, score_sum = scored + c, score_sum + s
+    conn.close()
+
     if total == 0:
         return {
             'total_posts': 0,
@@ -83,27 +391,143 @@ def get_stats():
             'neutral_count': 0,
             'average_sentiment': 0
         }
-    
-    cursor.execute("SELECT COUNT(*) FROM posts WHERE sentiment_label = 'Positive'")
-    pos = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM posts WHERE sentiment_label = 'Negative'")
-    neg = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM posts WHERE sentiment_label = 'Neutral'")
-    neu = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT AVG(sentiment_score) FROM posts")
-    avg_score = cursor.fetchone()[0]
-    
-    conn.close()
     return {
         'total_posts': total,
         'positive_count': pos,
         'negative_count': neg,
         'neutral_count': neu,
-        'average_sentiment': round(float(avg_score or 0), 4)
+        'average_sentiment': round(float(score_sum / scored), 4) if scored else 0
     }
 
+@DB_QUERY_SECONDS.timed(query='acquire_lease')
+def acquire_lease(name: str, owner: str, ttl: float, state: dict | None = None) -> bool:
+    """
+    Take or renew the lease `name` for `owner` for `ttl` seconds. Succeeds when
+    the lease is free, expired or already ours. `state` is stored alongside so
+    other processes can read what the owner is doing.
+    """
+    conn = sqlite3.connect(DB_PATH, timeout=5, isolation_level=None)
+    try:
+        conn.execute(LEASE_SCHEMA)
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+        now = time.time()
+        if row is not None and row[0] != owner and row[1] > now:
+            conn.execute("COMMIT")
+            return False
+        conn.execute(
+            "INSERT OR REPLACE INTO leases (name, owner, expires_at, state) VALUES (?, ?, ?, ?)",
+            (name, owner, now + ttl, json.dumps(state) if state is not None else None),
+        )
+        conn.execute("COMMIT")
+        return True
+    finally:
+        conn.close()
+
+@DB_QUERY_SECONDS.timed(query='release_lease')
+def release_lease(name: str, owner: str):
+    """Give the lease up early (only if we still hold it)."""
+    conn = sqlite3.connect(DB_PATH, timeout=5)
+    conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+    conn.commit()
+    conn.close()
+
+@DB_QUERY_SECONDS.timed(query='get_lease')
+def get_lease(name: str) -> dict | None:
+    """Current holder of `name`: {'owner', 'expires_at', 'state'}, or None."""
+    conn = sqlite3.connect(DB_PATH, timeout=5)
+    try:
+        row = conn.execute("SELECT owner, expires_at, state FROM leases WHERE name = ?", (name,)).fetchone()
+    except sqlite3.OperationalError:
+        row = None            # table not created yet
+    conn.close()
+    if row is None:
+        return None
+    return {'owner': row[0], 'expires_at': row[1], 'state': json.loads(row[2]) if row[2] else None}
+
+@DB_QUERY_SECONDS.timed(query='save_sketches')
+def save_sketches(blobs: dict):
+    """Store {name: (kind, bytes)} in the sketches table, replacing older copies."""
+    conn = sqlite3.connect(DB_PATH, timeout=5)
+    try:
+        conn.execute(SKETCH_SCHEMA)
+        now = time.time()
+        conn.executemany("INSERT OR REPLACE INTO sketches (name, kind, data, updated_at) VALUES (?, ?, ?, ?)",
+                         [(name, kind, data, now) for name, (kind, data) in blobs.items()])
+        conn.commit()
+    finally:
+        conn.close()
+
+@DB_QUERY_SECONDS.timed(query='load_sketches')
+def load_sketches() -> dict:
+    """{name: (kind, bytes)} of the saved sketches ({} before the first save)."""
+    conn = sqlite3.connect(DB_PATH, timeout=5)
+    try:
+        rows = conn.execute("SELECT name, kind, data FROM sketches").fetchall()
+    except sqlite3.OperationalError:
+        rows = []             # table not created yet
+    finally:
+        conn.close()
+    return {name: (kind, bytes(data)) for name, kind, data in rows}
+
+@DB_QUERY_SECONDS.timed(query='append_event')
+def append_event(origin: str, event: str, data: str) -> int:
+    """Add one published event (data is its JSON) to the log, dropping old rows. Returns its seq."""
+    conn = sqlite3.connect(DB_PATH, timeout=5)
+    try:
+        seq = conn.execute("INSERT INTO events (origin, event, data, created_at) VALUES (?, ?, ?, ?)",
+                           (origin, event, data, time.time())).lastrowid
+        conn.execute("DELETE FROM events WHERE seq <= ?", (seq - EVENT_KEEP,))
+        conn.commit()
+        return seq
+    finally:
+        conn.close()
+
+@DB_QUERY_SECONDS.timed(query='events_since')
+def events_since(seq: int, limit: int = 100) -> list:
+    """[(seq, origin, event, data)] logged after seq, oldest first."""
+    conn = sqlite3.connect(DB_PATH, timeout=5)
+    try:
+        return conn.execute("SELECT seq, origin, event, data FROM events WHERE seq > ? ORDER BY seq LIMIT ?",
+                            (seq, limit)).fetchall()
+    except sqlite3.OperationalError:
+        return []             # table not created yet
+    finally:
+        conn.close()
+
+def last_event_seq() -> int:
+    """Newest seq in the event log (0 when empty)."""
+    conn = sqlite3.connect(DB_PATH, timeout=5)
+    try:
+        return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM events").fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0
+    finally:
+        conn.close()
+
+@DB_QUERY_SECONDS.timed(query='save_url_job')
+def save_url_job(job: dict):
+    """Store an analyze-url job record under its job_id, keeping the newest URL_JOB_KEEP."""
+    conn = sqlite3.connect(DB_PATH, timeout=5)
+    try:
+        conn.execute("INSERT OR REPLACE INTO url_jobs (job_id, data, updated_at) VALUES (?, ?, ?)",
+                     (job['job_id'], json.dumps(job), time.time()))
+        conn.execute("DELETE FROM url_jobs WHERE job_id NOT IN "
+                     "(SELECT job_id FROM url_jobs ORDER BY updated_at DESC LIMIT ?)", (URL_JOB_KEEP,))
+        conn.commit()
+    finally:
+        conn.close()
+
+@DB_QUERY_SECONDS.timed(query='load_url_job')
+def load_url_job(job_id: str) -> dict | None:
+    conn = sqlite3.connect(DB_PATH, timeout=5)
+    try:
+        row = conn.execute("SELECT data FROM url_jobs WHERE job_id = ?", (job_id,)).fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    finally:
+        conn.close()
+    return json.loads(row[0]) if row else None
+
 if __name__ == "__main__":
     init_db()
@@ -0,0 +1,412 @@
+"""
+duckdb_engine.py — DUCKDB QUERY ENGINE FOR LARGE UPLOADS
+=========================================================
+With QUERY_ENGINE=duckdb, an uploaded CSV (or Parquet) file is answered
+with SQL in an embedded DuckDB database instead of a pandas DataFrame.
+Uploads of tens of millions of rows never become Python objects: DuckDB
+scans them in parallel and vectorised, and spills to DUCKDB_DIR/tmp when
+a query outgrows DUCKDB_MEMORY_LIMIT.
+
+How it works:
+  - upload_csv streams the file to DUCKDB_DIR/uploads. register_file()
+    then loads it into a new table with read_csv / read_parquet.
+  - Columns are read as text and normalised like the pandas path: names
+    are stripped and lowercased, sentiment_score becomes DOUBLE (0 for
+    garbage), created_time stays text, and created_epoch is parsed once.
+  - Each endpoint method returns the same dict the pandas path in app.py
+    builds. app.py only chooses which one to call. Ties are broken by
+    file order, like the pandas path's stable sorts.
+  - Every query runs on its own cursor, so Flask threads never share a
+    connection.
+  - Each upload is its own table, kept under the upload's dataset id
+    (see registry.py) until drop(). bind(id) returns a view of the
+    engine that queries that table. DuckDB keeps tables on disk, so they
+    don't count against DATASET_MEMORY_MB.
+
+Parity with the pandas path: python -m bench.parity
+Needs `pip install duckdb`. RUN_MODE=multi keeps the pandas engine,
+because a DuckDB file allows only one writer process.
+"""
+
+import copy
+import importlib.util
+import os
+import threading
+import uuid
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+QUERY_ENGINE     = os.getenv('QUERY_ENGINE', 'pandas').lower()     # 'pandas' | 'duckdb'
+DUCKDB_AVAILABLE = importlib.util.find_spec('duckdb') is not None
+DUCKDB_DIR       = os.getenv('DUCKDB_DIR', os.path.join(os.path.dirname(__file__), 'duckdb'))
+MEMORY_LIMIT     = os.getenv('DUCKDB_MEMORY_LIMIT', '2GB')
+THREADS          = int(os.getenv('DUCKDB_THREADS', os.cpu_count() or 4))
+
+LABELS = ('Positive', 'Neutral', 'Negative')
+WEEK_ORIGIN = 4 * 86400                     # same Monday alignment as timeseries.py
+
+
+def _text(col: str) -> str:
+    """SQL for str() of a column as the pandas path renders it (NaN → 'nan')."""
+    return f"COALESCE(CAST({col} AS VARCHAR), 'nan')"
+
+
+def _label_counts() -> str:
+    return ', '.join(f"COUNT(*) FILTER (WHERE sentiment_label = '{label}')" for label in LABELS)
+
+
+class DuckEngine:
+    """One embedded DuckDB database holding the active uploaded dataset."""
+
+    def __init__(self, directory: str = DUCKDB_DIR):
+        import duckdb
+
+        self.dir = directory
+        os.makedirs(os.path.join(directory, 'uploads'), exist_ok=True)
+        os.makedirs(os.path.join(directory, 'tmp'), exist_ok=True)
+        self.con = duckdb.connect(os.path.join(directory, 'analytics.duckdb'))
+        self.con.execute("SET TimeZone = 'UTC'")
+        self.con.execute(f"SET memory_limit = '{MEMORY_LIMIT}'")
+        self.con.execute(f"SET threads = {THREADS}")
+        self.con.execute(f"SET temp_directory = '{os.path.join(directory, 'tmp')}'")
+        self.con.execute("SET preserve_insertion_order = true")
+        self.lock = threading.Lock()
+        self.tables: dict = {}                  # dataset id → (table, columns)
+        self.table: str | None = None           # set on views returned by bind()
+        self.columns: list = []
+        for (name,) in self.con.execute("SELECT table_name FROM information_schema.tables").fetchall():
+            if name.startswith('ds_'):
+                self.con.execute(f'DROP TABLE "{name}"')    # leftovers of a previous process
+
+    # ─── LOADING ─────────────────────────────────────────────────────────────
+
+    def upload_path(self, filename: str) -> str:
+        ext = '.parquet' if filename.lower().endswith('.parquet') else '.csv'
+        return os.path.join(self.dir, 'uploads', f'{uuid.uuid4().hex}{ext}')
+
+    def register_file(self, path: str, required: set, dataset_id: str, meta: dict) -> dict:
+        """
+        Load an uploaded file as dataset `dataset_id`. Adds rows, columns and
+        subreddits to the upload `meta`. Returns {'ok': True, 'meta'} or
+        {'ok': False, 'error', ...}.
+        """
+        cur = self.con.cursor()
+        try:
+            reader = (f"read_parquet('{path}')" if path.endswith('.parquet')
+                      else f"read_csv('{path}', header = true, all_varchar = true)")
+            try:
+                source_cols = [r[0] for r in cur.execute(f"DESCRIBE SELECT * FROM {reader}").fetchall()]
+            except Exception as e:
+                return {'ok': False, 'error': f'Failed to parse CSV: {str(e)}'}
+            names = [c.strip().lower() for c in source_cols]
+            missing = required - set(names)
+            if missing:
+                return {'ok': False, 'error': f'Missing required columns: {", ".join(sorted(missing))}',
+                        'required_columns': sorted(required)}
+
+            select = []
+            for src, name in zip(source_cols, names):
+                quoted = '"' + src.replace('"', '""') + '"'
+                if name == 'sentiment_score':
+                    select.append(f"COALESCE(TRY_CAST({quoted} AS DOUBLE), 0.0) AS sentiment_score")
+                elif name == 'upvotes':
+                    select.append(f"CAST(TRY_CAST({quoted} AS DOUBLE) AS BIGINT) AS upvotes")
+                else:
+                    select.append(f'CAST({quoted} AS VARCHAR) AS "{name}"')
+            table = f'ds_{uuid.uuid4().hex[:12]}'
+            cur.execute(f"""
+            CREATE TABLE {table} AS
+            SELECT *, CAST(floor(epoch(TRY_CAST(created_time AS TIMESTAMPTZ))) AS BIGINT) AS created_epoch
+            FROM (SELECT {', '.join(select)} FROM {reader})
+            """)
+            rows, subs = cur.execute(f"SELECT COUNT(*), COUNT(DISTINCT subreddit) FROM {table}").fetchone()
+        finally:
+            cur.close()
+
+        meta = {**meta, 'rows': rows, 'columns': names, 'subreddits': subs, 'dataset_id': dataset_id}
+        with self.lock:
+            self.tables[dataset_id] = (table, names, meta)
+        return {'ok': True, 'meta': meta}
+
+    def drop(self, dataset_id: str) -> bool:
+        with self.lock:
+            table = self.tables.pop(dataset_id, (None,))[0]
+        if table:
+            self.con.cursor().execute(f"DROP TABLE IF EXISTS {table}")
+        return table is not None
+
+    def bind(self, dataset_id: str | None):
+        """A view of the engine that queries `dataset_id`, or None if it isn't loaded here."""
+        entry = self.tables.get(dataset_id) if dataset_id else None
+        if entry is None:
+            return None
+        view = copy.copy(self)
+        view.table, view.columns, _ = entry
+        return view
+
+    def find(self, content_hash: str) -> str | None:
+        """Id of a loaded dataset uploaded from exactly these bytes."""
+        for dataset_id, (_, _, meta) in list(self.tables.items()):
+            if meta.get('content_hash') == content_hash:
+                return dataset_id
+        return None
+
+    def meta(self, dataset_id: str) -> dict:
+        return dict(self.tables[dataset_id][2]) if dataset_id in self.tables else {}
+
+    def describe(self) -> list:
+        """Loaded datasets for /api/upload-status. Their data lives in the DuckDB file, not in memory."""
+        return [{'id': dataset_id, 'filename': meta.get('filename'), 'rows': meta.get('rows'),
+                 'uploaded_at': meta.get('uploaded_at'), 'resident': False, 'memory_bytes': 0,
+                 'on_disk': True, 'engine': 'duckdb'}
+                for dataset_id, (_, _, meta) in list(self.tables.items())]
+
+    def _query(self, sql: str, params: list | tuple = ()) -> list:
+        cur = self.con.cursor()
+        try:
+            return cur.execute(sql.replace('{t}', self.table), params).fetchall()
+        finally:
+            cur.close()
+
+    # ─── ENDPOINTS ───────────────────────────────────────────────────────────
+
+    def overview(self) -> dict:
+        total, subs, avg, pos, neu, neg = self._query(
+            f"SELECT COUNT(*), COUNT(DISTINCT subreddit), AVG(sentiment_score), {_label_counts()} FROM {{t}}")[0]
+        top = self._query("""
+        SELECT subreddit FROM {t} WHERE subreddit IS NOT NULL
+        GROUP BY subreddit ORDER BY COUNT(*) DESC, MIN(rowid) LIMIT 1
+        """)
+        return {
+            'total_comments': total,
+            'total_subreddits': subs,
+            'avg_sentiment_score': round(float(avg), 4) if total else float('nan'),
+            'sentiment_counts': {'Positive': pos, 'Neutral': neu, 'Negative': neg},
+            'most_active_subreddit': str(top[0][0]) if top else 'N/A',
+        }
+
+    def sentiment(self, bins: list) -> dict:
+        total, avg, pos, neu, neg = self._query(
+            f"SELECT COUNT(*), AVG(sentiment_score), {_label_counts()} FROM {{t}}")[0]
+        if total == 0:
+            return {'total': 0, 'counts': {'Positive': 0, 'Neutral': 0, 'Negative': 0},
+                    'percentages': {'Positive': 0, 'Neutral': 0, 'Negative': 0}, 'avg_score': 0,
+                    'distribution': []}
+        # pd.cut semantics: right-closed (lo, hi], values outside the bins are dropped
+        cases = ' '.join(f"WHEN sentiment_score <= ? THEN {i}" for i in range(len(bins) - 1))
+        hist = dict(self._query(f"""
+        SELECT CASE {cases} END AS b, COUNT(*) FROM {{t}}
+        WHERE sentiment_score > ? AND sentiment_score <= ? GROUP BY b
+        """, [*bins[1:], bins[0], bins[-1]]))
+        counts = {'Positive': pos, 'Neutral': neu, 'Negative': neg}
+        return {
+            'total': total,
+            'counts': counts,
+            'percentages': {k: round(v / total * 100, 1) for k, v in counts.items()},
+            'avg_score': round(float(avg), 4),
+            'distribution': [{'range': f'{bins[i]:.1f} to {bins[i + 1]:.1f}', 'count': int(hist.get(i, 0))}
+                             for i in range(len(bins) - 1)],
+        }
+
+    def subreddits(self) -> dict:
+        rows = self._query(f"""
+        SELECT {_text('subreddit')}, COUNT(*), {_label_counts()}, AVG(sentiment_score)
+        FROM {{t}} GROUP BY subreddit ORDER BY MIN(rowid)
+        """)
+        result = []
+        for name, t, pos, neu, neg, avg in rows:
+            if name == 'nan':
+                continue                      # df[df.subreddit == NaN] is empty on the pandas path
+            result.append({
+                'name': name, 'total': t, 'positive': pos, 'neutral': neu, 'negative': neg,
+                'positive_pct': round(pos / t * 100, 1) if t else 0,
+                'neutral_pct':  round(neu / t * 100, 1) if t else 0,
+                'negative_pct': round(neg / t * 100, 1) if t else 0,
+                'avg_score': round(float(avg), 4),
+            })
+        return {'subreddits': result}
+
+    def trends(self, granularity: str, width: int, start: int | None, end: int | None,
+               by_subreddit: bool, bucket_rows) -> dict:
+        """`bucket_rows` is timeseries.bucket_rows, so output formatting stays in one place."""
+        import numpy as np
+
+        origin = WEEK_ORIGIN if granularity == 'week' else 0
+        where, params = ['created_epoch IS NOT NULL'], []
+        if start is not None:
+            where.append('created_epoch >= ?'); params.append(start)
+        if end is not None:
+            where.append('created_epoch < ?'); params.append(end)
+        bucket = f"CAST(floor((created_epoch - {origin}) / {width}) AS BIGINT) * {width} + {origin}"
+
+        def series(rows):
+            if not rows:
+                return []
+            arr = np.array(rows, dtype=float)
+            return bucket_rows(arr[:, 0].astype(np.int64), granularity,
+                               arr[:, 1].astype(np.int64), arr[:, 2], arr[:, 3], arr[:, 4], arr[:, 5])
+
+        agg = f"COUNT(*), {_label_counts()}, SUM(sentiment_score)"
+        result = {'granularity': granularity, 'trends': series(self._query(
+            f"SELECT {bucket} AS b, {agg} FROM {{t}} WHERE {' AND '.join(where)} GROUP BY b ORDER BY b", params))}
+        if by_subreddit:
+            result['subreddits'] = {}
+            per_sub: dict = {}
+            for sub, *row in self._query(f"""
+            SELECT {_text('subreddit')}, {bucket} AS b, {agg} FROM {{t}}
+            WHERE {' AND '.join(where)} GROUP BY subreddit, b ORDER BY b
+            """, params):
+                per_sub.setdefault(sub, []).append(row)
+            for sub, rows in per_sub.items():
+                result['subreddits'][sub] = series(rows)
+        return result
+
+    def comments(self, page: int, per_page: int, search: str, sentiment_f: str, sub_f: str,
+                 sort_by: str, sort_dir: str, start: int | None = None, end: int | None = None) -> dict:
+        where, params = self._date_range(start, end)
+        if search:
+            where.append('contains(lower(comment), ?)'); params.append(search)
+        if sentiment_f:
+            where.append('sentiment_label = ?'); params.append(sentiment_f)
+        if sub_f and sub_f != 'All':
+            where.append('subreddit = ?'); params.append(sub_f)
+        sort_col = 'sentiment_score' if sort_by == 'score' else (
+            'upvotes' if 'upvotes' in self.columns else 'sentiment_score')
+        order = f"{sort_col} {'ASC' if sort_dir == 'asc' else 'DESC'} NULLS LAST, rowid"
+        cond = ' AND '.join(where)
+
+        total = self._query(f"SELECT COUNT(*) FROM {{t}} WHERE {cond}", params)[0][0]
+        all_total, pos, neu, neg = self._query(f"SELECT COUNT(*), {_label_counts()} FROM {{t}}")[0]
+        rows = self._query(f"""
+        SELECT {self._opt_text('post_id', '')}, {_text('comment')}, {_text('sentiment_label')},
+               sentiment_score, {_text('subreddit')}, {self._opt_text('author', 'unknown')},
+               {'upvotes' if 'upvotes' in self.columns else '0'}, {_text('created_time')}
+        FROM {{t}} WHERE {cond} ORDER BY {order} LIMIT ? OFFSET ?
+        """, [*params, per_page, max(0, (page - 1) * per_page)])
+        return {
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'total_pages': max(1, (total + per_page - 1) // per_page),
+            'comments': [
+                {'post_id': p, 'comment': c, 'sentiment': lab, 'score': float(s), 'subreddit': sub,
+                 'author': a, 'upvotes': int(u), 'created_time': ct}
+                for p, c, lab, s, sub, a, u, ct in rows
+            ],
+            'counts': {'Positive': pos, 'Neutral': neu, 'Negative': neg, 'total': all_total},
+        }
+
+    def threads(self, sub_f: str, sort: str, page: int, per_page: int,
+                start: int | None = None, end: int | None = None) -> dict:
+        where, params = self._date_range(start, end)
+        if sub_f and sub_f != 'All':
+            where.append('subreddit = ?'); params.append(sub_f)
+        where = ' AND '.join(where)
+        sort_col = 'upvotes' if 'upvotes' in self.columns and sort == 'top' else 'sentiment_score'
+        order = f"{sort_col} {'ASC' if sort == 'new' else 'DESC'} NULLS LAST, rowid"
+        total = self._query(f"SELECT COUNT(*) FROM {{t}} WHERE {where}", params)[0][0]
+        rows = self._query(f"""
+        SELECT {self._opt_text('post_id', '')}, left({_text('comment')}, 120), {_text('subreddit')},
+               {self._opt_text('author', 'unknown')}, {'upvotes' if 'upvotes' in self.columns else '0'},
+               {_text('sentiment_label')}, sentiment_score, {_text('created_time')}
+        FROM {{t}} WHERE {where} ORDER BY {order} LIMIT ? OFFSET ?
+        """, [*params, per_page, max(0, (page - 1) * per_page)])
+        return {'total': total, 'threads': [
+            {'id': p, 'title': c, 'subreddit': sub, 'author': a, 'upvotes': int(u), 'comments': 1,
+             'sentiment': lab, 'score': float(s), 'time': ct}
+            for p, c, sub, a, u, lab, s, ct in rows
+        ]}
+
+    @staticmethod
+    def _date_range(start: int | None, end: int | None) -> tuple:
+        """WHERE terms for [start, end) in epoch seconds; any bound drops unparsed timestamps."""
+        where, params = ['TRUE'], []
+        if start is not None:
+            where.append('created_epoch >= ?'); params.append(start)
+        if end is not None:
+            where.append('created_epoch < ?'); params.append(end)
+        return where, params
+
+    def emotions(self, lexicon: dict) -> dict:
+        """Same scoring as the pandas path: substring hits per emotion, first max wins, none → Neutral."""
+        scored = [e for e, words in lexicon.items() if words]
+        n = len(scored)
+        hits = [' + '.join('CAST(contains(low, ?) AS INTEGER)' for _ in lexicon[e]) + f' AS s{i}'
+                for i, e in enumerate(scored)]
+        params = [w for e in scored for w in lexicon[e]]
+        # emotion i wins when it has hits, beats every earlier one and ties-or-beats every later one
+        pick = ' '.join(
+            'WHEN ' + ' AND '.join([f's{i} > 0'] + [f's{i} > s{j}' for j in range(i)]
+                                   + [f's{i} >= s{j}' for j in range(i + 1, n)]) + f" THEN '{e}'"
+            for i, e in enumerate(scored)
+        )
+        t = self.table
+        outlier_cols = (f"{_text('comment')}, {_text('sentiment_label')}, d.sentiment_score, "
+                        f"{self._opt_text('author', 'unknown')}, {_text('subreddit')}, "
+                        f"{_text('created_time')}, e.emotion")
+        cur = self.con.cursor()
+        try:
+            cur.execute(f"""
+            CREATE TEMP TABLE emo AS
+            SELECT rid, sub, CASE {pick} ELSE 'Neutral' END AS emotion FROM (
+                SELECT rid, sub, {', '.join(hits)}
+                FROM (SELECT rowid AS rid, subreddit AS sub, lower(comment) AS low FROM {t}))
+            """, params)
+            total = cur.execute("SELECT COUNT(*) FROM emo").fetchone()[0]
+            counts = dict(cur.execute("SELECT emotion, COUNT(*) FROM emo GROUP BY emotion").fetchall())
+            heat: dict = {}
+            for sub, emotion, hits_n, sub_total in cur.execute("""
+            SELECT sub, emotion, COUNT(*), SUM(COUNT(*)) OVER (PARTITION BY sub)
+            FROM emo WHERE sub IS NOT NULL GROUP BY sub, emotion
+            """).fetchall():
+                heat.setdefault(str(sub), {})[emotion] = hits_n / sub_total
+            outliers = []
+            for direction in ('DESC', 'ASC'):        # nlargest(4) then nsmallest(4)
+                outliers += cur.execute(f"""
+                SELECT {outlier_cols} FROM
+                    (SELECT rowid AS rid FROM {t} ORDER BY sentiment_score {direction}, rowid LIMIT 4) o
+                JOIN {t} d ON d.rowid = o.rid JOIN emo e ON e.rid = o.rid
+                ORDER BY d.sentiment_score {direction}, o.rid
+                """).fetchall()
+            pos, neu, neg = cur.execute(f"SELECT {_label_counts()} FROM {t}").fetchone()
+        finally:
+            cur.execute("DROP TABLE IF EXISTS emo")
+            cur.close()
+        return {
+            'radar': [{'emotion': e, 'value': round(counts.get(e, 0) / total, 3)} for e in lexicon],
+            'heatmap': {sub: {e: round(v.get(e, 0), 3) for e in lexicon} for sub, v in heat.items()},
+            'outliers': [
+                {'comment': c, 'sentiment': lab, 'score': float(sc), 'author': a, 'subreddit': sub,
+                 'created_time': ct, 'emotion': emo, 'emotion_label': emo}
+                for c, lab, sc, a, sub, ct, emo in outliers
+            ],
+            'sentiment_rates': {
+                'Positive': round(float(pos / total * 100), 1) if total else 0,
+                'Neutral':  round(float(neu / total * 100), 1) if total else 0,
+                'Negative': round(float(neg / total * 100), 1) if total else 0,
+            },
+            'total': total,
+        }
+
+    def _opt_text(self, col: str, default: str) -> str:
+        return _text(col) if col in self.columns else f"'{default}'"
+
+
+# ─── MODULE-LEVEL ENGINE ─────────────────────────────────────────────────────
+engine: DuckEngine | None = None
+
+
+def get_engine(run_mode: str = 'single') -> DuckEngine | None:
+    """The DuckDB engine when QUERY_ENGINE=duckdb can be honoured, else None (pandas)."""
+    global engine
+    if QUERY_ENGINE != 'duckdb':
+        return None
+    if engine is None:
+        if not DUCKDB_AVAILABLE:
+            print("[duckdb_engine] QUERY_ENGINE=duckdb but duckdb is not installed — using pandas")
+            return None
+        if run_mode == 'multi':
+            print("[duckdb_engine] QUERY_ENGINE=duckdb is single-process only — using pandas")
+            return None
+        engine = DuckEngine()
+        print(f"[duckdb_engine] DuckDB engine ready in {DUCKDB_DIR} (memory_limit={MEMORY_LIMIT})")
+    return engine
@@ -0,0 +1,170 @@
+"""
+events.py — SERVER-SENT EVENTS BROADCASTER
+===========================================
+Pushes small update messages to every open dashboard over GET /api/stream,
+so pages can react to new data instead of re-polling REST endpoints.
+
+Events published:
+  - cycle    → scheduler finished a fetch_reddit_data cycle
+               (new rows, totals, sync state, rolling live aggregates)
+  - dataset  → a CSV was uploaded or cleared
+
+How it works:
+  - publish() formats the SSE frame ONCE and drops it into every
+    subscriber's bounded queue — the cost of a cycle is independent of
+    how the clients consume it.
+  - A slow client whose queue is full loses its oldest frames, never
+    blocks the publisher and never grows memory.
+  - Idle clients sit on queue.get(); they get a comment line every
+    HEARTBEAT_SECONDS so proxies keep the connection open.
+
+Multi-worker mode (RUN_MODE=multi, start_relay()):
+  - Cycle events happen in the leader and dataset events in whichever
+    worker took the request, but dashboards are connected to any worker.
+    Every publish is also appended to the `events` table of reddit.db
+    with the worker's origin id.
+  - A relay thread in each worker reads rows newer than the last one it
+    saw every RELAY_INTERVAL seconds and re-publishes those from other
+    workers to its own clients. Frames are never relayed twice, and a
+    worker that starts late only gets events from then on.
+"""
+
+import json
+import os
+import queue
+import threading
+import uuid
+
+import db
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+CLIENT_BUFFER     = 32    # frames queued per client before the oldest are dropped
+HEARTBEAT_SECONDS = 15
+RELAY_INTERVAL    = float(os.getenv('EVENT_RELAY_INTERVAL', 1))
+RELAY_BATCH       = 100   # event-log rows read per query
+
+
+class Broadcaster:
+    """Fan-out of pre-formatted SSE frames to per-client bounded queues."""
+
+    def __init__(self, buffer_size: int = CLIENT_BUFFER):
+        self.buffer_size = buffer_size
+        self.lock = threading.Lock()
+        self.clients: set = set()
+        self.seq = 0
+
+    def subscribe(self) -> queue.Queue:
+        q = queue.Queue(maxsize=self.buffer_size)
+        with self.lock:
+            self.clients.add(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue):
+        with self.lock:
+            self.clients.discard(q)
+
+    def publish(self, event: str, data: dict):
+        with self.lock:
+            self.seq += 1
+            frame = f"id: {self.seq}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+            clients = list(self.clients)
+        for q in clients:
+            while True:
+                try:
+                    q.put_nowait(frame)
+                    break
+                except queue.Full:
+                    try:
+                        q.get_nowait()       # drop the oldest frame for this slow client
+                    except queue.Empty:
+                        pass
+
+    def stream(self, first: str | None = None):
+        """Generator of SSE text for one client; unsubscribes when the client goes away."""
+        q = self.subscribe()
+        try:
+            if first:
+                yield first
+            while True:
+                try:
+                    yield q.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+        finally:
+            self.unsubscribe(q)
+
+
+# ─── CROSS-WORKER RELAY ──────────────────────────────────────────────────────
+
+class Relay:
+    """Shares published events with the other workers through reddit.db's event log."""
+
+    def __init__(self, target: Broadcaster, interval: float = RELAY_INTERVAL):
+        self.target = target
+        self.interval = interval
+        self.origin = f'{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.seq = db.last_event_seq()          # only what is published from now on
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='event-relay')
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def share(self, event: str, data: dict):
+        try:
+            db.append_event(self.origin, event, json.dumps(data))
+        except Exception as e:
+            print(f"[events.py] Could not share '{event}' with other workers: {e}")
+
+    def poll(self) -> int:
+        """Re-publish other workers' events logged since the last poll. Returns how many."""
+        relayed = 0
+        while True:
+            rows = db.events_since(self.seq, RELAY_BATCH)
+            for seq, origin, event, data in rows:
+                self.seq = seq
+                if origin != self.origin:
+                    self.target.publish(event, json.loads(data))
+                    relayed += 1
+            if len(rows) < RELAY_BATCH:
+                return relayed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"[events.py] Event relay poll failed: {e}")
+
+
+# ─── MODULE-LEVEL BROADCASTER ────────────────────────────────────────────────
+broadcaster = Broadcaster()
+relay: Relay | None = None
+
+
+def start_relay() -> Relay:
+    """Relay events between the workers of a multi-process server (once per process)."""
+    global relay
+    if relay is None:
+        relay = Relay(broadcaster).start()
+    return relay
+
+
+def publish(event: str, data: dict):
+    broadcaster.publish(event, data)
+    if relay is not None:
+        relay.share(event, data)
+
+
+def listening() -> bool:
+    """Whether a published event can reach anyone: local clients, or other workers' via the relay."""
+    return relay is not None or client_count() > 0
+
+
+def client_count() -> int:
+    with broadcaster.lock:
+        return len(broadcaster.clients)
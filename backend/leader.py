@@ -0,0 +1,106 @@
+"""
+leader.py — LEADER ELECTION FOR MULTI-WORKER DEPLOYMENTS
+=========================================================
+Under a multi-process server (gunicorn -w N) every worker builds the app,
+but only ONE of them may run the ingestion scheduler — otherwise Reddit
+and SQLite get hit N times per cycle.
+
+How it works:
+  - The workers compete for a lease row in reddit.db (db.acquire_lease):
+    whoever holds an unexpired lease is the leader.
+  - A daemon thread in each worker retries every LEASE_TTL / 3 seconds.
+    The leader uses the same beat to renew its lease and to publish the
+    scheduler's sync_state, so any worker can answer /api/status.
+  - When the leader dies, its lease expires after LEASE_TTL seconds and
+    the next worker to try takes over. A clean shutdown releases it at once.
+  - If a renewal fails (DB locked, clock jump, another owner), the worker
+    stops its scheduler before anyone else can start one.
+
+Usage (app.py, RUN_MODE=multi):
+    leader.start(on_acquire=start_background, on_lose=stop_background)
+"""
+
+import atexit
+import os
+import socket
+import threading
+import uuid
+
+import db
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+LEASE_NAME = 'scheduler'
+LEASE_TTL  = float(os.getenv('LEADER_LEASE_TTL', 30))
+
+
+class LeaderLease:
+    """Keeps trying to hold one named lease; calls back when leadership changes."""
+
+    def __init__(self, name: str = LEASE_NAME, ttl: float = LEASE_TTL,
+                 on_acquire=None, on_lose=None, state_fn=None):
+        self.name = name
+        self.ttl = ttl
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.on_acquire = on_acquire
+        self.on_lose = on_lose
+        self.state_fn = state_fn
+        self.is_leader = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f'lease-{name}')
+
+    def start(self):
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self.is_leader:
+            self._set_leader(False)
+            try:
+                db.release_lease(self.name, self.owner)
+            except Exception as e:
+                print(f"[leader.py] Could not release lease: {e}")
+
+    def beat(self) -> bool:
+        """One election round: acquire or renew. Returns whether we lead afterwards."""
+        try:
+            state = self.state_fn() if (self.state_fn and self.is_leader) else None
+            held = db.acquire_lease(self.name, self.owner, self.ttl, state)
+        except Exception as e:
+            print(f"[leader.py] Lease check failed: {e}")
+            held = False
+        if held != self.is_leader:
+            self._set_leader(held)
+        return held
+
+    def _set_leader(self, leader: bool):
+        self.is_leader = leader
+        print(f"[leader.py] {self.owner} {'became' if leader else 'is no longer'} leader for '{self.name}'")
+        callback = self.on_acquire if leader else self.on_lose
+        if callback:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[leader.py] Leadership callback failed: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.beat()
+            self._stop.wait(self.ttl / 3)
+
+
+# ─── MODULE-LEVEL LEASE (one per process) ────────────────────────────────────
+lease: LeaderLease | None = None
+
+
+def start(on_acquire=None, on_lose=None, state_fn=None) -> LeaderLease:
+    """Start competing for the scheduler lease (once per process)."""
+    global lease
+    if lease is None:
+        lease = LeaderLease(on_acquire=on_acquire, on_lose=on_lose, state_fn=state_fn).start()
+    return lease
+
+
+def is_leader() -> bool:
+    return lease is not None and lease.is_leader
@@ -0,0 +1,112 @@
+"""
+live_stats.py — SLIDING-WINDOW AGGREGATES FOR THE LIVE PAGE
+============================================================
+Rolling 1 min / 15 min / 1 h counts, mean sentiment, label mix and
+per-subreddit velocity over everything the scheduler inserts — kept in
+memory, so /api/live-stats never has to scan reddit.db.
+
+How it works:
+  - A ring of 3600 one-second slots holds what was inserted in each
+    second of the last hour.
+  - Every window keeps running totals. When the clock moves past a second,
+    that second's slot is subtracted from each window it just fell out of,
+    and the slot is reused once it leaves the 1 h window.
+  - record() touches one slot plus the three window totals: O(1) per
+    insert. Expiry is amortised O(1) per elapsed second.
+"""
+
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+WINDOWS = {'1m': 60, '15m': 900, '1h': 3600}
+LABELS  = ('Positive', 'Neutral', 'Negative')
+
+
+class SlidingWindowAggregator:
+    """Per-second ring buffer with running totals for each window in WINDOWS."""
+
+    def __init__(self, windows: dict = WINDOWS):
+        self.windows = dict(windows)
+        self.size = max(self.windows.values())
+        self.lock = threading.Lock()
+        self._reset(None)
+
+    @staticmethod
+    def _empty() -> dict:
+        return {'count': 0, 'score_sum': 0.0, 'labels': Counter(), 'subs': Counter()}
+
+    def _reset(self, now: int | None):
+        self.head = now
+        self.slots = [None] * self.size            # each: (second, totals) or None
+        self.totals = {name: self._empty() for name in self.windows}
+
+    def _advance(self, now: int):
+        """Move the clock to `now`, expiring seconds that left each window. Caller holds lock."""
+        if self.head is None or now - self.head >= self.size:
+            self._reset(now)
+            return
+        for sec in range(self.head + 1, now + 1):
+            for name, width in self.windows.items():
+                slot = self.slots[(sec - width) % self.size]
+                if slot is not None and slot[0] == sec - width:
+                    t = self.totals[name]
+                    t['count']     -= slot[1]['count']
+                    t['score_sum'] -= slot[1]['score_sum']
+                    t['labels'].subtract(slot[1]['labels'])
+                    t['subs'].subtract(slot[1]['subs'])
+                    if t['count'] == 0:
+                        t['score_sum'] = 0.0      # don't let float error accumulate
+            self.slots[sec % self.size] = None
+        self.head = max(self.head, now)
+
+    def record(self, subreddit: str, score: float, label: str, now: float | None = None):
+        """Add one inserted post."""
+        sec = int(now if now is not None else time.time())
+        with self.lock:
+            self._advance(sec)
+            sec = max(sec, self.head)             # clock stepped back: count it as "now"
+            idx = sec % self.size
+            if self.slots[idx] is None or self.slots[idx][0] != sec:
+                self.slots[idx] = (sec, self._empty())
+            for t in [self.slots[idx][1], *self.totals.values()]:
+                t['count']     += 1
+                t['score_sum'] += score
+                t['labels'][label] += 1
+                t['subs'][subreddit] += 1
+
+    def snapshot(self, now: float | None = None, top: int = 10) -> dict:
+        """Current value of every window, including the `top` fastest subreddits."""
+        sec = int(now if now is not None else time.time())
+        with self.lock:
+            self._advance(sec)
+            result = {}
+            for name, width in self.windows.items():
+                t = self.totals[name]
+                minutes = width / 60
+                result[name] = {
+                    'window_seconds': width,
+                    'count': t['count'],
+                    'per_minute': round(t['count'] / minutes, 2),
+                    'avg_score': round(t['score_sum'] / t['count'], 4) if t['count'] else 0,
+                    'sentiment_counts': {label: t['labels'][label] for label in LABELS},
+                    'subreddits': [
+                        {'name': sub, 'count': c, 'per_minute': round(c / minutes, 2)}
+                        for sub, c in t['subs'].most_common(top) if c > 0
+                    ],
+                }
+            return result
+
+
+# ─── MODULE-LEVEL AGGREGATOR (fed by scheduler.py) ───────────────────────────
+aggregator = SlidingWindowAggregator()
+
+
+def record(subreddit: str, score: float, label: str):
+    aggregator.record(subreddit, score, label)
+
+
+def snapshot() -> dict:
+    return {'as_of': datetime.now(timezone.utc).isoformat(), 'windows': aggregator.snapshot()}
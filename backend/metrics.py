@@ -0,0 +1,209 @@
+"""
+metrics.py — IN-PROCESS METRICS WITH A PROMETHEUS TEXT EXPORT
+==============================================================
+Counters and latency histograms for the API, the scheduler, the analysis
+pipeline and SQLite, served as Prometheus text at GET /metrics.
+
+How it works:
+  - Every thread writes into its own shard (threading.local), so the hot
+    path — inc() / observe() — takes no lock. A lock is only taken the first
+    time a thread touches a metric, and when /metrics merges the shards.
+  - Shards of threads that have exited (Werkzeug uses one thread per
+    request) are folded into a retired total whenever a new thread
+    registers and on each scrape, so memory stays bounded by the live
+    threads even when nothing scrapes /metrics.
+  - Histograms store per-bucket counts; cumulative "le" buckets are built
+    only at export time.
+
+Usage:
+    from metrics import DB_QUERY_SECONDS
+    with DB_QUERY_SECONDS.time(query='get_stats'):
+        ...
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: list = []          # every metric, in registration order
+_callbacks: list = []         # (name, help, fn) gauges computed at scrape time
+
+
+class _Metric(ABC):
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: list = []   # (thread, shard dict)
+        self._retired: dict = {}
+        _registry.append(self)
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._retire()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _retire(self):
+        """Fold the shards of exited threads into the retired total. Caller holds _lock."""
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                self._merge_into(self._retired, dict(shard))
+        self._shards = live
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, '')) for n in self.labelnames)
+
+    @abstractmethod
+    def _merge_into(self, total: dict, shard: dict):
+        """Add one shard's values into total (both {label tuple: value})."""
+
+    @abstractmethod
+    def render(self) -> list:
+        """Prometheus sample lines for this metric."""
+
+    def collect(self) -> dict:
+        """Merge all shards into {label tuple: value}. Dead threads are retired."""
+        with self._lock:
+            self._retire()
+            total = {}
+            self._merge_into(total, self._retired)
+            for _, shard in self._shards:
+                self._merge_into(total, dict(shard))
+        return total
+
+    def _fmt_labels(self, key: tuple, extra: str = '') -> str:
+        parts = [f'{n}="{v}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            parts.append(extra)
+        return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, value: float = 1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + value
+
+    def _merge_into(self, total, shard):
+        for k, v in shard.items():
+            total[k] = total.get(k, 0) + v
+
+    def render(self) -> list:
+        return [f'{self.name}{self._fmt_labels(k)} {v}' for k, v in sorted(self.collect().items())]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        row = shard.get(key)
+        if row is None:
+            row = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]   # bucket counts..., +Inf, sum
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def timed(self, **labels):
+        """Decorator form of time()."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.time(**labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _merge_into(self, total, shard):
+        for k, row in shard.items():
+            acc = total.setdefault(k, [0] * len(row))
+            for i, v in enumerate(row):
+                acc[i] += v
+
+    def render(self) -> list:
+        lines = []
+        for key, row in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), row[:-1]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                bucket_labels = self._fmt_labels(key, f'le="{le}"')
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{self._fmt_labels(key)} {row[-1]}')
+            lines.append(f'{self.name}_count{self._fmt_labels(key)} {cumulative}')
+        return lines
+
+
+def register_gauge(name: str, help_text: str, fn):
+    """Expose a value computed at scrape time: fn() returns a number or {label tuple: number}."""
+    _callbacks.append((name, help_text, fn))
+
+
+def render() -> str:
+    """All metrics in Prometheus text exposition format (version 0.0.4)."""
+    out = []
+    for m in _registry:
+        out.append(f'# HELP {m.name} {m.help}')
+        out.append(f'# TYPE {m.name} {m.kind}')
+        out.extend(m.render())
+    for name, help_text, fn in _callbacks:
+        out.append(f'# HELP {name} {help_text}')
+        out.append(f'# TYPE {name} gauge')
+        value = fn()
+        if isinstance(value, dict):
+            for labels, v in sorted(value.items()):
+                label_str = ','.join(f'{k}="{lv}"' for k, lv in labels)
+                out.append(f'{name}{{{label_str}}} {v}')
+        else:
+            out.append(f'{name} {value}')
+    return '\n'.join(out) + '\n'
+
+
+# ─── METRICS ─────────────────────────────────────────────────────────────────
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'API request latency by route.', ('route', 'method', 'status'))
+SCHEDULER_CYCLE_SECONDS = Histogram(
+    'scheduler_cycle_duration_seconds', 'Duration of one fetch_reddit_data cycle.', ('mode',))
+SCHEDULER_STAGE_SECONDS = Histogram(
+    'scheduler_stage_duration_seconds', 'Per-post scheduler stage timings.', ('stage',))
+SCHEDULER_POSTS = Counter(
+    'scheduler_posts_total', 'Posts processed by the scheduler.', ('result',))
+ANALYZE_STAGE_SECONDS = Histogram(
+    'analyze_stage_duration_seconds', 'analyze.py pipeline stage timings.', ('stage',),
+    buckets=(0.01, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600))
+DB_QUERY_SECONDS = Histogram(
+    'db_query_duration_seconds', 'SQLite call latency by function.', ('query',))
+RETENTION_ROWS = Counter(
+    'retention_rows_total', 'Rows rolled up into summaries or deleted by retention.py.', ('action',))
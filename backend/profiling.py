@@ -0,0 +1,222 @@
+"""
+profiling.py — ON-DEMAND PROFILING OF LIVE REQUESTS AND SCHEDULER CYCLES
+=========================================================================
+Lets us profile a slow endpoint or scheduler cycle against production data
+without redeploying. Off unless PROFILING_ENABLED=1.
+
+Two profilers:
+  - cprofile → deterministic cProfile of the request thread, saved as
+               .pstats (open with `python -m pstats` or snakeviz)
+  - sample   → a background thread samples the request thread's stack
+               every SAMPLE_INTERVAL seconds, saved in flamegraph
+               "collapsed" format (.collapsed; flamegraph.pl / speedscope)
+
+How to trigger:
+  - Request:   add ?profile=cprofile|sample (or header X-Profile: ...).
+               The response carries X-Profile-Id with the saved file name.
+  - Scheduler: POST /api/profiles/scheduler {"cycles": N, "mode": "cprofile"}
+               profiles the next N fetch_reddit_data cycles.
+
+Profiles go to PROFILE_DIR, which is a ring: only the newest PROFILE_KEEP
+files are kept.
+
+Only one cProfile can run per process (from Python 3.12 it sits on
+sys.monitoring, and a second enable() raises). A cprofile request that
+arrives while another one is running gets the sampler instead, and a
+scheduler cycle whose profiler cannot start runs unprofiled.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+ENABLED         = os.getenv('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+PROFILE_DIR     = os.getenv('PROFILE_DIR', os.path.join(os.path.dirname(__file__), 'profiles'))
+PROFILE_KEEP    = int(os.getenv('PROFILE_KEEP', 50))
+SAMPLE_INTERVAL = 0.005
+MODES           = ('cprofile', 'sample')
+
+_ring_lock = threading.Lock()
+_scheduler_lock = threading.Lock()
+_cprofile_lock = threading.Lock()      # held while this process's one cProfile is enabled
+scheduler_requests = {'remaining': 0, 'mode': 'cprofile'}
+
+
+# ─── SAMPLING PROFILER ───────────────────────────────────────────────────────
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer and counts collapsed stacks."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='stack-sampler')
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(parts))] += 1
+
+    def collapsed(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+# ─── START / STOP ────────────────────────────────────────────────────────────
+
+def start(mode: str):
+    """
+    Start profiling the current thread. Returns a handle for stop().
+    cprofile falls back to the sampler while another cProfile is active.
+    """
+    if mode == 'cprofile' and _cprofile_lock.acquire(blocking=False):
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+            return mode, prof
+        except ValueError as e:            # another profiling tool (debugger, coverage) owns it
+            _cprofile_lock.release()
+            print(f"[profiling] cProfile unavailable, sampling instead: {e}")
+    return 'sample', StackSampler(threading.get_ident()).start()
+
+
+def stop(handle, label: str) -> str:
+    """Stop profiling and save the result into the ring. Returns the file name."""
+    mode, prof = handle
+    if mode == 'sample':
+        prof.stop()
+        return _save(label, 'collapsed', prof.collapsed().encode())
+    try:
+        prof.disable()
+    finally:
+        _cprofile_lock.release()
+    path = _new_path(label, 'pstats')
+    prof.dump_stats(path)
+    _trim_ring()
+    return os.path.basename(path)
+
+
+def requested_mode(args, headers) -> str | None:
+    """Profiler mode asked for by a request (?profile= or X-Profile), or None."""
+    if not ENABLED:
+        return None
+    value = (args.get('profile') or headers.get('X-Profile') or '').lower()
+    if value in ('1', 'true'):
+        return 'cprofile'
+    return value if value in MODES else None
+
+
+# ─── SCHEDULER CYCLES ────────────────────────────────────────────────────────
+
+def profile_next_cycles(cycles: int, mode: str = 'cprofile'):
+    """Arm profiling for the next `cycles` scheduler cycles."""
+    with _scheduler_lock:
+        scheduler_requests['remaining'] = max(0, int(cycles))
+        scheduler_requests['mode'] = mode if mode in MODES else 'cprofile'
+
+
+@contextmanager
+def cycle_profile(label: str = 'scheduler'):
+    """Wrap one scheduler cycle; profiles it only while cycles are armed."""
+    with _scheduler_lock:
+        armed = ENABLED and scheduler_requests['remaining'] > 0
+        if armed:
+            scheduler_requests['remaining'] -= 1
+            mode = scheduler_requests['mode']
+    handle = None
+    if armed:
+        try:
+            handle = start(mode)
+        except Exception as e:             # a profiler problem never costs the cycle itself
+            print(f"[profiling] Could not profile scheduler cycle: {e}")
+    if handle is None:
+        yield
+        return
+    try:
+        yield
+    finally:
+        try:
+            name = stop(handle, label)
+            print(f"[profiling] Saved scheduler cycle profile: {name}")
+        except Exception as e:
+            print(f"[profiling] Could not save scheduler cycle profile: {e}")
+
+
+# ─── RING OF PROFILE FILES ───────────────────────────────────────────────────
+
+def _new_path(label: str, ext: str) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_') or 'root'
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    return os.path.join(PROFILE_DIR, f'{stamp}_{slug}.{ext}')
+
+
+def _save(label: str, ext: str, data: bytes) -> str:
+    path = _new_path(label, ext)
+    with open(path, 'wb') as f:
+        f.write(data)
+    _trim_ring()
+    return os.path.basename(path)
+
+
+def _trim_ring():
+    with _ring_lock:
+        files = list_profiles()
+        for entry in files[PROFILE_KEEP:]:
+            try:
+                os.remove(os.path.join(PROFILE_DIR, entry['name']))
+            except OSError:
+                pass
+
+
+def list_profiles() -> list:
+    """Saved profiles, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    entries = []
+    for name in os.listdir(PROFILE_DIR):
+        if not name.endswith(('.pstats', '.collapsed')):
+            continue
+        st = os.stat(os.path.join(PROFILE_DIR, name))
+        entries.append({'name': name, 'bytes': st.st_size, 'mtime': st.st_mtime})
+    entries.sort(key=lambda e: e['name'], reverse=True)
+    return entries
+
+
+def profile_path(name: str) -> str | None:
+    """Absolute path of a saved profile, or None if the name is unknown/unsafe."""
+    if os.path.basename(name) != name:
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+def pstats_text(path: str, limit: int = 40) -> str:
+    """Top `limit` functions by cumulative time, as text."""
+    out = io.StringIO()
+    pstats.Stats(path, stream=out).sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
@@ -0,0 +1,414 @@
+"""
+registry.py — NAMED UPLOADED DATASETS UNDER A MEMORY BUDGET
+============================================================
+Every upload gets an id and stays available after the next upload.
+Dashboard endpoints take ?dataset=<id>. Without it they read the active
+upload (the latest one, or the one picked with POST
+/api/datasets/<id>/activate), so switching files needs no re-upload.
+
+Resident datasets share one budget, DATASET_MEMORY_MB. When going over
+it, the least recently used datasets are evicted to disk until the total
+fits again. The dataset being added or read is never evicted, so a
+single upload bigger than the budget still works.
+
+How it works:
+  - add() registers a freshly uploaded DataFrame. It stays resident
+    as-is and is sized with memory_usage(deep=True).
+  - Eviction writes the frame to DATASET_DIR/<id>/ in the compact
+    columnar format of datasets.py (categorical codes, UTF-8 blobs,
+    numpy arrays), unless it is already there, and then drops it.
+    Victims are picked under the registry lock; the write happens after
+    it is released, so other requests never wait on an eviction's I/O.
+  - get() of an evicted dataset re-attaches it lazily with
+    datasets.load(). That gives a memory-mapped frame, so reloading
+    reads nothing up front. Its mapped size counts against the budget.
+  - RUN_MODE=multi: uploads are published to disk already, so any
+    worker can attach any id on first use. The budget is per worker.
+  - Datasets on disk are listed too, including ones written by another
+    worker or a previous process.
+
+Snapshots and precomputed aggregates:
+  - persist() snapshots a new upload to DATASET_DIR in the background,
+    so it survives a restart and eviction later costs nothing. The
+    least recently used snapshots beyond DATASET_KEEP are deleted (never
+    the active or a resident one). Use is recorded on disk (at most every
+    TOUCH_INTERVAL seconds), so it counts across workers and restarts.
+  - aggregate() caches whole-dataset payloads (overview, sentiment, ...)
+    per dataset, in memory and in DATASET_DIR/<id>/aggregates.json.
+    persist() computes them right after the snapshot. So a restored or
+    re-uploaded dataset answers those endpoints without touching rows.
+    Bump AGGREGATE_VERSION when a payload's shape changes.
+  - find() looks a dataset up by the content hash of its upload, so
+    app.py can skip parsing a file it has seen before.
+  - derived() keeps in-memory structures built from a resident frame
+    (the bitmap indexes of bitmaps.py). They live and die with the frame
+    and their nbytes count against the budget.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import pandas as pd
+
+import datasets
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+MEMORY_BUDGET     = int(float(os.getenv('DATASET_MEMORY_MB', 1024)) * 1024 * 1024)
+KEEP_ON_DISK      = int(os.getenv('DATASET_KEEP', 20))        # 0 = keep every snapshot
+AGGREGATE_VERSION = 1
+TOUCH_INTERVAL    = 60                                        # seconds between on-disk last-use updates
+
+_entries: OrderedDict = OrderedDict()     # id → Entry, least recently used first
+_lock = threading.RLock()
+_persist_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dataset-persist')
+_pending: list = []                       # persist() futures not known to be done
+stats = {'evictions': 0, 'reloads': 0, 'aggregate_hits': 0, 'aggregate_misses': 0}
+
+
+class Entry:
+    """One named dataset; frame/text are None while it is evicted."""
+
+    def __init__(self, dataset_id: str, meta: dict, frame: pd.DataFrame | None = None,
+                 text: dict | None = None, nbytes: int = 0, on_disk: bool = False):
+        self.id = dataset_id
+        self.meta = meta
+        self.frame = frame
+        self.text = text
+        self.nbytes = nbytes
+        self.on_disk = on_disk
+        self.last_used = time.time()
+        self.touched_at = 0.0           # last datasets.touch() of this snapshot
+        self.evicting = False           # picked by _pick_victims(), being saved
+        self.aggregates: dict = {}
+        self.derived: dict = {}
+        self.save_lock = threading.Lock()
+        self.build_lock = threading.Lock()
+
+    @property
+    def resident(self) -> bool:
+        return self.frame is not None
+
+    @property
+    def memory_bytes(self) -> int:
+        if not self.resident:
+            return 0
+        return self.nbytes + sum(getattr(d, 'nbytes', 0) for d in list(self.derived.values()))
+
+    def describe(self) -> dict:
+        return {
+            'id': self.id,
+            'filename': self.meta.get('filename'),
+            'rows': self.meta.get('rows'),
+            'uploaded_at': self.meta.get('uploaded_at'),
+            'resident': self.resident,
+            'memory_bytes': self.memory_bytes,
+            'on_disk': self.on_disk,
+            'last_used': self.last_used,
+        }
+
+
+# ─── REGISTER / LOOK UP ──────────────────────────────────────────────────────
+
+def new_id() -> str:
+    return datasets.new_version()
+
+
+def add(df: pd.DataFrame, meta: dict, dataset_id: str | None = None) -> str:
+    """Register an uploaded DataFrame as resident. Returns its id."""
+    dataset_id = dataset_id or new_id()
+    entry = Entry(dataset_id, meta, df, None, int(df.memory_usage(deep=True).sum()))
+    with _lock:
+        _entries[dataset_id] = entry
+        victims = _pick_victims(keep=dataset_id)
+    _evict(victims)
+    return dataset_id
+
+
+def get(dataset_id: str | None) -> tuple | None:
+    """
+    (frame, text) of a dataset, reloading it from disk if it was evicted.
+    None when the id is unknown or its files were removed.
+    """
+    if not dataset_id:
+        return None
+    with _lock:
+        entry = _entries.get(dataset_id) or _discover(dataset_id)
+        if entry is None:
+            return None
+        if entry.on_disk and not datasets.exists(dataset_id):
+            _entries.pop(dataset_id, None)            # removed by another worker
+            return None
+        if not entry.resident:
+            try:
+                shared = datasets.load(dataset_id)
+            except (OSError, ValueError) as e:
+                print(f"[registry.py] Could not reload dataset {dataset_id}: {e}")
+                return None
+            entry.frame, entry.text, entry.nbytes = shared.frame, shared.text, shared.nbytes
+            stats['reloads'] += 1
+        entry.last_used = time.time()
+        _entries.move_to_end(dataset_id)
+        frame, text = entry.frame, entry.text
+        touch = entry.on_disk and entry.last_used - entry.touched_at > TOUCH_INTERVAL
+        if touch:
+            entry.touched_at = entry.last_used
+        victims = _pick_victims(keep=dataset_id)
+    if touch:
+        datasets.touch(dataset_id)
+    _evict(victims)
+    return frame, text
+
+
+def exists(dataset_id: str | None) -> bool:
+    if not dataset_id:
+        return False
+    with _lock:
+        return dataset_id in _entries or _discover(dataset_id) is not None
+
+
+def meta(dataset_id: str) -> dict:
+    with _lock:
+        entry = _entries.get(dataset_id) or _discover(dataset_id)
+        return dict(entry.meta) if entry else {}
+
+
+def remove(dataset_id: str) -> bool:
+    """Forget a dataset and delete its files. False when the id is unknown."""
+    with _lock:
+        entry = _entries.pop(dataset_id, None) or _discover(dataset_id, register=False)
+    if entry is None:
+        return False
+    datasets.remove(dataset_id)
+    return True
+
+
+def _discover(dataset_id: str, register: bool = True) -> Entry | None:
+    """An Entry for a dataset that is on disk but not in this process yet."""
+    if not datasets.exists(dataset_id):
+        return None
+    entry = Entry(dataset_id, datasets.upload_meta(dataset_id), on_disk=True)
+    entry.last_used = datasets.last_used(dataset_id)
+    saved = datasets.load_aggregates(dataset_id)
+    if saved.get('version') == AGGREGATE_VERSION:
+        entry.aggregates = saved.get('values') or {}
+    if register:
+        _entries[dataset_id] = entry
+        _entries.move_to_end(dataset_id, last=False)
+    return entry
+
+
+def _scan_disk():
+    for dataset_id in datasets.saved_versions():
+        if dataset_id not in _entries:
+            _discover(dataset_id)
+
+
+def find(content_hash: str) -> str | None:
+    """Id of a dataset uploaded from exactly these bytes, if it is still available."""
+    with _lock:
+        _scan_disk()
+        for entry in reversed(_entries.values()):
+            if entry.meta.get('content_hash') == content_hash and (entry.resident or datasets.exists(entry.id)):
+                return entry.id
+    return None
+
+
+# ─── AGGREGATES / SNAPSHOTS ──────────────────────────────────────────────────
+
+def aggregate(dataset_id: str | None, name: str, compute) -> dict:
+    """
+    compute(frame, text) for a dataset, cached per (dataset, name). With no
+    dataset (SQLite mode) it is computed over None every time.
+    """
+    with _lock:
+        entry = (_entries.get(dataset_id) or _discover(dataset_id)) if dataset_id else None
+        cached = entry.aggregates.get(name) if entry else None
+    if cached is not None:
+        stats['aggregate_hits'] += 1
+        return cached
+    frame, text = get(dataset_id) or (None, None)
+    value = compute(frame, text)
+    if entry is not None and frame is not None:
+        stats['aggregate_misses'] += 1
+        with _lock:
+            entry.aggregates[name] = value
+        if entry.on_disk:
+            _write_aggregates(entry)
+    return value
+
+
+def _write_aggregates(entry: Entry):
+    with _lock:
+        values = dict(entry.aggregates)
+    try:
+        datasets.save_aggregates(entry.id, {'version': AGGREGATE_VERSION, 'values': values})
+    except OSError as e:
+        print(f"[registry.py] Could not save aggregates of {entry.id}: {e}")
+
+
+def derived(dataset_id: str | None, name: str, build):
+    """
+    build(frame, text) for a resident dataset, kept in memory until the
+    frame is evicted. None when the dataset is unknown.
+    """
+    loaded = get(dataset_id)
+    if loaded is None:
+        return None
+    with _lock:
+        entry = _entries.get(dataset_id)
+    if entry is None:
+        return None
+    with entry.build_lock:
+        value = entry.derived.get(name)
+        if value is None:
+            started = time.perf_counter()
+            value = build(*loaded)
+            victims = []
+            with _lock:
+                if entry.frame is loaded[0]:
+                    entry.derived[name] = value
+                    victims = _pick_victims(keep=dataset_id)
+            _evict(victims)
+            print(f"[registry.py] Built {name} for dataset {dataset_id} "
+                  f"in {time.perf_counter() - started:.2f}s")
+    return value
+
+
+def frame_id(frame: pd.DataFrame) -> str | None:
+    """Id of the resident dataset holding this frame, for code that is only handed the frame."""
+    with _lock:
+        for entry in _entries.values():
+            if entry.frame is frame:
+                return entry.id
+    return None
+
+
+def persist(dataset_id: str, warm: dict | None = None, derive: dict | None = None):
+    """
+    In the background: snapshot the dataset to disk unless it is there
+    already, then precompute the `warm` aggregates ({name: compute}) and
+    build the `derive` structures ({name: build}).
+    """
+    future = _persist_pool.submit(_persist, dataset_id, warm or {}, derive or {})
+    with _lock:
+        _pending[:] = [f for f in _pending if not f.done()] + [future]
+
+
+def flush(timeout: float | None = None):
+    """Wait for queued persist() work (benchmarks, shutdown)."""
+    with _lock:
+        pending = list(_pending)
+    wait(pending, timeout=timeout)
+
+
+def _persist(dataset_id: str, warm: dict, derive: dict):
+    with _lock:
+        entry = _entries.get(dataset_id) or _discover(dataset_id)
+    if entry is None:
+        return
+    try:
+        _save(entry)
+        # Derived structures first: some aggregates read them (see frame_id)
+        for name, build in derive.items():
+            derived(dataset_id, name, build)
+        for name, compute in warm.items():
+            aggregate(dataset_id, name, compute)
+        _prune_disk()
+    except Exception as e:
+        print(f"[registry.py] Could not persist dataset {dataset_id}: {e}")
+
+
+def _save(entry: Entry):
+    """Write a resident dataset to DATASET_DIR once; eviction and persist() both call this."""
+    with entry.save_lock:
+        if entry.on_disk:
+            return
+        started = time.perf_counter()
+        datasets.save(entry.frame, entry.meta, entry.id)
+        entry.on_disk = True
+        if entry.aggregates:
+            _write_aggregates(entry)
+        print(f"[registry.py] Saved dataset {entry.id} ({entry.nbytes / 1e6:.1f} MB in memory) "
+              f"in {time.perf_counter() - started:.2f}s")
+
+
+def _prune_disk():
+    """
+    Delete the least recently used snapshots beyond KEEP_ON_DISK, never the
+    active or a resident one. Last use is this process's, or the on-disk
+    record of other workers' (datasets.touch), whichever is later.
+    """
+    if KEEP_ON_DISK <= 0:
+        return
+    active = datasets.read_pointer().get('version')
+    with _lock:
+        used = {e.id: e.last_used for e in _entries.values()}
+    saved = datasets.saved_versions()
+    recent_first = sorted(saved, key=lambda v: max(used.get(v, 0.0), datasets.last_used(v)), reverse=True)
+    for dataset_id in recent_first[KEEP_ON_DISK:]:
+        entry = _entries.get(dataset_id)
+        if dataset_id != active and not (entry and entry.resident):
+            remove(dataset_id)
+
+
+# ─── EVICTION ────────────────────────────────────────────────────────────────
+
+def _pick_victims(keep: str) -> list:
+    """
+    Least recently used resident datasets (never `keep`) whose eviction
+    brings memory back under the budget, as (entry, last_used) pairs.
+    Caller holds _lock and passes the result to _evict() after releasing it.
+    """
+    over = resident_bytes() - MEMORY_BUDGET
+    over -= sum(e.memory_bytes for e in _entries.values() if e.evicting)   # already on their way out
+    victims = []
+    for dataset_id, entry in _entries.items():
+        if over <= 0:
+            break
+        if dataset_id != keep and entry.resident and not entry.evicting:
+            entry.evicting = True
+            victims.append((entry, entry.last_used))
+            over -= entry.memory_bytes
+    return victims
+
+
+def _evict(victims: list):
+    """Save and drop picked datasets. Called without _lock: the save is disk I/O."""
+    for entry, picked_at in victims:
+        try:
+            _save(entry)
+        except Exception as e:
+            print(f"[registry.py] Could not evict dataset {entry.id}: {e}")
+            with _lock:
+                entry.evicting = False
+            continue
+        with _lock:
+            entry.evicting = False
+            if not entry.resident or entry.last_used != picked_at:
+                continue                  # read again while saving: it is the most recent now
+            entry.frame, entry.text, entry.nbytes = None, None, 0
+            entry.derived = {}
+            stats['evictions'] += 1
+        print(f"[registry.py] Evicted dataset {entry.id}")
+
+
+# ─── STATUS ──────────────────────────────────────────────────────────────────
+
+def resident_bytes() -> int:
+    return sum(e.memory_bytes for e in _entries.values())
+
+
+def listing() -> list:
+    """Every known dataset (in memory or on disk), most recently used first."""
+    with _lock:
+        _scan_disk()
+        return [e.describe() for e in reversed(_entries.values())]
+
+
+def memory() -> dict:
+    with _lock:
+        return {'budget_bytes': MEMORY_BUDGET, 'resident_bytes': resident_bytes(),
+                'resident_datasets': sum(e.resident for e in _entries.values()), **stats}
@@ -0,0 +1,82 @@
+"""
+result_cache.py — LRU CACHE OF FILTERED, SORTED ROW IDS
+========================================================
+Dashboard users flip between the same few listings: a sentiment tab, a
+subreddit from the dropdown, a sort order. /api/comments and
+/api/threads cache the full result of a listing as a vector of row ids,
+already filtered and sorted. Every page of it, and every later visit, is
+then a slice of that vector.
+
+How it works:
+  - Keys are tuples that start with the dataset id, followed by the
+    listing and its normalised parameters (search term, filters, date
+    bounds, sort column and direction). An uploaded dataset never changes
+    under its id, so the id is the dataset version. A new upload gets a
+    new id, and its listings simply miss.
+  - Values are numpy row-id arrays. The cache is bounded by their total
+    size, RESULT_CACHE_MB, and evicts least recently used first. A single
+    result bigger than the whole budget is not stored.
+  - invalidate(dataset_id) drops a dataset's entries when it is deleted.
+    invalidate() with no id empties the cache.
+  - Hits and misses are counted for /metrics and /api/upload-status.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+CACHE_BYTES = int(float(os.getenv('RESULT_CACHE_MB', 64)) * 1024 * 1024)
+
+_cache: OrderedDict = OrderedDict()       # key → row ids, least recently used first
+_lock = threading.Lock()
+_bytes = 0
+stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def get(key: tuple) -> np.ndarray | None:
+    with _lock:
+        rows = _cache.get(key)
+        if rows is None:
+            stats['misses'] += 1
+            return None
+        _cache.move_to_end(key)
+        stats['hits'] += 1
+        return rows
+
+
+def put(key: tuple, rows: np.ndarray):
+    global _bytes
+    if rows.nbytes > CACHE_BYTES:
+        return
+    with _lock:
+        old = _cache.pop(key, None)
+        if old is not None:
+            _bytes -= old.nbytes
+        _cache[key] = rows
+        _bytes += rows.nbytes
+        while _bytes > CACHE_BYTES:
+            _, dropped = _cache.popitem(last=False)
+            _bytes -= dropped.nbytes
+            stats['evictions'] += 1
+
+
+def invalidate(dataset_id: str | None = None):
+    """Drop the entries of one dataset, or every entry when no id is given."""
+    global _bytes
+    with _lock:
+        for key in [k for k in _cache if dataset_id is None or k[0] == dataset_id]:
+            _bytes -= _cache.pop(key).nbytes
+
+
+def hit_ratio() -> float:
+    lookups = stats['hits'] + stats['misses']
+    return stats['hits'] / lookups if lookups else 0.0
+
+
+def summary() -> dict:
+    with _lock:
+        return {'entries': len(_cache), 'bytes': _bytes, 'budget_bytes': CACHE_BYTES,
+                'hit_ratio': round(hit_ratio(), 4), **stats}
@@ -0,0 +1,286 @@
+"""
+retention.py — RETENTION, DOWNSAMPLING AND COMPACTION FOR reddit.db
+====================================================================
+The scheduler inserts into `posts` forever. This job keeps the table, and
+the file on disk, bounded on long-running deployments:
+
+    posts_YYYY_MM  raw rows, kept RETENTION_RAW_DAYS, then rolled up into ↓
+    posts_hourly   per hour × subreddit, kept RETENTION_HOURLY_DAYS
+    posts_daily    per day × subreddit, kept RETENTION_DAILY_DAYS (0 = forever)
+
+How it works:
+  - run() is an interval job on the scheduler, so in RUN_MODE=multi only
+    the leader runs it.
+  - A month partition (see db.py) that is wholly past the cutoff is rolled
+    up and dropped in one transaction: a GROUP BY and a DROP TABLE, with no
+    per-row deletes.
+  - In the month that straddles the cutoff, expired rows are moved
+    RETENTION_BATCH at a time. Each batch is one short BEGIN IMMEDIATE
+    transaction: it adds the rows to both summary tables (upsert) and
+    deletes them, so a total is never lost or counted twice. Between
+    batches the job sleeps BATCH_PAUSE so scheduler inserts get the write
+    lock. In WAL mode readers are never blocked at all.
+  - Afterwards PRAGMA incremental_vacuum hands up to RETENTION_VACUUM_PAGES
+    free pages back to the OS, and the WAL file is checkpointed (truncated).
+  - A database created before auto_vacuum=INCREMENTAL is converted once,
+    by a full VACUUM on the first run.
+
+created_time is compared as an ISO 8601 string. scheduler.py writes the
+'T' separator but imported rows may carry a space, so comparisons go
+through NORMALIZED_SQL. Each is paired with a looser test on the raw
+column, so each partition's created_time index still serves the range scans.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
+import db
+from metrics import DB_QUERY_SECONDS, RETENTION_ROWS
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+RAW_DAYS         = float(os.getenv('RETENTION_RAW_DAYS', 30))      # 0 = keep raw rows forever
+HOURLY_DAYS      = float(os.getenv('RETENTION_HOURLY_DAYS', 180))  # 0 = keep hourly forever
+DAILY_DAYS       = float(os.getenv('RETENTION_DAILY_DAYS', 0))     # 0 = keep daily forever
+BATCH_SIZE       = int(os.getenv('RETENTION_BATCH', 500))
+INTERVAL_SECONDS = int(os.getenv('RETENTION_INTERVAL', 3600))
+VACUUM_PAGES     = int(os.getenv('RETENTION_VACUUM_PAGES', 2000))
+BATCH_PAUSE      = 0.05
+
+# Bucket key of a raw row per summary granularity (see db.SUMMARY_TABLES)
+BUCKET_SQL = {
+    'hour': "replace(substr(created_time, 1, 13), ' ', 'T')",
+    'day':  "substr(created_time, 1, 10)",
+}
+# created_time with a 'T' separator whichever one the writer used. The raw
+# value never sorts after it (' ' < 'T'), hence the index-friendly bounds below.
+NORMALIZED_SQL = "replace(created_time, ' ', 'T')"
+
+last_run: dict = {}
+
+
+def _connect() -> sqlite3.Connection:
+    return sqlite3.connect(db.DB_PATH, timeout=10, isolation_level=None)
+
+
+def _cutoff(days: float, now: datetime, width: int) -> str:
+    """ISO prefix `days` before now, floored to a whole hour/day so buckets expire whole."""
+    at = now - timedelta(days=days)
+    at = at.replace(minute=0, second=0, microsecond=0)
+    return at.strftime('%Y-%m-%dT%H:%M:%S')[:width]
+
+
+# ─── ROLL-UP ─────────────────────────────────────────────────────────────────
+
+def _upsert_summaries(conn: sqlite3.Connection, source: str, where: str, params: tuple):
+    """Add rows of `source` matching `where` to both summary tables."""
+    for granularity, table in db.SUMMARY_TABLES.items():
+        conn.execute(f"""
+        INSERT INTO {table} (bucket, subreddit, count, positive, neutral, negative, score_sum, upvotes_sum)
+        SELECT {BUCKET_SQL[granularity]}, COALESCE(subreddit, ''), COUNT(*),
+               COUNT(CASE WHEN sentiment_label = 'Positive' THEN 1 END),
+               COUNT(CASE WHEN sentiment_label = 'Neutral'  THEN 1 END),
+               COUNT(CASE WHEN sentiment_label = 'Negative' THEN 1 END),
+               TOTAL(sentiment_score), COALESCE(SUM(upvotes), 0)
+        FROM {source} WHERE {where}
+        GROUP BY 1, 2
+        ON CONFLICT (bucket, subreddit) DO UPDATE SET
+            count       = count       + excluded.count,
+            positive    = positive    + excluded.positive,
+            neutral     = neutral     + excluded.neutral,
+            negative    = negative    + excluded.negative,
+            score_sum   = score_sum   + excluded.score_sum,
+            upvotes_sum = upvotes_sum + excluded.upvotes_sum
+        """, params)
+
+
+def _rollup_partition(conn: sqlite3.Connection, table: str) -> int:
+    """Roll up and drop a whole expired month. Returns rows rolled up."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        _upsert_summaries(conn, table, '1', ())
+        db.drop_partition(table, conn)
+        conn.execute("COMMIT")
+        return rows
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _rollup_batch(conn: sqlite3.Connection, table: str, cutoff: str, batch: int) -> int:
+    """Move one batch of rows older than cutoff into the summaries. Returns rows moved."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        ids = [r[0] for r in conn.execute(
+            f"SELECT rowid FROM {table} WHERE created_time < ? AND {NORMALIZED_SQL} < ? "
+            f"ORDER BY created_time LIMIT ?",
+            (cutoff, cutoff, batch))]
+        if not ids:
+            conn.execute("COMMIT")
+            return 0
+        id_json = json.dumps(ids)
+        _upsert_summaries(conn, table, 'rowid IN (SELECT value FROM json_each(?))', (id_json,))
+        conn.execute(f"DELETE FROM {table} WHERE rowid IN (SELECT value FROM json_each(?))", (id_json,))
+        conn.execute("COMMIT")
+        return len(ids)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _rollup_expired(conn: sqlite3.Connection, cutoff: str) -> dict:
+    """Roll up every raw row older than cutoff: whole months first, then the boundary month."""
+    done = {'rolled_up': 0, 'partitions_dropped': 0}
+    for table in db.partitions_for(conn, end=cutoff):
+        if table == db.UNDATED_PARTITION:
+            continue                      # no timestamp → never expires
+        if db.partition_bounds(table)[1] <= cutoff:
+            done['rolled_up'] += _rollup_partition(conn, table)
+            done['partitions_dropped'] += 1
+            continue
+        while True:
+            moved = _rollup_batch(conn, table, cutoff, BATCH_SIZE)
+            done['rolled_up'] += moved
+            if moved < BATCH_SIZE:
+                break
+            time.sleep(BATCH_PAUSE)
+    return done
+
+
+def _expire_batches(conn: sqlite3.Connection, table: str, cutoff: str, batch: int) -> int:
+    """Delete summary rows with bucket < cutoff, batch by batch. Returns rows deleted."""
+    deleted = 0
+    while True:
+        cur = conn.execute(
+            f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE bucket < ? LIMIT ?)",
+            (cutoff, batch))
+        deleted += cur.rowcount
+        if cur.rowcount < batch:
+            return deleted
+        time.sleep(BATCH_PAUSE)
+
+
+# ─── COMPACTION ──────────────────────────────────────────────────────────────
+
+def compact(conn: sqlite3.Connection) -> dict:
+    """Give free pages back to the OS and truncate the WAL."""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        print("[retention] Converting reddit.db to auto_vacuum=INCREMENTAL (one-time VACUUM)...")
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    # executescript steps the pragma to completion; execute() frees a single page
+    conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES});")
+    free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    return {'pages_released': free_before - free_after, 'free_pages': free_after}
+
+
+# ─── JOB ─────────────────────────────────────────────────────────────────────
+
+@DB_QUERY_SECONDS.timed(query='retention')
+def run(now: datetime | None = None) -> dict:
+    """One retention pass: roll up, expire summaries, compact. Returns what it did."""
+    global last_run
+    now = now or datetime.now(timezone.utc)
+    started = time.perf_counter()
+    result = {'rolled_up': 0, 'partitions_dropped': 0, 'hourly_deleted': 0, 'daily_deleted': 0}
+    conn = _connect()
+    try:
+        if RAW_DAYS > 0:
+            result.update(_rollup_expired(conn, _cutoff(RAW_DAYS, now, 19)))
+        if HOURLY_DAYS > 0:
+            result['hourly_deleted'] = _expire_batches(
+                conn, db.SUMMARY_TABLES['hour'], _cutoff(HOURLY_DAYS, now, 13), BATCH_SIZE)
+        if DAILY_DAYS > 0:
+            result['daily_deleted'] = _expire_batches(
+                conn, db.SUMMARY_TABLES['day'], _cutoff(DAILY_DAYS, now, 10), BATCH_SIZE)
+        result.update(compact(conn))
+    finally:
+        conn.close()
+    RETENTION_ROWS.inc(result['rolled_up'], action='rolled_up')
+    RETENTION_ROWS.inc(result['hourly_deleted'] + result['daily_deleted'], action='summary_deleted')
+    result['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    result['finished_at'] = datetime.now().isoformat()
+    last_run = result
+    print(f"[retention] Rolled up {result['rolled_up']} rows, released {result['pages_released']} pages "
+          f"in {result['duration_ms']} ms")
+    return result
+
+
+def status() -> dict:
+    """Retention config, last run, row counts and file size (GET /api/retention)."""
+    conn = _connect()
+    try:
+        partitions = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                      for t in db.partitions_for(conn)}
+        tables = {'posts': sum(partitions.values()),
+                  **{t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                     for t in db.SUMMARY_TABLES.values()}}
+        oldest = next((conn.execute(f"SELECT MIN(created_time) FROM {t}").fetchone()[0]
+                       for t, n in partitions.items() if n and t != db.UNDATED_PARTITION), None)
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        'config': {'raw_days': RAW_DAYS, 'hourly_days': HOURLY_DAYS, 'daily_days': DAILY_DAYS,
+                   'batch': BATCH_SIZE, 'interval_seconds': INTERVAL_SECONDS},
+        'rows': tables,
+        'partitions': partitions,
+        'oldest_raw': oldest,
+        'db_bytes': os.path.getsize(db.DB_PATH) if os.path.exists(db.DB_PATH) else 0,
+        'free_bytes': free_pages * page_size,
+        'last_run': last_run or None,
+    }
+
+
+# ─── READ SIDE ───────────────────────────────────────────────────────────────
+
+@DB_QUERY_SECONDS.timed(query='history')
+def history(granularity: str = 'day', days: float = 30, subreddit: str | None = None) -> list:
+    """
+    Sentiment per hour/day over the last `days`, continuous across the
+    retention boundary: summary rows for expired data plus raw rows on the fly.
+    """
+    if granularity not in db.SUMMARY_TABLES:
+        raise ValueError(f"granularity must be one of {', '.join(db.SUMMARY_TABLES)}")
+    width = 13 if granularity == 'hour' else 10
+    start = _cutoff(days, datetime.now(timezone.utc), width)
+    sub_sql, params = ('AND subreddit = ?', (subreddit,)) if subreddit else ('', ())
+    totals: dict = {}
+
+    def add(rows):
+        for bucket, *values in rows:
+            acc = totals.setdefault(bucket, [0, 0, 0, 0, 0.0])
+            for i, v in enumerate(values):
+                acc[i] += v or 0
+
+    conn = _connect()
+    try:
+        add(conn.execute(f"""
+        SELECT bucket, SUM(count), SUM(positive), SUM(neutral), SUM(negative), TOTAL(score_sum)
+        FROM {db.SUMMARY_TABLES[granularity]} WHERE bucket >= ? {sub_sql}
+        GROUP BY bucket
+        """, (start, *params)))
+        # Buckets never straddle months, so each partition is aggregated on its own
+        for table in db.partitions_for(conn, start=start):
+            add(conn.execute(f"""
+            SELECT {BUCKET_SQL[granularity]}, COUNT(*),
+                   COUNT(CASE WHEN sentiment_label = 'Positive' THEN 1 END),
+                   COUNT(CASE WHEN sentiment_label = 'Neutral'  THEN 1 END),
+                   COUNT(CASE WHEN sentiment_label = 'Negative' THEN 1 END),
+                   TOTAL(sentiment_score)
+            FROM {table} WHERE created_time >= ? AND {NORMALIZED_SQL} >= ? {sub_sql}
+            GROUP BY 1
+            """, (start.replace('T', ' '), start, *params)))
+    finally:
+        conn.close()
+    return [
+        {'bucket': b, 'count': c, 'positive': p, 'neutral': n, 'negative': g,
+         'avg_score': round(s / c, 4) if c else 0}
+        for b, (c, p, n, g, s) in sorted(totals.items())
+    ]
@@ -29,7 +29,8 @@ import traceback
 from datetime import datetime, timezone
 
 import pandas as pd
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from clean import clean_text
+from scoring import get_analyzer
 
 # ─── CONFIG ──────────────────────────────────────────────────────────────────
 
@@ -44,9 +45,6 @@ POSTS_PER_SUBREDDIT = 5
 
 # ─── HELPERS ─────────────────────────────────────────────────────────────────
 
-analyzer = SentimentIntensityAnalyzer()
-
-
 def _label(score: float) -> str:
     if score >= 0.05:
         return "Positive"
@@ -56,7 +54,7 @@ def _label(score: float) -> str:
 
 
 def _score(text: str) -> dict:
-    s = analyzer.polarity_scores(str(text))
+    s = get_analyzer().polarity_scores(str(text))
     return {
         "compound_score": round(s["compound"], 4),
         "sentiment": _label(s["compound"]),
@@ -66,16 +64,6 @@ def _score(text: str) -> dict:
     }
 
 
-def _clean(text: str) -> str:
-    """Minimal inline text cleaning so we don't import from clean.py."""
-    import re
-    text = str(text).lower()
-    text = re.sub(r"http\S+", "", text)           # remove URLs
-    text = re.sub(r"[^a-z0-9\s]", "", text)       # keep alphanumeric
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
-
-
 # ─── LIVE MODE: fetch via PRAW ────────────────────────────────────────────────
 
 def _try_live_fetch(output_file: str, existing_df: pd.DataFrame) -> pd.DataFrame | None:
@@ -122,7 +110,7 @@ def _try_live_fetch(output_file: str, existing_df: pd.DataFrame) -> pd.DataFrame
                     text = getattr(comment, "body", "").strip()
                     if not text or text in ("[deleted]", "[removed]"):
                         continue
-                    cleaned = _clean(text)
+                    cleaned = clean_text(text)
                     scores = _score(cleaned)
                     new_rows.append({
                         "post_id": post.id,
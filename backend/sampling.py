@@ -0,0 +1,260 @@
+"""
+sampling.py — STRATIFIED SAMPLES FOR ?approx=true ON HUGE UPLOADS
+==================================================================
+Exact dashboard payloads over tens of millions of rows take seconds the
+first time they are computed. With ?approx=true, /api/overview,
+/api/sentiment, /api/subreddits and /api/trends are answered from a
+stratified sample instead: scaled estimates, each with a confidence
+interval. Without the parameter nothing changes.
+
+How it works:
+  - Strata are subreddit × sentiment_label. Each stratum gets a share of
+    SAMPLE_ROWS (default 100 000) proportional to its size, but at least
+    SAMPLE_MIN_STRATUM rows (or all of them), so small subreddits are
+    still measured. Rows are drawn without replacement, with a fixed seed.
+    A dataset smaller than SAMPLE_ROWS is kept whole, so its estimates
+    are exact and its intervals have zero width.
+  - Every sampled row has weight N_h / n_h (stratum size / rows drawn).
+    Counts are weighted sums and means are ratio estimators. Variances
+    use the stratified formula with the finite population correction,
+    sum_h N_h^2 (1 - n_h/N_h) s_h^2 / n_h, linearised for ratios.
+  - Intervals are estimate ± z·SE at SAMPLE_CONFIDENCE (default 0.95).
+    Everything that only depends on stratum sizes (total rows, label
+    counts and per-subreddit counts) is exact and has no interval.
+  - The sample is built after the upload next to the bitmap index
+    (registry.derived), and its memory counts against the budget.
+
+Responses keep their usual shape, with estimates in place of exact
+values, and add an 'approx' block: sample size, confidence and the
+intervals.
+"""
+
+import os
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+import timeseries
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+SAMPLE_ROWS   = int(os.getenv('SAMPLE_ROWS', 100_000))
+MIN_STRATUM   = int(os.getenv('SAMPLE_MIN_STRATUM', 30))
+CONFIDENCE    = float(os.getenv('SAMPLE_CONFIDENCE', 0.95))
+SEED          = 0
+COLUMNS       = ('subreddit', 'sentiment_label', 'sentiment_score', timeseries.EPOCH_COLUMN)
+
+Z = NormalDist().inv_cdf(0.5 + CONFIDENCE / 2)
+
+
+class StratifiedSample:
+    """A subreddit × sentiment_label stratified sample of one dataset, with weights."""
+
+    def __init__(self, df: pd.DataFrame, text: dict | None = None, size: int = SAMPLE_ROWS):
+        timeseries.ensure_epochs(df)
+        self.rows_total = len(df)
+        sub_codes, subs = pd.factorize(df['subreddit'], use_na_sentinel=False)
+        label_codes, labels = pd.factorize(df['sentiment_label'], use_na_sentinel=False)
+        width = max(len(labels), 1)
+        codes, keys = pd.factorize(sub_codes.astype(np.int64) * width + label_codes)
+        self.sub_of = keys // width                        # stratum → subreddit code
+        self.subs = subs
+        self.label_of = np.asarray(labels)[keys % width] if len(keys) else np.empty(0, dtype=object)
+
+        sizes = np.bincount(codes, minlength=len(keys))
+        if self.rows_total <= size:
+            taken = sizes
+        else:
+            share = np.round(size * sizes / self.rows_total).astype(np.int64)
+            taken = np.minimum(sizes, np.maximum(share, MIN_STRATUM))
+
+        # Sort by stratum with random order inside each, then keep the first taken[h] of stratum h
+        rng = np.random.default_rng(SEED)
+        order = np.argsort(codes + rng.random(self.rows_total), kind='stable')
+        first = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+        rank = np.arange(self.rows_total) - first[codes[order]]
+        rows = np.sort(order[rank < taken[codes[order]]])
+
+        self.sizes = sizes.astype(float)
+        self.taken = taken.astype(float)
+        self.stratum = codes[rows]
+        self.weight = (self.sizes / np.maximum(self.taken, 1))[self.stratum]
+        self.frame = df[[c for c in COLUMNS if c in df.columns]].iloc[rows].reset_index(drop=True)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.sizes, self.taken, self.stratum, self.weight, self.sub_of)
+        return int(self.frame.memory_usage(deep=True).sum()) + sum(a.nbytes for a in arrays)
+
+    # ─── ESTIMATORS ──────────────────────────────────────────────────────────
+
+    def _variance(self, cell_domain: np.ndarray, cell_stratum: np.ndarray, s1: np.ndarray, s2: np.ndarray,
+                  size: int) -> np.ndarray:
+        """Per-domain variance of an estimated total from sums of z and z² per occupied (domain, stratum) cell."""
+        n_h, N_h = self.taken[cell_stratum], self.sizes[cell_stratum]
+        s_h = np.where(n_h > 1, (s2 - s1 ** 2 / np.maximum(n_h, 1)) / np.maximum(n_h - 1, 1), 0.0)
+        factor = N_h ** 2 * (1 - n_h / np.maximum(N_h, 1)) / np.maximum(n_h, 1)
+        return np.bincount(cell_domain, weights=np.maximum(s_h, 0) * factor, minlength=size)
+
+    def estimate(self, domain: np.ndarray, size: int, y: np.ndarray | None = None) -> dict:
+        """
+        Per-domain estimates for sample rows labelled 0..size-1 (-1 = in no domain):
+        'count' and 'count_se', and with y also 'sum', 'mean' and 'mean_se'.
+        Sums run over the occupied (domain, stratum) cells only: a domain
+        touches few strata (a subreddit's trend buckets only its own), and
+        empty cells add nothing to the variance.
+        """
+        inside = domain >= 0
+        d, h, w = domain[inside], self.stratum[inside], self.weight[inside]
+        strata = len(self.sizes)
+        keys, cell = np.unique(d.astype(np.int64) * strata + h, return_inverse=True)
+        cell_domain, cell_stratum = keys // strata, keys % strata
+        cells = len(keys)
+        cnt = np.bincount(cell, minlength=cells).astype(float)
+        count = np.bincount(d, weights=w, minlength=size)
+        out = {'count': count, 'count_se': np.sqrt(self._variance(cell_domain, cell_stratum, cnt, cnt, size))}
+        if y is not None:
+            y = np.asarray(y, dtype=float)[inside]
+            sy = np.bincount(cell, weights=y, minlength=cells)
+            syy = np.bincount(cell, weights=y * y, minlength=cells)
+            total = np.bincount(d, weights=w * y, minlength=size)
+            safe = np.where(count > 0, count, 1.0)
+            mean = total / safe
+            m, scale = mean[cell_domain], safe[cell_domain]
+            s1 = (sy - m * cnt) / scale
+            s2 = (syy - 2 * m * sy + m * m * cnt) / scale ** 2
+            out.update(sum=total, mean=mean,
+                       mean_se=np.sqrt(self._variance(cell_domain, cell_stratum, s1, s2, size)))
+        return out
+
+    def label_counts(self) -> dict:
+        return {label: int(self.sizes[self.label_of == label].sum()) for label in timeseries.LABELS}
+
+    def info(self, intervals: dict) -> dict:
+        return {'sample_rows': len(self.frame), 'rows': self.rows_total, 'strata': len(self.sizes),
+                'confidence': CONFIDENCE, 'intervals': intervals}
+
+
+def _interval(estimate: float, se: float, digits: int | None = None, floor: float | None = None) -> list:
+    lo, hi = estimate - Z * se, estimate + Z * se
+    if floor is not None:
+        lo = max(lo, floor)
+    if digits is None:
+        return [round(lo), round(hi)]
+    return [round(float(lo), digits), round(float(hi), digits)]
+
+
+def _score_mean(sample: StratifiedSample) -> tuple:
+    est = sample.estimate(np.zeros(len(sample.frame), dtype=np.int64), 1, sample.frame['sentiment_score'])
+    return float(est['mean'][0]), float(est['mean_se'][0])
+
+
+# ─── PAYLOADS ────────────────────────────────────────────────────────────────
+
+def overview(sample: StratifiedSample) -> dict:
+    """/api/overview: counts are exact from the strata, the mean score is estimated."""
+    counts = sample.label_counts()
+    per_sub = pd.Series(sample.sizes).groupby(np.asarray(sample.subs)[sample.sub_of], sort=False).sum()
+    per_sub = per_sub[per_sub.index.notna()].sort_values(ascending=False, kind='stable')
+    mean, se = _score_mean(sample)
+    return {
+        'total_comments': sample.rows_total,
+        'total_subreddits': len(per_sub),
+        'avg_sentiment_score': round(mean, 4),
+        'sentiment_counts': counts,
+        'most_active_subreddit': str(per_sub.index[0]) if len(per_sub) else 'N/A',
+        'approx': sample.info({'avg_sentiment_score': _interval(mean, se, 4)}),
+    }
+
+
+def sentiment(sample: StratifiedSample, bins: list) -> dict:
+    """/api/sentiment: label counts exact, mean score and histogram estimated."""
+    total = sample.rows_total
+    counts = sample.label_counts()
+    labels = [f'{bins[i]:.1f} to {bins[i+1]:.1f}' for i in range(len(bins) - 1)]
+    codes = pd.cut(sample.frame['sentiment_score'], bins=bins, labels=False).fillna(-1).to_numpy(dtype=np.int64)
+    hist = sample.estimate(codes, len(labels))
+    mean, se = _score_mean(sample)
+    return {
+        'total': total,
+        'counts': counts,
+        'percentages': {k: round(v / total * 100, 1) if total else 0 for k, v in counts.items()},
+        'avg_score': round(mean, 4),
+        'distribution': [{'range': r, 'count': round(c)} for r, c in zip(labels, hist['count'])],
+        'approx': sample.info({
+            'avg_score': _interval(mean, se, 4),
+            'distribution': {r: _interval(c, s, floor=0) for r, c, s in zip(labels, hist['count'], hist['count_se'])},
+        }),
+    }
+
+
+def subreddits(sample: StratifiedSample) -> dict:
+    """/api/subreddits: per-subreddit counts exact, mean scores estimated."""
+    est = sample.estimate(sample.sub_of[sample.stratum], len(sample.subs), sample.frame['sentiment_score'])
+    result, intervals = [], {}
+    for code, sub in enumerate(sample.subs):
+        if pd.isna(sub):
+            continue
+        in_sub = sample.sub_of == code
+        t = int(sample.sizes[in_sub].sum())
+        by_label = {label: int(sample.sizes[in_sub & (sample.label_of == label)].sum()) for label in timeseries.LABELS}
+        pos, neu, neg = by_label['Positive'], by_label['Neutral'], by_label['Negative']
+        result.append({
+            'name': str(sub),
+            'total': t,
+            'positive': pos,
+            'neutral': neu,
+            'negative': neg,
+            'positive_pct': round(pos / t * 100, 1) if t else 0,
+            'neutral_pct':  round(neu / t * 100, 1) if t else 0,
+            'negative_pct': round(neg / t * 100, 1) if t else 0,
+            'avg_score': round(float(est['mean'][code]), 4),
+        })
+        intervals[str(sub)] = _interval(est['mean'][code], est['mean_se'][code], 4)
+    return {'subreddits': result, 'approx': sample.info({'avg_score': intervals})}
+
+
+def trends(sample: StratifiedSample, granularity: str = 'day', start: int | None = None,
+           end: int | None = None, by_subreddit: bool = False) -> dict:
+    """/api/trends: every bucket count and mean estimated. Raises ValueError for a bad granularity."""
+    frame = sample.frame
+    result = {'granularity': granularity, 'trends': []}
+    if by_subreddit:
+        result['subreddits'] = {}
+    keep, buckets, inv = timeseries.bucket_index(frame, granularity, start, end)
+    intervals = {'total': {}, 'avg_score': {}}
+    if keep.any():
+        n = len(buckets)
+        bucket = np.full(len(frame), -1, dtype=np.int64)
+        bucket[keep] = inv
+        labels = frame['sentiment_label'].to_numpy()
+        scores = frame['sentiment_score'].to_numpy(dtype=float)
+
+        def _series(domain, size):
+            est = sample.estimate(domain, size, scores)
+            per_label = [sample.estimate(np.where(labels == label, domain, -1), size)['count']
+                         for label in timeseries.LABELS]
+            return est, (est['count'], *per_label, est['sum'])
+
+        est, series = _series(bucket, n)
+        result['trends'] = timeseries.bucket_rows(buckets, granularity, *series)
+        for row, i in zip(result['trends'], np.flatnonzero(est['count'])):
+            intervals['total'][row['date']] = _interval(est['count'][i], est['count_se'][i], floor=0)
+            intervals['avg_score'][row['date']] = _interval(est['mean'][i], est['mean_se'][i], 4)
+
+        if by_subreddit:
+            # Only the (subreddit, bucket) cells the sample hits, as in timeseries.trend_rows
+            sub = sample.sub_of[sample.stratum]
+            inside = bucket >= 0
+            cells, cell = np.unique(sub[inside] * n + bucket[inside], return_inverse=True)
+            domain = np.full(len(frame), -1, dtype=np.int64)
+            domain[inside] = cell
+            _, per_cell = _series(domain, len(cells))
+            bounds = np.searchsorted(cells, np.arange(len(sample.subs) + 1) * n)
+            for code, name in enumerate(sample.subs):
+                part = slice(bounds[code], bounds[code + 1])
+                if part.start < part.stop:
+                    result['subreddits'][str(name)] = timeseries.bucket_rows(
+                        buckets[cells[part] % n], granularity, *(a[part] for a in per_cell))
+    result['approx'] = sample.info(intervals)
+    return result
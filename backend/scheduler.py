@@ -5,20 +5,27 @@ scheduler.py — NEAR REAL-TIME POLLING ENGINE (DEBUG MODE)
 Falls back to synthetic data if no credentials.
 """
 
+import multiprocessing
 import os
 import random
-from datetime import datetime, timezone
+import time
+from datetime import datetime, timedelta, timezone
 from apscheduler.schedulers.background import BackgroundScheduler
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 from dotenv import load_dotenv
 
-from db import insert_post
+from db import insert_post, get_stats
 from clean import clean_text
+import live_stats
+import topk
+import sketches
+import events
+from metrics import SCHEDULER_CYCLE_SECONDS, SCHEDULER_STAGE_SECONDS, SCHEDULER_POSTS
+import profiling
+import retention
+from scoring import get_analyzer
 
 load_dotenv()
 
-analyzer = SentimentIntensityAnalyzer()
-
 # Shared state for health monitoring (reported via /api/status)
 sync_state = {
     'last_update': None,
@@ -38,7 +45,13 @@ def fetch_reddit_data():
     """
     Primary polling job — runs every INTERVAL_SECONDS.
     Decides between LIVE (PRAW) and SIMULATION mode.
+    Profiled when armed via profiling.profile_next_cycles().
     """
+    with profiling.cycle_profile(f"scheduler_cycle_{sync_state['cycle_count'] + 1}"):
+        _run_cycle()
+
+
+def _run_cycle():
     global sync_state
     print("\n" + "="*40)
     print(f"🚀 SCHEDULER CYCLE #{sync_state['cycle_count'] + 1} AT {datetime.now().strftime('%H:%M:%S')}")
@@ -51,6 +64,7 @@ def fetch_reddit_data():
     print(f"[debug] Client ID: {client_id[:5]}... (length: {len(client_id)})")
 
     inserted = 0
+    cycle_started = time.perf_counter()
     try:
         # Check if we have valid credentials
         is_live = client_id and client_id != "your_client_id_here" and len(client_id) > 10
@@ -68,6 +82,8 @@ def fetch_reddit_data():
         sync_state['cycle_count']   += 1
         sync_state['posts_inserted'] = inserted
         sync_state['error']          = None
+        if inserted:
+            sketches.save()
         print(f"[result] ✅ Cycle complete: {inserted} rows added to SQLite")
 
     except Exception as e:
@@ -78,6 +94,26 @@ def fetch_reddit_data():
         sync_state['error'] = err_msg
         sync_state['mode']  = 'error'
 
+    SCHEDULER_CYCLE_SECONDS.observe(time.perf_counter() - cycle_started, mode=sync_state['mode'])
+    _publish_cycle()
+
+# ────────────────────────────────────────────────────────────────────────────
+def _publish_cycle():
+    """Push the cycle result to /api/stream subscribers (skipped when nobody listens)."""
+    if not events.listening():
+        return
+    windows = live_stats.aggregator.snapshot()
+    events.publish('cycle', {
+        'cycle_count':      sync_state['cycle_count'],
+        'last_update':      sync_state['last_update'],
+        'sync_mode':        sync_state['mode'],
+        'posts_last_cycle': sync_state['posts_inserted'],
+        'error':            sync_state['error'],
+        'total_rows':       get_stats()['total_posts'],
+        'live': {name: {'count': w['count'], 'per_minute': w['per_minute'], 'avg_score': w['avg_score']}
+                 for name, w in windows.items()},
+    })
+
 # ────────────────────────────────────────────────────────────────────────────
 def _fetch_live_reddit(c_id, c_secret, agent) -> int:
     """Fetch hot posts from Reddit via PRAW. Returns number inserted."""
@@ -148,10 +184,15 @@ def _generate_synthetic_data() -> int:
 
 # ────────────────────────────────────────────────────────────────────────────
 def _process_and_insert(p_id, sub, title, author, upvotes, created_utc) -> bool:
-    """Run VADER analysis and insert into SQLite. Returns True if successful."""
+    """
+    Run VADER analysis and insert into SQLite. Returns True if a new row was
+    stored (re-fetched hot posts are duplicates and return False).
+    """
     try:
-        cleaned = clean_text(title) or title
-        scores = analyzer.polarity_scores(cleaned)
+        with SCHEDULER_STAGE_SECONDS.time(stage='clean'):
+            cleaned = clean_text(title) or title
+        with SCHEDULER_STAGE_SECONDS.time(stage='score'):
+            scores = get_analyzer().polarity_scores(cleaned)
         comp = round(scores["compound"], 4)
         label = "Positive" if comp >= 0.05 else ("Negative" if comp <= -0.05 else "Neutral")
 
@@ -170,21 +211,41 @@ def _process_and_insert(p_id, sub, title, author, upvotes, created_utc) -> bool:
             'upvotes': int(upvotes),
             'created_time': datetime.fromtimestamp(created_utc, tz=timezone.utc).isoformat(),
         }
-        insert_post(post_data)
+        with SCHEDULER_STAGE_SECONDS.time(stage='insert'):
+            inserted = insert_post(post_data)
+        if not inserted:
+            SCHEDULER_POSTS.inc(result='duplicate')
+            return False
+        SCHEDULER_POSTS.inc(result='inserted')
+        live_stats.record(sub, comp, label)
+        topk.record(post_data)
+        sketches.record(post_data)
         return True
     except Exception as e:
         # User requested explicitly to see errors here
         print(f"      ❌ INSERT ERROR for '{title[:30]}': {e}")
+        SCHEDULER_POSTS.inc(result='error')
         return False
 
 # ────────────────────────────────────────────────────────────────────────────
 def start_scheduler():
-    """Start the background scheduler."""
+    """
+    Start the background scheduler. Never in a multiprocessing child: spawn
+    workers (scoring.py's pool) re-import the main module, and must not
+    start a second poller writing to reddit.db. Returns None there.
+    """
+    if multiprocessing.parent_process() is not None:
+        print("[scheduler] Not starting in a multiprocessing worker")
+        return None
+    sketches.load()
     sched = BackgroundScheduler()
     # First run immediately
     sched.add_job(fetch_reddit_data, 'date', run_date=datetime.now())
     # Then every 10 seconds
     sched.add_job(fetch_reddit_data, 'interval', seconds=INTERVAL_SECONDS)
+    # Retention / compaction of reddit.db, first pass a minute after boot
+    sched.add_job(retention.run, 'interval', seconds=retention.INTERVAL_SECONDS,
+                  next_run_time=datetime.now() + timedelta(seconds=60))
     sched.start()
     print(f"[scheduler] 🚨 STARTED — Polling every {INTERVAL_SECONDS}s")
     return sched
@@ -0,0 +1,180 @@
+"""
+scoring.py — SHARED VADER SCORING WITH A RESULT CACHE
+======================================================
+One place to turn raw text into a VADER sentiment result.
+
+Project Flow position:
+    Raw text → clean.py → [THIS MODULE] → API Response
+
+What this module does:
+1. score_text(): clean + score a single string, memoised in an LRU cache
+   keyed by the raw text (Reddit is full of repeated snippets: "this",
+   "lol", bot replies, copy-pasted comments).
+2. score_many(): score a list of strings in one call. Duplicates inside the
+   batch are scored once, cache hits are skipped, and large sets of misses
+   are spread across a process pool (VADER is pure Python, so threads would
+   just queue on the GIL).
+
+3. get_analyzer(): the one SentimentIntensityAnalyzer per process, built
+   on first use. Set VADER_PICKLE to a file path to load a pre-pickled
+   analyzer instead of parsing the lexicon (the file is written on first
+   use if missing; only point it at a file this app wrote).
+
+Result shape (same keys as /api/analyze-text's post_sentiment):
+    {'score': 0.6369, 'label': 'Positive', 'pos': 0.5, 'neu': 0.5, 'neg': 0.0}
+"""
+
+import multiprocessing
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from analyze import label_sentiment
+from clean import clean_text
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+CACHE_SIZE    = int(os.getenv('SCORE_CACHE_SIZE', 50000))
+WORKERS       = int(os.getenv('SCORE_WORKERS', min(4, os.cpu_count() or 1)))
+PARALLEL_MIN  = 500     # fewer misses than this are scored in-process
+VADER_PICKLE  = os.getenv('VADER_PICKLE', '')
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+_cache: OrderedDict = OrderedDict()   # raw text → (compound, pos, neu, neg)
+_cache_lock = threading.Lock()
+cache_stats = {'hits': 0, 'misses': 0}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# ─── ANALYZER ────────────────────────────────────────────────────────────────
+
+def _build_analyzer():
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+    if VADER_PICKLE and os.path.exists(VADER_PICKLE):
+        try:
+            with open(VADER_PICKLE, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"[scoring.py] Could not load {VADER_PICKLE} ({e}); parsing the lexicon instead")
+
+    analyzer = SentimentIntensityAnalyzer()
+    if VADER_PICKLE:
+        try:
+            tmp = f'{VADER_PICKLE}.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                pickle.dump(analyzer, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, VADER_PICKLE)
+        except OSError as e:
+            print(f"[scoring.py] Could not write {VADER_PICKLE}: {e}")
+    return analyzer
+
+
+def get_analyzer():
+    """The process-wide VADER analyzer, built (or unpickled) on first use."""
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = _build_analyzer()
+    return _analyzer
+
+
+# ─── CORE ────────────────────────────────────────────────────────────────────
+
+def _polarity(text: str) -> tuple:
+    """Clean and score one raw string. Returns (compound, pos, neu, neg)."""
+    s = get_analyzer().polarity_scores(clean_text(text) or text)
+    return round(s['compound'], 4), s['pos'], s['neu'], s['neg']
+
+
+def _polarity_chunk(texts: list) -> list:
+    """Process-pool entry point: score a slice of texts in a worker."""
+    return [_polarity(t) for t in texts]
+
+
+def _to_result(p: tuple) -> dict:
+    return {'score': p[0], 'label': label_sentiment(p[0]), 'pos': p[1], 'neu': p[2], 'neg': p[3]}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the API process runs scheduler threads
+            _pool = ProcessPoolExecutor(max_workers=WORKERS,
+                                        mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+# ─── CACHE ───────────────────────────────────────────────────────────────────
+
+def _cache_get(text: str):
+    with _cache_lock:
+        p = _cache.get(text)
+        if p is None:
+            cache_stats['misses'] += 1
+            return None
+        _cache.move_to_end(text)
+        cache_stats['hits'] += 1
+        return p
+
+
+def _cache_put(text: str, p: tuple):
+    with _cache_lock:
+        _cache[text] = p
+        _cache.move_to_end(text)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+# ─── PUBLIC API ──────────────────────────────────────────────────────────────
+
+def score_text(text: str) -> dict:
+    """Score a single raw string, using the cache."""
+    p = _cache_get(text)
+    if p is None:
+        p = _polarity(text)
+        _cache_put(text, p)
+    return _to_result(p)
+
+
+def score_many(texts: list, stats: dict | None = None) -> list:
+    """
+    Score a list of raw strings. Returns results in input order.
+
+    If a stats dict is passed, 'cache_hits' and 'scored' are incremented
+    so callers can report per-request throughput.
+    """
+    found = {}       # text → polarity tuple
+    pending = []     # unique texts that still need scoring
+    for t in texts:
+        if t in found:
+            continue
+        p = _cache_get(t)
+        if p is None:
+            found[t] = None
+            pending.append(t)
+        else:
+            found[t] = p
+
+    if len(pending) >= PARALLEL_MIN and WORKERS > 1:
+        step = -(-len(pending) // WORKERS)
+        parts = [pending[i:i + step] for i in range(0, len(pending), step)]
+        scored = [p for part in _get_pool().map(_polarity_chunk, parts) for p in part]
+    else:
+        scored = [_polarity(t) for t in pending]
+
+    for t, p in zip(pending, scored):
+        found[t] = p
+        _cache_put(t, p)
+
+    if stats is not None:
+        stats['cache_hits'] = stats.get('cache_hits', 0) + len(texts) - len(pending)
+        stats['scored'] = stats.get('scored', 0) + len(pending)
+    return [_to_result(found[t]) for t in texts]
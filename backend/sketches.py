@@ -0,0 +1,326 @@
+"""
+sketches.py — STREAMING HYPERLOGLOG AND T-DIGEST SKETCHES
+==========================================================
+Approximate statistics over everything the scheduler inserts, kept in a
+few KB whatever the row count:
+  - HyperLogLog: distinct subreddits and distinct authors.
+  - t-digest: quantiles of sentiment_score and upvotes.
+
+Both are mergeable and updated in O(1) amortised per insert (record(),
+called by scheduler.py next to live_stats). They are saved to the
+`sketches` table of reddit.db after every cycle that inserted rows, so a
+restart loads a few blobs instead of rescanning the posts. On the first
+start with an empty table they are backfilled once from the raw rows.
+
+In SQLite mode /api/overview and /api/sentiment report them under
+'sketches', each value with its error bound:
+  - HLL relative standard error 1.04 / sqrt(m), with m = 2^p registers.
+    p is picked from SKETCH_HLL_ERROR (default 0.01 → p = 14, 16 KB).
+  - t-digest compression SKETCH_TDIGEST_COMPRESSION (default 100). Every
+    quantile comes with the rank error of the centroid it falls in (half
+    its weight / n). The tails are exact-ish, the median is the loosest.
+
+Workers that do not run the scheduler (RUN_MODE=multi) read the saved
+copy, refreshed at most every SKETCH_REFRESH seconds.
+"""
+
+import hashlib
+import math
+import os
+import struct
+import threading
+import time
+from array import array
+
+import db
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+HLL_ERROR           = float(os.getenv('SKETCH_HLL_ERROR', 0.01))
+TDIGEST_COMPRESSION = float(os.getenv('SKETCH_TDIGEST_COMPRESSION', 100))
+REFRESH_SECONDS     = float(os.getenv('SKETCH_REFRESH', 5))
+DEFAULT_QUANTILES   = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+def hll_precision(error: float) -> int:
+    """Register bits p so that 1.04 / sqrt(2^p) <= error (clamped to 4..18)."""
+    return min(18, max(4, math.ceil(math.log2((1.04 / error) ** 2))))
+
+
+# ─── HYPERLOGLOG ─────────────────────────────────────────────────────────────
+
+class HyperLogLog:
+    """Distinct-count sketch with 2^p one-byte registers."""
+
+    kind = 'hll'
+
+    def __init__(self, p: int = 14):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def add(self, value: str):
+        h = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+        idx = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def merge(self, other: 'HyperLogLog'):
+        if other.p != self.p:
+            raise ValueError(f'Cannot merge HyperLogLog p={other.p} into p={self.p}')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def estimate(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        z = sum(self.registers.count(r) * 2.0 ** -r for r in set(self.registers))
+        e = alpha * m * m / z
+        zeros = self.registers.count(0)
+        if e <= 2.5 * m and zeros:
+            e = m * math.log(m / zeros)          # linear counting for small cardinalities
+        return int(round(e))
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.p]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'HyperLogLog':
+        sketch = cls(data[0])
+        sketch.registers = bytearray(data[1:])
+        return sketch
+
+
+# ─── T-DIGEST ────────────────────────────────────────────────────────────────
+
+class TDigest:
+    """Merging t-digest (k1 scale function): sorted centroids plus an insert buffer."""
+
+    kind = 'tdigest'
+
+    def __init__(self, compression: float = 100):
+        self.compression = compression
+        self.means: list = []
+        self.weights: list = []
+        self.buffer: list = []
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x: float, w: float = 1.0):
+        if x is None or math.isnan(x):
+            return
+        self.buffer.append((float(x), w))
+        self.count += w
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        if len(self.buffer) >= 5 * self.compression:
+            self._compress()
+
+    def merge(self, other: 'TDigest'):
+        other._compress()
+        for mean, weight in zip(other.means, other.weights):
+            self.add(mean, weight)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _q(self, k: float) -> float:
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self):
+        if not self.buffer:
+            return
+        items = sorted(list(zip(self.means, self.weights)) + self.buffer)
+        self.buffer = []
+        total = sum(w for _, w in items)
+        means, weights = [], []
+        cur_mean, cur_weight = items[0]
+        done = 0.0
+        q_limit = self._q(self._k(0) + 1)
+        for x, w in items[1:]:
+            if (done + cur_weight + w) / total <= q_limit:
+                cur_weight += w
+                cur_mean += (x - cur_mean) * w / cur_weight
+            else:
+                means.append(cur_mean)
+                weights.append(cur_weight)
+                done += cur_weight
+                q_limit = self._q(self._k(done / total) + 1)
+                cur_mean, cur_weight = x, w
+        means.append(cur_mean)
+        weights.append(cur_weight)
+        self.means, self.weights = means, weights
+
+    def quantile(self, q: float) -> tuple:
+        """(value, rank error) at quantile q, or (None, None) when empty."""
+        self._compress()
+        if not self.count:
+            return None, None
+        target = q * self.count
+        cum = 0.0
+        prev_center, prev_mean = 0.0, self.min
+        for mean, weight in zip(self.means, self.weights):
+            center = cum + weight / 2
+            if target <= center:
+                span = center - prev_center
+                value = mean if span <= 0 else prev_mean + (mean - prev_mean) * (target - prev_center) / span
+                return value, weight / 2 / self.count
+            cum += weight
+            prev_center, prev_mean = center, mean
+        span = self.count - prev_center
+        value = self.max if span <= 0 else prev_mean + (self.max - prev_mean) * (target - prev_center) / span
+        return value, self.weights[-1] / 2 / self.count
+
+    def to_bytes(self) -> bytes:
+        self._compress()
+        head = struct.pack('<4d', self.compression, self.count, self.min, self.max)
+        return head + array('d', [v for pair in zip(self.means, self.weights) for v in pair]).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'TDigest':
+        compression, count, lo, hi = struct.unpack_from('<4d', data)
+        sketch = cls(compression)
+        sketch.count, sketch.min, sketch.max = count, lo, hi
+        values = array('d')
+        values.frombytes(data[32:])
+        sketch.means, sketch.weights = list(values[0::2]), list(values[1::2])
+        return sketch
+
+
+KINDS = {HyperLogLog.kind: HyperLogLog, TDigest.kind: TDigest}
+
+
+# ─── STREAM SKETCHES (fed by scheduler.py) ───────────────────────────────────
+
+def _empty() -> dict:
+    p = hll_precision(HLL_ERROR)
+    return {
+        'subreddits':      HyperLogLog(p),
+        'authors':         HyperLogLog(p),
+        'sentiment_score': TDigest(TDIGEST_COMPRESSION),
+        'upvotes':         TDigest(TDIGEST_COMPRESSION),
+    }
+
+
+_lock = threading.Lock()
+_sketches = _empty()
+_owner = False             # True in the process that records (runs the scheduler)
+_read_at = 0.0             # when a non-owner last read the saved copy
+
+
+def _add(sketches: dict, subreddit, author, score, upvotes):
+    if subreddit is not None:
+        sketches['subreddits'].add(subreddit)
+    if author is not None:
+        sketches['authors'].add(author)
+    if score is not None:
+        sketches['sentiment_score'].add(score)
+    if upvotes is not None:
+        sketches['upvotes'].add(upvotes)
+
+
+def record(post: dict):
+    """Add one inserted post (a db.insert_post row)."""
+    with _lock:
+        _add(_sketches, post['subreddit'], post.get('author'), post['sentiment_score'], post.get('upvotes'))
+
+
+def _decode(saved: dict) -> dict:
+    sketches = _empty()
+    for name, (kind, data) in saved.items():
+        if name in sketches and kind == sketches[name].kind:
+            sketches[name] = KINDS[kind].from_bytes(data)
+    return sketches
+
+
+def load():
+    """
+    Restore the saved sketches and start recording in this process. With
+    nothing saved yet, backfill once from the raw posts.
+    """
+    global _sketches, _owner
+    started = time.perf_counter()
+    try:
+        saved = db.load_sketches()
+        if saved:
+            sketches, source = _decode(saved), 'reddit.db'
+        else:
+            sketches, source = _empty(), 'raw posts'
+            for row in db.scan_posts(('subreddit', 'author', 'sentiment_score', 'upvotes')):
+                _add(sketches, *row)
+    except Exception as e:
+        print(f"[sketches.py] Could not restore sketches, starting empty: {e}")
+        saved, sketches, source = True, _empty(), 'nothing'
+    with _lock:
+        _sketches, _owner = sketches, True
+    if not saved:
+        save()
+    print(f"[sketches.py] Loaded sketches from {source} in {time.perf_counter() - started:.2f}s")
+
+
+def save():
+    with _lock:
+        blobs = {name: (s.kind, s.to_bytes()) for name, s in _sketches.items()}
+    db.save_sketches(blobs)
+
+
+def _current() -> dict:
+    """This process's sketches; non-owners re-read the saved copy every REFRESH_SECONDS."""
+    global _sketches, _read_at
+    with _lock:
+        if _owner or time.time() - _read_at < REFRESH_SECONDS:
+            return _sketches
+    try:
+        sketches = _decode(db.load_sketches())
+    except Exception as e:
+        print(f"[sketches.py] Could not read saved sketches: {e}")
+        return _sketches
+    with _lock:
+        _sketches, _read_at = sketches, time.time()
+        return _sketches
+
+
+# ─── SUMMARIES (/api/overview, /api/sentiment) ───────────────────────────────
+
+def distinct_summary() -> dict:
+    sketches = _current()
+    with _lock:
+        return {name: {'estimate': sketches[name].estimate(),
+                       'relative_error': round(sketches[name].relative_error, 4)}
+                for name in ('subreddits', 'authors')}
+
+
+def quantile_summary(quantiles=DEFAULT_QUANTILES) -> dict:
+    sketches = _current()
+    out = {}
+    with _lock:
+        for name in ('sentiment_score', 'upvotes'):
+            digest = sketches[name]
+            values = {}
+            for q in quantiles:
+                value, rank_error = digest.quantile(q)
+                values[f'p{q * 100:g}'] = {
+                    'value': None if value is None else round(value, 4),
+                    'rank_error': None if rank_error is None else round(rank_error, 4),
+                }
+            out[name] = {'count': int(digest.count), 'compression': digest.compression, 'quantiles': values}
+    return out
+
+
+def parse_quantiles(value: str | None) -> tuple:
+    """'0.5,0.9,0.99' → (0.5, 0.9, 0.99). Raises ValueError outside [0, 1]."""
+    if not value:
+        return DEFAULT_QUANTILES
+    quantiles = tuple(float(q) for q in value.split(','))
+    if any(not 0 <= q <= 1 for q in quantiles):
+        raise ValueError('quantiles must be between 0 and 1')
+    return quantiles
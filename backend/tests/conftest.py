@@ -0,0 +1,37 @@
+"""
+Shared fixtures. The backend modules import each other by name (`import db`),
+so the backend directory goes on sys.path, as when running `python app.py`.
+"""
+
+import os
+import sys
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND not in sys.path:
+    sys.path.insert(0, BACKEND)
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def tmp_db(tmp_path, monkeypatch):
+    """A fresh reddit.db in tmp_path; never touches the real one."""
+    monkeypatch.setattr(db, 'DB_PATH', str(tmp_path / 'reddit.db'))
+    db.init_db()
+    return db.DB_PATH
+
+
+@pytest.fixture
+def client(tmp_db, tmp_path, monkeypatch):
+    """A Flask test client on a temp reddit.db and DATASET_DIR; no scheduler."""
+    import app as appmod
+    import datasets
+    import registry
+
+    monkeypatch.setattr(datasets, 'DATASET_DIR', str(tmp_path / 'datasets'))
+    client = appmod.create_app(start_scheduler=False).test_client()
+    yield client
+    registry.flush()
+    client.post('/api/clear-data')          # back to SQLite mode for the next test
@@ -0,0 +1,74 @@
+import os
+
+import pandas as pd
+import pytest
+
+import analyze
+
+WORDS = ['great', 'awful', 'fine', 'love', 'hate', 'boring', 'amazing', 'terrible']
+
+
+def _raw_csv(path, n: int, start: int = 0):
+    pd.DataFrame({
+        'post_id': [f'p{i}' for i in range(start, start + n)],
+        'subreddit': 'r/test',
+        'title': 'title',
+        'author': 'someone',
+        'comment': [f'this is {WORDS[i % len(WORDS)]} number {i}\nsecond line' if i % 7 == 0
+                    else f'comment {i} is {WORDS[i % len(WORDS)]}' for i in range(start, start + n)],
+        'upvotes': range(start, start + n),
+        'created_time': '2024-01-01T00:00:00',
+    }).to_csv(path, index=False)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """analyze.py writes OUTPUT_FILE and its checkpoint to the working directory."""
+    monkeypatch.chdir(tmp_path)
+    _raw_csv('raw.csv', 230)
+    return tmp_path
+
+
+def _interrupt_after(monkeypatch, chunks: int):
+    real = analyze.iter_clean_chunks
+
+    def dying(*args, **kwargs):
+        for i, item in enumerate(real(*args, **kwargs)):
+            if i == chunks:
+                raise KeyboardInterrupt
+            yield item
+    monkeypatch.setattr(analyze, 'iter_clean_chunks', dying)
+
+
+def _output() -> pd.DataFrame:
+    return pd.read_csv(analyze.OUTPUT_FILE)
+
+
+def test_resume_matches_uninterrupted_run(workdir, monkeypatch):
+    whole = analyze.analyze_chunked('raw.csv', chunksize=50, workers=1)
+    expected = _output()
+    assert not os.path.exists(analyze.CHECKPOINT_FILE)
+
+    with monkeypatch.context() as m:
+        _interrupt_after(m, 2)
+        with pytest.raises(KeyboardInterrupt):
+            analyze.analyze_chunked('raw.csv', chunksize=50, workers=1, resume=False)
+    assert len(_output()) == 100 and os.path.exists(analyze.CHECKPOINT_FILE)
+
+    resumed = analyze.analyze_chunked('raw.csv', chunksize=50, workers=1)
+    assert resumed == whole
+    pd.testing.assert_frame_equal(_output(), expected)
+
+
+def test_changed_input_is_not_resumed(workdir, monkeypatch):
+    with monkeypatch.context() as m:
+        _interrupt_after(m, 2)
+        with pytest.raises(KeyboardInterrupt):
+            analyze.analyze_chunked('raw.csv', chunksize=50, workers=1)
+    _raw_csv('raw.csv', 260, start=1000)            # replaced at the same path
+
+    assert analyze._load_checkpoint('raw.csv') is None
+    result = analyze.analyze_chunked('raw.csv', chunksize=50, workers=1)
+    output = _output()
+    assert result['total'] == len(output) == 260
+    assert output['post_id'].str[1:].astype(int).min() == 1000
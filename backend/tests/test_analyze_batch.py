@@ -0,0 +1,106 @@
+import io
+import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app as appmod
+import scoring
+
+TEXTS = ['I love this, it is great', 'This is terrible and awful', 'The sky is blue',
+         'Best day ever!', 'Worst movie I have seen', 'meh', 'Absolutely fantastic work', 'I hate waiting']
+
+
+@pytest.fixture(autouse=True)
+def cold_cache(monkeypatch):
+    """Score every text afresh, so misses (and the pool switch-over) are exercised."""
+    monkeypatch.setattr(scoring, '_cache', OrderedDict())
+
+
+def _lines(response) -> list:
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def _ndjson(items: list) -> str:
+    return ''.join(json.dumps(item) + '\n' for item in items)
+
+
+def test_json_results_in_input_order(client, monkeypatch):
+    monkeypatch.setattr(appmod, 'BATCH_CHUNK', 3)
+    body = [{'id': f't{i}', 'text': t} for i, t in enumerate(TEXTS)] + ['', 'plain string']
+    lines = _lines(client.post('/api/analyze-batch', json=body))
+    results, done = lines[:-1], lines[-1]
+    assert [r['index'] for r in results] == list(range(len(body)))
+    assert [r['id'] for r in results] == [f't{i}' for i in range(len(TEXTS))] + [len(TEXTS), len(TEXTS) + 1]
+    for r, text in zip(results, TEXTS):
+        assert (r['score'], r['label']) == (scoring.score_text(text)['score'], scoring.score_text(text)['label'])
+    assert results[len(TEXTS)]['error'] == 'Text is empty'
+    assert done['done'] and done['count'] == len(body) and done['errors'] == 1
+    assert sum(done['summary'].values()) == len(body) - 1
+
+
+def test_texts_object_and_truncation(client, monkeypatch):
+    monkeypatch.setattr(appmod, 'BATCH_MAX_TEXTS', 3)
+    lines = _lines(client.post('/api/analyze-batch', json={'texts': TEXTS}))
+    assert len(lines) == 4 and lines[-1]['truncated'] and lines[-1]['count'] == 3
+
+
+def test_pool_switch_over_keeps_order(client, monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=3)
+    monkeypatch.setattr(scoring, 'PARALLEL_MIN', 4)
+    monkeypatch.setattr(scoring, 'WORKERS', 3)
+    monkeypatch.setattr(scoring, '_get_pool', lambda: pool)
+    texts = [f'{t} #{i}' for i in range(3) for t in TEXTS]       # 24 misses, scored in three parts
+    results = _lines(client.post('/api/analyze-batch', json=texts))[:-1]
+    pool.shutdown()
+    monkeypatch.setattr(scoring, 'WORKERS', 1)
+    expected = scoring.score_many(texts)
+    assert [(r['score'], r['label']) for r in results] == [(e['score'], e['label']) for e in expected]
+    assert _lines(client.post('/api/analyze-batch', json=texts))[-1]['cache_hits'] == len(texts)
+
+
+def test_ndjson_lines(client, monkeypatch):
+    monkeypatch.setattr(appmod, 'BATCH_MAX_LINE', 64)
+    body = _ndjson([{'id': 'a', 'text': TEXTS[0]}, TEXTS[1]]) + '{not json\n\n' \
+        + json.dumps({'id': 'long', 'text': 'x' * 200}) + '\n' + json.dumps(TEXTS[2]) + '\n'
+    lines = _lines(client.post('/api/analyze-batch', data=body, content_type='application/x-ndjson'))
+    results, done = lines[:-1], lines[-1]
+    assert [r['index'] for r in results] == [0, 1, 2, 3, 4]          # the blank line is not an item
+    assert results[0]['id'] == 'a' and 'label' in results[0] and 'label' in results[1]
+    assert results[2]['error'] == 'Invalid JSON line'
+    assert results[3]['error'] == 'Line exceeds 64 bytes'
+    assert results[4]['label'] == scoring.score_text(TEXTS[2])['label']
+    assert done['errors'] == 2 and not done['truncated']
+
+
+def test_malformed_json_is_400(client):
+    for body in ('{"texts": ', '{"nothing": 1}', '"just a string"', ''):
+        response = client.post('/api/analyze-batch', data=body, content_type='application/json')
+        assert response.status_code == 400
+        assert response.get_json()['ok'] is False
+
+
+def test_oversized_body_is_413(client, monkeypatch):
+    monkeypatch.setattr(appmod, 'BATCH_MAX_BYTES', 200)
+    body = json.dumps(TEXTS * 3)
+    assert client.post('/api/analyze-batch', data=body, content_type='application/json').status_code == 413
+    # Chunked: no Content-Length, the limit is counted as the body is read
+    chunked = client.post('/api/analyze-batch', input_stream=io.BytesIO(body.encode()),
+                          content_type='application/json', headers={'Transfer-Encoding': 'chunked'},
+                          environ_overrides={'wsgi.input_terminated': True})
+    assert chunked.status_code == 413
+
+
+def test_ndjson_over_limit_mid_stream_ends_with_error(client, monkeypatch):
+    monkeypatch.setattr(appmod, 'BATCH_MAX_BYTES', 200)
+    body = _ndjson(TEXTS * 3).encode()
+    response = client.post('/api/analyze-batch', input_stream=io.BytesIO(body),
+                           content_type='application/x-ndjson', headers={'Transfer-Encoding': 'chunked'},
+                           environ_overrides={'wsgi.input_terminated': True})
+    assert response.status_code == 200
+    lines = _lines(response)
+    done = lines[-1]
+    assert done['status'] == 413 and done['truncated'] and 'error' in done
+    assert 0 < done['count'] < len(TEXTS) * 3
+    assert [r['index'] for r in lines[:-1]] == list(range(done['count']))
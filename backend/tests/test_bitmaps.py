@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import bitmaps
+import timeseries
+
+DAY = bitmaps.DAY
+T0 = 1_700_000_000 - 1_700_000_000 % DAY          # a UTC midnight
+
+
+@pytest.fixture(scope='module')
+def frame() -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    n = 5000
+    created = pd.to_datetime(T0 + rng.integers(0, 20 * DAY, n), unit='s').strftime('%Y-%m-%dT%H:%M:%S')
+    df = pd.DataFrame({
+        'comment': [f'c{i}' for i in range(n)],
+        'subreddit': rng.choice(['r/a', 'r/b', 'r/c', None], n),
+        'sentiment_label': rng.choice(['Positive', 'Negative', 'Neutral'], n),
+        'sentiment_score': np.round(rng.uniform(-1, 1, n), 2),      # rounded: lots of ties
+        'upvotes': rng.integers(0, 50, n).astype(float),
+        'created_time': created,
+    })
+    df.loc[rng.choice(n, 300, replace=False), 'sentiment_score'] = np.nan
+    df.loc[rng.choice(n, 200, replace=False), 'upvotes'] = np.nan
+    df.loc[rng.choice(n, 100, replace=False), 'created_time'] = None
+    return df
+
+
+@pytest.fixture(scope='module')
+def index(frame) -> bitmaps.BitmapIndex:
+    return bitmaps.BitmapIndex(frame)
+
+
+def _rows(bitmap: np.ndarray, n: int) -> np.ndarray:
+    return np.flatnonzero(bitmaps.test(bitmap, np.arange(n)))
+
+
+def _in_range(frame: pd.DataFrame, start: int | None, end: int | None) -> np.ndarray:
+    epochs = timeseries.ensure_epochs(frame)
+    mask = epochs != timeseries.EPOCH_NA
+    if start is not None:
+        mask &= epochs >= start
+    if end is not None:
+        mask &= epochs < end
+    return mask
+
+
+def test_pack_and_count_round_trip():
+    rng = np.random.default_rng(0)
+    for n in (0, 1, 63, 64, 65, 1000):
+        mask = rng.random(n) < 0.3
+        bitmap = bitmaps.pack(mask)
+        assert bitmaps.count(bitmap) == bitmaps._count_unpacked(bitmap) == mask.sum()
+        assert np.array_equal(bitmaps.test(bitmap, np.arange(n)), mask)
+        assert np.array_equal(bitmaps.from_rows(np.flatnonzero(mask), n), bitmap)
+
+
+def test_equals_matches_pandas(frame, index):
+    n = len(frame)
+    for col in bitmaps.FILTER_COLUMNS:
+        for value in frame[col].dropna().unique():
+            assert np.array_equal(_rows(index.equals(col, value), n), np.flatnonzero(frame[col] == value))
+    assert bitmaps.count(index.equals('subreddit', 'r/missing')) == 0
+    assert index.label_counts == frame['sentiment_label'].value_counts().to_dict()
+
+
+@pytest.mark.parametrize('start,end', [
+    (None, None),
+    (T0 + 3 * DAY, None),
+    (None, T0 + 5 * DAY),
+    (T0 + 2 * DAY, T0 + 9 * DAY),                   # whole days
+    (T0 + 2 * DAY + 3600, T0 + 9 * DAY - 60),       # partial edge days
+    (T0 + 4 * DAY + 100, T0 + 4 * DAY + 50000),     # inside one day
+    (T0 + 40 * DAY, None),                          # past the data
+])
+def test_date_range_matches_pandas(frame, index, start, end):
+    expected = np.flatnonzero(_in_range(frame, start, end))
+    assert np.array_equal(_rows(index.date_range(start, end), len(frame)), expected)
+    assert np.array_equal(_rows(index.date_range(start, end), len(frame)), expected)     # cached
+
+
+def test_select_combines_filters(frame, index):
+    start, end = T0 + DAY + 7200, T0 + 12 * DAY
+    bitmap = index.select(start, end, sentiment_label='Negative', subreddit='r/b')
+    mask = _in_range(frame, start, end) & (frame['sentiment_label'] == 'Negative') & (frame['subreddit'] == 'r/b')
+    assert np.array_equal(_rows(bitmap, len(frame)), np.flatnonzero(mask))
+    assert np.array_equal(index.select(subreddit=None), index.all)
+
+
+@pytest.mark.parametrize('col', ['sentiment_score', 'upvotes'])
+@pytest.mark.parametrize('descending', [True, False])
+def test_order_matches_stable_sort(frame, index, col, descending):
+    expected = frame[col].reset_index(drop=True).sort_values(ascending=not descending, kind='stable').index
+    order = index.order(col, descending)
+    assert np.array_equal(order, expected.to_numpy())
+    assert np.isnan(frame[col].to_numpy()[order[-frame[col].isna().sum():]]).all()    # NaN last
+    assert index.order(col, descending) is order
+
+
+@pytest.mark.parametrize('descending', [True, False])
+def test_ordered_subset_matches_filtered_sort(frame, index, descending):
+    start, end = T0 + 5 * DAY, T0 + 15 * DAY + 999
+    mask = _in_range(frame, start, end) & (frame['sentiment_label'] == 'Positive').to_numpy()
+    expected = (frame['sentiment_score'].reset_index(drop=True)[mask]
+                .sort_values(ascending=not descending, kind='stable').index.to_numpy())
+    bitmap = index.select(start, end, sentiment_label='Positive')
+    rows = index.ordered(bitmap, index.order('sentiment_score', descending))
+    assert np.array_equal(rows, expected)
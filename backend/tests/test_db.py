@@ -0,0 +1,110 @@
+import multiprocessing
+import sqlite3
+
+import pytest
+
+import db
+
+MONTHS = ['2024-01-15T10:00:00', '2024-02-03 08:30:00', '2024-03-28T23:59:59+00:00', 'not a date']
+
+
+def _row(i: int, created: str) -> tuple:
+    return (f'p{i}', 'r/a', 't', 'u', '', '', 0.5, 'Positive', 0, 0, 0, i, created)
+
+
+def _legacy_db(path: str, n: int) -> list:
+    """A pre-partitioning reddit.db: one `posts` table with an index on created_time."""
+    rows = [_row(i, MONTHS[i % len(MONTHS)]) for i in range(n)]
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE posts {db.POSTS_COLUMNS}")
+    conn.execute("CREATE INDEX idx_posts_created_time ON posts (created_time)")
+    conn.executemany("INSERT INTO posts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return rows
+
+
+def _partition_rows(path: str) -> dict:
+    conn = sqlite3.connect(path)
+    try:
+        return {name: sorted(r[0] for r in conn.execute(f"SELECT id FROM {name}"))
+                for name in db.list_partitions(conn)}
+    finally:
+        conn.close()
+
+
+def _init_worker(path: str, batch: int):
+    db.DB_PATH = path
+    db.MIGRATE_BATCH = batch
+    db.init_db()
+
+
+@pytest.fixture
+def legacy_path(tmp_path, monkeypatch):
+    path = str(tmp_path / 'reddit.db')
+    monkeypatch.setattr(db, 'DB_PATH', path)
+    return path
+
+
+def test_legacy_table_migrates_into_partitions(legacy_path, monkeypatch):
+    monkeypatch.setattr(db, 'MIGRATE_BATCH', 7)
+    rows = _legacy_db(legacy_path, 50)
+    db.init_db()
+
+    parts = _partition_rows(legacy_path)
+    for name in ('posts_2024_01', 'posts_2024_02', 'posts_2024_03', db.UNDATED_PARTITION):
+        assert parts[name] == sorted(r[0] for r in rows if db.partition_for(r[12]) == name)
+    conn = sqlite3.connect(legacy_path)
+    try:
+        kinds = dict(conn.execute("SELECT name, type FROM sqlite_master WHERE name IN ('posts', ?)",
+                                  (db.LEGACY_TABLE,)))
+        assert kinds == {'posts': 'view'}
+        assert conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0] == len(rows)
+    finally:
+        conn.close()
+    db.init_db()                                        # nothing left to migrate
+    assert _partition_rows(legacy_path) == parts
+
+
+def test_concurrent_workers_migrate_once(legacy_path):
+    rows = _legacy_db(legacy_path, 2000)
+    ctx = multiprocessing.get_context('fork')
+    workers = [ctx.Process(target=_init_worker, args=(legacy_path, 50)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(60)
+    assert [w.exitcode for w in workers] == [0] * len(workers)
+
+    ids = [i for part in _partition_rows(legacy_path).values() for i in part]
+    assert sorted(ids) == sorted(r[0] for r in rows)
+    conn = sqlite3.connect(legacy_path)
+    try:
+        assert not db._table_exists(conn, db.LEGACY_TABLE)
+    finally:
+        conn.close()
+
+
+def test_partitions_for_prunes_by_month(tmp_db):
+    for name in ('posts_2023_12', 'posts_2024_01', 'posts_2024_02', 'posts_2024_03', db.UNDATED_PARTITION):
+        db.ensure_partition(name)
+    conn = sqlite3.connect(tmp_db)
+    try:
+        months = [n for n in db.list_partitions(conn) if n.startswith(('posts_2023', 'posts_2024'))]
+        assert db.partitions_for(conn, start='2024-01-15T00:00:00', end='2024-03') == \
+            ['posts_2024_01', 'posts_2024_02']
+        assert db.partitions_for(conn, end='2024-01') == [db.UNDATED_PARTITION, 'posts_2023_12']
+        assert db.UNDATED_PARTITION not in db.partitions_for(conn, start='2000-01')
+        assert [n for n in db.partitions_for(conn, newest_first=True) if n in months] == months[::-1]
+    finally:
+        conn.close()
+
+
+def test_get_all_posts_newest_first_across_months(tmp_db):
+    created = ['2024-01-05T00:00:00', '2024-03-01T12:00:00', '2024-02-10T09:00:00',
+               '2024-03-20T08:00:00', '2024-01-31T23:00:00']
+    db.insert_many([_row(i, c) for i, c in enumerate(created)])
+
+    posts = db.get_all_posts()
+    assert [p['created_time'] for p in posts] == sorted(created, reverse=True)
+    assert [p['id'] for p in db.get_all_posts(limit=3)] == ['p3', 'p1', 'p2']
@@ -0,0 +1,74 @@
+import db
+import events
+import leader
+import url_analysis
+import app as appmod
+
+
+def _drain(q) -> list:
+    frames = []
+    while not q.empty():
+        frames.append(q.get_nowait())
+    return frames
+
+
+def test_relay_republishes_other_workers_events(tmp_db):
+    db.append_event('old', 'cycle', '{"before": true}')       # logged before either worker started
+    here, there = events.Broadcaster(), events.Broadcaster()
+    relay_here, relay_there = events.Relay(here), events.Relay(there)
+    q_here, q_there = here.subscribe(), there.subscribe()
+
+    relay_here.share('cycle', {'new_posts': 3})
+    relay_there.share('dataset', {'action': 'upload'})
+    assert relay_here.poll() == 1 and relay_there.poll() == 1
+
+    frames = _drain(q_here)
+    assert len(frames) == 1 and 'event: dataset' in frames[0] and '"upload"' in frames[0]
+    frames = _drain(q_there)
+    assert len(frames) == 1 and 'event: cycle' in frames[0] and '"new_posts": 3' in frames[0]
+    assert relay_here.poll() == 0 and _drain(q_here) == []      # never relayed twice
+
+
+def test_relay_reads_past_one_batch(tmp_db, monkeypatch):
+    monkeypatch.setattr(events, 'RELAY_BATCH', 4)
+    target = events.Broadcaster(buffer_size=64)
+    relay = events.Relay(target)
+    q = target.subscribe()
+    for i in range(10):
+        db.append_event('other', 'cycle', f'{{"i": {i}}}')
+    assert relay.poll() == 10 and len(_drain(q)) == 10
+
+
+def test_publish_shares_only_with_a_relay(tmp_db, monkeypatch):
+    monkeypatch.setattr(events, 'relay', None)
+    assert not events.listening()
+    events.publish('cycle', {'x': 1})
+    assert db.events_since(0) == []
+
+    monkeypatch.setattr(events, 'relay', events.Relay(events.broadcaster))
+    assert events.listening()
+    events.publish('cycle', {'x': 2})
+    assert [row[2] for row in db.events_since(0)] == ['cycle']
+
+
+def test_url_job_read_from_another_worker(tmp_db, monkeypatch):
+    monkeypatch.setattr(url_analysis, 'SHARE_JOBS', True)
+    db.save_url_job({'job_id': 'elsewhere', 'status': 'running', 'url': 'https://x'})
+    assert url_analysis.get_job('elsewhere')['status'] == 'running'
+    assert url_analysis.get_job('missing') is None
+    monkeypatch.setattr(url_analysis, 'SHARE_JOBS', False)
+    assert url_analysis.get_job('elsewhere') is None
+
+
+def test_live_stats_from_leader_lease(client, monkeypatch):
+    monkeypatch.setattr(appmod, 'RUN_MODE', 'multi')
+    monkeypatch.setattr(leader, 'is_leader', lambda: False)
+    top = {'most_positive': [{'post_id': 'p1'}], 'most_negative': [], 'most_upvoted': []}
+    live = {'windows': {'1m': {'count': 7}}, 'top': {'': top, 'r/test': {**top, 'most_positive': []}}}
+    db.acquire_lease(leader.LEASE_NAME, 'leader-pid', 30, state={'live': live})
+
+    body = client.get('/api/live-stats').get_json()
+    assert body['windows'] == live['windows'] and body['top'] == top
+    assert client.get('/api/live-stats?subreddit=r/test').get_json()['top']['most_positive'] == []
+    unseen = client.get('/api/live-stats?subreddit=r/none').get_json()['top']
+    assert unseen == {'most_positive': [], 'most_negative': [], 'most_upvoted': []}
@@ -0,0 +1,30 @@
+import os
+import tempfile
+
+import pytest
+
+pytest.importorskip('duckdb')
+
+import datasets  # noqa: E402
+import db  # noqa: E402
+import duckdb_engine  # noqa: E402
+from bench import parity  # noqa: E402
+
+
+@pytest.fixture
+def isolated(client, tmp_path, monkeypatch):
+    """parity.run() repoints the app at its own temp dir and engine; put everything back afterwards."""
+    for module, name in ((db, 'DB_PATH'), (datasets, 'DATASET_DIR'),
+                         (duckdb_engine, 'QUERY_ENGINE'), (duckdb_engine, 'engine')):
+        monkeypatch.setattr(module, name, getattr(module, name))
+
+    def mkdtemp(prefix: str = '') -> str:
+        path = tmp_path / prefix
+        path.mkdir()
+        return str(path)
+    monkeypatch.setattr(tempfile, 'mkdtemp', mkdtemp)
+    monkeypatch.chdir(os.getcwd())
+
+
+def test_pandas_and_duckdb_engines_agree(isolated):
+    assert parity.run(rows=2000, seed=0) == 0
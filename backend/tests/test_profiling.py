@@ -0,0 +1,73 @@
+import os
+import threading
+
+import pytest
+
+import profiling
+
+
+@pytest.fixture(autouse=True)
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path / 'profiles'))
+    monkeypatch.setattr(profiling, 'ENABLED', True)
+
+
+def _busy():
+    return sum(i * i for i in range(20_000))
+
+
+def test_second_cprofile_falls_back_to_sampler():
+    first = profiling.start('cprofile')
+    started = {}
+
+    def other():
+        started['handle'] = profiling.start('cprofile')
+        _busy()
+        started['name'] = profiling.stop(started['handle'], 'other')
+
+    thread = threading.Thread(target=other)
+    thread.start()
+    thread.join()
+    name = profiling.stop(first, 'first')
+
+    assert first[0] == 'cprofile' and name.endswith('.pstats')
+    assert started['handle'][0] == 'sample' and started['name'].endswith('.collapsed')
+    again = profiling.start('cprofile')              # released by stop()
+    assert again[0] == 'cprofile'
+    profiling.stop(again, 'again')
+    assert len(profiling.list_profiles()) == 3
+
+
+def test_cprofile_refused_by_another_tool_samples(monkeypatch):
+    class Taken:
+        def enable(self):
+            raise ValueError('Another profiling tool is already active')
+
+    monkeypatch.setattr(profiling.cProfile, 'Profile', Taken)
+    handle = profiling.start('cprofile')
+    assert handle[0] == 'sample'
+    profiling.stop(handle, 'taken')
+    assert not profiling._cprofile_lock.locked()
+
+
+def test_cycle_runs_when_profiler_cannot_start(monkeypatch):
+    def broken(mode):
+        raise RuntimeError('no profiler')
+
+    monkeypatch.setattr(profiling, 'start', broken)
+    profiling.profile_next_cycles(1)
+    ran = []
+    with profiling.cycle_profile():
+        ran.append(True)
+    assert ran == [True] and profiling.scheduler_requests['remaining'] == 0
+    assert profiling.list_profiles() == []
+
+
+def test_cycle_profiles_only_armed_cycles():
+    profiling.profile_next_cycles(1, 'cprofile')
+    for _ in range(2):
+        with profiling.cycle_profile():
+            _busy()
+    profiles = profiling.list_profiles()
+    assert len(profiles) == 1 and profiles[0]['name'].endswith('_scheduler.pstats')
+    assert os.path.isfile(profiling.profile_path(profiles[0]['name']))
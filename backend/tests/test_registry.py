@@ -0,0 +1,96 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import datasets
+import registry
+
+
+class Index:
+    """Stand-in for a derived structure (bitmaps.py); only its nbytes matters here."""
+
+    def __init__(self, nbytes: int):
+        self.nbytes = nbytes
+
+
+def _frame(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'post_id': [f'd{seed}_{i}' for i in range(n)],
+        'subreddit': rng.choice(['r/a', 'r/b', 'r/c'], n),
+        'comment': [f'comment {seed} number {i}' for i in range(n)],
+        'sentiment_label': rng.choice(['Positive', 'Neutral', 'Negative'], n),
+        'sentiment_score': rng.uniform(-1, 1, n).round(4),
+        'created_time': '2024-01-01T00:00:00',
+    })
+
+
+FRAME_BYTES = int(_frame(200, 0).memory_usage(deep=True).sum())
+
+
+@pytest.fixture(autouse=True)
+def empty_registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets, 'DATASET_DIR', str(tmp_path / 'datasets'))
+    monkeypatch.setattr(registry, '_entries', OrderedDict())
+    monkeypatch.setattr(registry, 'stats', dict.fromkeys(registry.stats, 0))
+    monkeypatch.setattr(registry, 'MEMORY_BUDGET', int(FRAME_BYTES * 2.5))      # room for two frames
+
+
+def _add(seed: int) -> str:
+    return registry.add(_frame(200, seed), {'filename': f'{seed}.csv', 'rows': 200})
+
+
+def _resident() -> list:
+    return [e.id for e in registry._entries.values() if e.resident]
+
+
+def test_least_recently_used_is_evicted_first():
+    a, b = _add(1), _add(2)
+    registry.get(a)                                   # b is now the least recently used
+    c = _add(3)
+    assert sorted(_resident()) == sorted([a, c])
+    assert registry.stats['evictions'] == 1 and datasets.exists(b)
+    assert registry.resident_bytes() <= registry.MEMORY_BUDGET
+
+
+def test_memory_bytes_counts_derived_structures():
+    a = _add(1)
+    entry = registry._entries[a]
+    assert entry.memory_bytes == entry.nbytes > 0
+    registry.derived(a, 'index', lambda frame, text: Index(1000))
+    assert entry.memory_bytes == entry.nbytes + 1000 == registry.resident_bytes()
+
+    b = _add(2)
+    registry.derived(b, 'index', lambda frame, text: Index(FRAME_BYTES))   # pushes the pair over budget
+    assert _resident() == [b]
+    assert entry.memory_bytes == 0 and entry.derived == {}
+
+
+def test_reload_after_eviction():
+    a = _add(1)
+    _add(2)
+    _add(3)
+    assert a not in _resident()
+    original = _frame(200, 1)
+
+    frame, text = registry.get(a)
+    assert registry.stats['reloads'] == 1 and a in _resident()
+    assert registry._entries[a].memory_bytes > 0
+    assert frame['sentiment_score'].tolist() == original['sentiment_score'].tolist()
+    assert list(frame['subreddit'].astype(str)) == original['subreddit'].tolist()
+    assert datasets.text_values(frame, text, 'comment') == original['comment'].tolist()
+    assert registry.meta(a)['filename'] == '1.csv'
+
+
+def test_dataset_in_use_is_never_evicted(monkeypatch):
+    monkeypatch.setattr(registry, 'MEMORY_BUDGET', 1)                  # smaller than any frame
+    a = _add(1)
+    assert _resident() == [a]                         # a lone upload over budget still works
+    b = _add(2)
+    assert _resident() == [b]
+    registry.get(a)
+    assert _resident() == [a]
+    assert registry.derived(a, 'index', lambda frame, text: Index(10)).nbytes == 10
+    assert _resident() == [a]
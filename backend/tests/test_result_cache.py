@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+import result_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    """Each test starts with an empty 1 KB cache and zeroed stats."""
+    monkeypatch.setattr(result_cache, 'CACHE_BYTES', 1024)
+    monkeypatch.setattr(result_cache, 'stats', {'hits': 0, 'misses': 0, 'evictions': 0})
+    result_cache.invalidate()
+    yield
+    result_cache.invalidate()
+
+
+def _rows(n: int) -> np.ndarray:
+    return np.arange(n, dtype=np.int64)        # 8 bytes per row
+
+
+def test_get_put_and_hit_ratio():
+    assert result_cache.get(('d1', 'x')) is None
+    rows = _rows(10)
+    result_cache.put(('d1', 'x'), rows)
+    assert result_cache.get(('d1', 'x')) is rows
+    assert result_cache.get(('d1', 'x')) is rows
+    assert result_cache.stats['hits'] == 2 and result_cache.stats['misses'] == 1
+    assert result_cache.hit_ratio() == pytest.approx(2 / 3)
+    summary = result_cache.summary()
+    assert summary['entries'] == 1 and summary['bytes'] == rows.nbytes
+
+
+def test_hit_ratio_without_lookups():
+    assert result_cache.hit_ratio() == 0.0
+
+
+def test_put_replaces_and_keeps_byte_count():
+    result_cache.put(('d1', 'x'), _rows(10))
+    result_cache.put(('d1', 'x'), _rows(20))
+    assert len(result_cache.get(('d1', 'x'))) == 20
+    assert result_cache.summary()['bytes'] == _rows(20).nbytes
+
+
+def test_evicts_least_recently_used_within_budget():
+    for name in 'abc':
+        result_cache.put(('d1', name), _rows(40))         # 320 bytes each, 960 total
+    result_cache.get(('d1', 'a'))                          # 'b' is now least recently used
+    result_cache.put(('d1', 'd'), _rows(40))
+    assert result_cache.get(('d1', 'b')) is None
+    assert all(result_cache.get(('d1', name)) is not None for name in 'acd')
+    assert result_cache.stats['evictions'] == 1
+    assert result_cache.summary()['bytes'] <= result_cache.CACHE_BYTES
+
+
+def test_oversized_result_is_not_stored():
+    result_cache.put(('d1', 'small'), _rows(10))
+    result_cache.put(('d1', 'huge'), _rows(200))           # 1600 bytes > 1 KB budget
+    assert result_cache.get(('d1', 'huge')) is None
+    assert result_cache.get(('d1', 'small')) is not None
+
+
+def test_invalidate_one_dataset():
+    result_cache.put(('d1', 'x'), _rows(10))
+    result_cache.put(('d1', 'y'), _rows(10))
+    result_cache.put(('d2', 'x'), _rows(10))
+    result_cache.invalidate('d1')
+    assert result_cache.get(('d1', 'x')) is None and result_cache.get(('d1', 'y')) is None
+    assert result_cache.get(('d2', 'x')) is not None
+    assert result_cache.summary()['bytes'] == _rows(10).nbytes
+    result_cache.invalidate()
+    assert result_cache.summary()['entries'] == 0 and result_cache.summary()['bytes'] == 0
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import db
+import retention
+
+NOW = datetime.now(timezone.utc).replace(minute=30, second=0, microsecond=0)
+
+
+def _post(i: int, hours_ago: float, subreddit: str = 'r/a', label: str = 'Positive', score: float = 0.5) -> tuple:
+    created = (NOW - timedelta(hours=hours_ago)).strftime('%Y-%m-%dT%H:%M:%S')
+    return (f'p{i}', subreddit, 't', 'u', '', '', score, label, 0, 0, 0, 10, created)
+
+
+def _history_totals(granularity: str, days: float) -> tuple:
+    """(rows, score sum) over history(); avg_score is rounded to 4 places per bucket."""
+    rows = retention.history(granularity, days)
+    return sum(r['count'] for r in rows), sum(r['avg_score'] * r['count'] for r in rows)
+
+
+def _assert_same(totals: tuple, expected: tuple):
+    assert totals[0] == expected[0]
+    assert totals[1] == pytest.approx(expected[1], abs=0.05)
+
+
+@pytest.fixture
+def posts(tmp_db, monkeypatch):
+    monkeypatch.setattr(retention, 'RAW_DAYS', 30)
+    monkeypatch.setattr(retention, 'HOURLY_DAYS', 0)
+    monkeypatch.setattr(retention, 'BATCH_SIZE', 7)       # several boundary-month batches
+    monkeypatch.setattr(retention, 'BATCH_PAUSE', 0)
+    labels = ('Positive', 'Neutral', 'Negative')
+    rows = [_post(i, hours_ago=i * 9, subreddit=f'r/{i % 3}', label=labels[i % 3], score=(i % 5 - 2) / 2)
+            for i in range(250)]                           # ~94 days back, across several months
+    db.insert_many(rows)
+    return rows
+
+
+def test_rollup_keeps_history_totals(posts):
+    before = _history_totals('day', 120)
+    result = retention.run(NOW)
+
+    assert result['rolled_up'] == sum(1 for r in posts if r[-1] < retention._cutoff(30, NOW, 19))
+    assert result['rolled_up'] > 0
+    _assert_same(_history_totals('day', 120), before)
+    _assert_same(_history_totals('hour', 120), before)
+
+
+def test_rollup_moves_rows_out_of_raw_partitions(posts):
+    retention.run(NOW)
+    cutoff = retention._cutoff(30, NOW, 19)
+    conn = retention._connect()
+    try:
+        raw = [r for t in db.partitions_for(conn)
+               for r in conn.execute(f"SELECT created_time FROM {t}").fetchall()]
+        summary = conn.execute("SELECT SUM(count) FROM posts_daily").fetchone()[0]
+    finally:
+        conn.close()
+    assert raw and all(created >= cutoff for (created,) in raw)
+    assert summary + len(raw) == len(posts)
+
+
+def test_second_run_is_a_no_op(posts):
+    retention.run(NOW)
+    after_first = _history_totals('day', 120)
+    assert retention.run(NOW)['rolled_up'] == 0
+    _assert_same(_history_totals('day', 120), after_first)
+
+
+def test_summary_expiry(posts, monkeypatch):
+    retention.run(NOW)
+    monkeypatch.setattr(retention, 'HOURLY_DAYS', 60)
+    deleted = retention.run(NOW)['hourly_deleted']
+    conn = retention._connect()
+    try:
+        oldest = conn.execute("SELECT MIN(bucket) FROM posts_hourly").fetchone()[0]
+    finally:
+        conn.close()
+    assert deleted > 0
+    assert oldest >= retention._cutoff(60, NOW, 13)
+
+
+def test_space_separated_rows_on_the_cutoff_day(tmp_db, monkeypatch):
+    monkeypatch.setattr(retention, 'HOURLY_DAYS', 0)
+    now = datetime(2024, 3, 15, 12, 30, tzinfo=timezone.utc)          # raw cutoff 2024-02-14T12:00:00
+    row = lambda i, created: (f's{i}', 'r/a', 't', 'u', '', '', 0.5, 'Positive', 0, 0, 0, 10, created)
+    db.insert_many([row(0, '2024-02-14 11:45:00'), row(1, '2024-02-14 13:00:00'), row(2, '2024-02-14T13:00:00')])
+
+    assert retention.run(now)['rolled_up'] == 1
+    conn = retention._connect()
+    try:
+        kept = sorted(r[0] for r in conn.execute("SELECT id FROM posts_2024_02"))
+    finally:
+        conn.close()
+    assert kept == ['s1', 's2']
+
+
+def test_history_counts_space_separated_rows_in_the_first_bucket(tmp_db):
+    created = (NOW - timedelta(hours=48)).strftime('%Y-%m-%d %H:%M:%S')     # inside the first hour
+    db.insert_many([(f'h{i}', 'r/a', 't', 'u', '', '', 0.5, 'Positive', 0, 0, 0, 10, created) for i in range(3)])
+    assert sum(r['count'] for r in retention.history('hour', 2)) == 3
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import sampling
+import timeseries
+
+DAY = 86400
+
+
+def _frame(n: int, seed: int = 5, subs: int = 6) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    label = rng.choice(timeseries.LABELS, n, p=[0.5, 0.3, 0.2])
+    base = np.select([label == 'Positive', label == 'Negative'], [0.5, -0.5], 0.0)
+    return pd.DataFrame({
+        'subreddit': np.array([f'r/s{i}' for i in range(subs)])[rng.zipf(1.6, n) % subs],
+        'sentiment_label': label,
+        'sentiment_score': np.round(base + rng.normal(0, 0.2, n), 4),
+        'created_time': pd.to_datetime(1_700_000_000 + rng.integers(0, 10 * DAY, n), unit='s')
+                          .strftime('%Y-%m-%dT%H:%M:%S'),
+    })
+
+
+def _bounds_equal(intervals: dict, values: dict, digits: int | None = None):
+    for key, value in values.items():
+        expected = round(value) if digits is None else round(value, digits)
+        assert intervals[key] == [expected, expected]
+
+
+def test_full_sample_is_exact_with_zero_width_intervals():
+    df = _frame(3000)
+    sample = sampling.StratifiedSample(df, size=5000)
+    assert len(sample.frame) == len(df) and (sample.weight == 1).all()
+
+    overview = sampling.overview(sample)
+    assert overview['avg_sentiment_score'] == round(df['sentiment_score'].mean(), 4)
+    assert overview['approx']['intervals']['avg_sentiment_score'] == [overview['avg_sentiment_score']] * 2
+
+    subs = sampling.subreddits(sample)
+    means = df.groupby('subreddit')['sentiment_score'].mean()
+    _bounds_equal(subs['approx']['intervals']['avg_score'], means.to_dict(), 4)
+    assert {s['name']: s['total'] for s in subs['subreddits']} == df['subreddit'].value_counts().to_dict()
+
+    trends = sampling.trends(sample, 'day', by_subreddit=True)
+    exact = timeseries.trend_rows(df, 'day', by_subreddit=True)
+    assert trends['trends'] == exact['trends']
+    assert trends['subreddits'] == exact['subreddits']
+    _bounds_equal(trends['approx']['intervals']['total'], {r['date']: r['total'] for r in exact['trends']})
+
+
+@pytest.fixture
+def subsample(monkeypatch) -> tuple:
+    monkeypatch.setattr(sampling, 'MIN_STRATUM', 2)
+    df = _frame(4000, seed=8, subs=3)
+    return df, sampling.StratifiedSample(df, size=400)
+
+
+def test_variance_matches_hand_formula(subsample):
+    df, sample = subsample
+    assert len(sample.frame) < len(df)
+    y = sample.frame['sentiment_score'].to_numpy()
+    domain = (y > 0).astype(np.int64)                 # two domains: score <= 0, score > 0
+    est = sample.estimate(domain, 2, y)
+
+    for d in (0, 1):
+        count_var = mean_var = 0.0
+        total = (sample.weight * (domain == d)).sum()
+        mean = (sample.weight * y * (domain == d)).sum() / total
+        for h in range(len(sample.sizes)):
+            N_h, n_h = sample.sizes[h], sample.taken[h]
+            rows = sample.stratum == h
+            if n_h < 2:
+                continue
+            fpc = N_h ** 2 * (1 - n_h / N_h) / n_h
+            in_d = (domain[rows] == d).astype(float)
+            count_var += fpc * np.var(in_d, ddof=1)
+            mean_var += fpc * np.var(in_d * (y[rows] - mean) / total, ddof=1)
+        assert est['count'][d] == pytest.approx(total)
+        assert est['mean'][d] == pytest.approx(mean)
+        assert est['count_se'][d] == pytest.approx(np.sqrt(count_var))
+        assert est['mean_se'][d] == pytest.approx(np.sqrt(mean_var))
+
+
+def test_counts_of_whole_strata_have_no_error(subsample):
+    df, sample = subsample
+    sub = sample.sub_of[sample.stratum]
+    est = sample.estimate(sub, len(sample.subs))
+    assert est['count'] == pytest.approx(df['subreddit'].value_counts()[sample.subs].to_numpy())
+    assert est['count_se'] == pytest.approx(0, abs=1e-6)
+    assert (sample.estimate(np.full(len(sub), -1), 3)['count'] == 0).all()     # rows in no domain
+
+
+def test_mean_intervals_cover_the_exact_mean(monkeypatch):
+    df = _frame(6000, seed=21)
+    exact = df.groupby('subreddit')['sentiment_score'].mean()
+    covered = checked = 0
+    for seed in range(60):
+        monkeypatch.setattr(sampling, 'SEED', seed)
+        intervals = sampling.subreddits(sampling.StratifiedSample(df, size=600))['approx']['intervals']['avg_score']
+        for name, (lo, hi) in intervals.items():
+            checked += 1
+            covered += lo <= exact[name] <= hi
+    assert 0.88 <= covered / checked <= 1.0
+
+
+def test_trend_intervals_bracket_estimates(subsample):
+    df, sample = subsample
+    result = sampling.trends(sample, 'hour', by_subreddit=True)
+    approx = result['approx']
+    assert approx['sample_rows'] == len(sample.frame) and approx['rows'] == len(df)
+    assert approx['confidence'] == sampling.CONFIDENCE and approx['strata'] == len(sample.sizes)
+    intervals = approx['intervals']
+    assert set(intervals['total']) == set(intervals['avg_score']) == {r['date'] for r in result['trends']}
+    for row in result['trends']:
+        lo, hi = intervals['total'][row['date']]
+        assert 0 <= lo <= row['total'] <= hi
+        lo, hi = intervals['avg_score'][row['date']]
+        assert lo <= row['avg_score'] <= hi
+    assert sum(r['total'] for r in result['trends']) == pytest.approx(len(df), rel=0.01)
+    per_sub = {name: sum(r['total'] for r in rows) for name, rows in result['subreddits'].items()}
+    for name, total in df['subreddit'].value_counts().items():
+        assert per_sub[name] == pytest.approx(total, rel=0.02)
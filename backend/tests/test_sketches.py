@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+import sketches
+
+
+def _hll(values, p: int = 14) -> sketches.HyperLogLog:
+    sketch = sketches.HyperLogLog(p)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def _digest(values, compression: float = 100) -> sketches.TDigest:
+    digest = sketches.TDigest(compression)
+    for value in values:
+        digest.add(float(value))
+    return digest
+
+
+def test_hll_precision_meets_error():
+    for error in (0.05, 0.02, 0.01):
+        p = sketches.hll_precision(error)
+        assert 1.04 / np.sqrt(2 ** p) <= error
+        assert 1.04 / np.sqrt(2 ** (p - 1)) > error
+
+
+@pytest.mark.parametrize('n', [10, 1000, 50_000])
+def test_hll_estimate_within_error(n):
+    sketch = _hll(f'user{i}' for i in range(n))
+    assert abs(sketch.estimate() - n) <= max(3 * sketch.relative_error * n, 1)
+
+
+def test_hll_ignores_duplicates_and_round_trips():
+    sketch = _hll([f'r/{i % 300}' for i in range(20_000)])
+    assert abs(sketch.estimate() - 300) <= 3 * sketch.relative_error * 300
+    copy = sketches.HyperLogLog.from_bytes(sketch.to_bytes())
+    assert copy.p == sketch.p and copy.registers == sketch.registers
+    assert copy.estimate() == sketch.estimate()
+
+
+def test_hll_merge_is_union():
+    a = _hll(f'user{i}' for i in range(0, 30_000))
+    b = _hll(f'user{i}' for i in range(20_000, 50_000))
+    a.merge(b)
+    assert a.registers == _hll(f'user{i}' for i in range(50_000)).registers
+    with pytest.raises(ValueError):
+        a.merge(sketches.HyperLogLog(10))
+
+
+@pytest.fixture(scope='module')
+def scores() -> np.ndarray:
+    rng = np.random.default_rng(11)
+    return np.concatenate([rng.normal(0.2, 0.3, 40_000), rng.exponential(2.0, 10_000)])
+
+
+def _rank(values: np.ndarray, x: float) -> float:
+    """Midpoint rank of x in values, as a quantile."""
+    return (np.searchsorted(values, x, 'left') + np.searchsorted(values, x, 'right')) / 2 / len(values)
+
+
+def test_tdigest_quantiles_within_rank_error(scores):
+    digest = _digest(scores)
+    ordered = np.sort(scores)
+    assert digest.count == len(scores)
+    for q in (0.001, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 0.999):
+        value, rank_error = digest.quantile(q)
+        assert abs(_rank(ordered, value) - q) <= rank_error + 1 / len(scores)
+        assert rank_error <= 0.02
+    assert digest.quantile(0.0)[0] == pytest.approx(ordered[0], abs=0.05)
+    assert digest.quantile(1.0)[0] == ordered[-1]
+
+
+def test_tdigest_is_small_and_skips_nan():
+    digest = _digest([0.5, float('nan'), 0.25])
+    digest.add(None)
+    assert digest.count == 2
+    assert sketches.TDigest().quantile(0.5) == (None, None)
+    big = _digest(np.random.default_rng(1).uniform(0, 1, 100_000))
+    big._compress()
+    assert len(big.means) < 3 * big.compression
+
+
+def test_tdigest_round_trip(scores):
+    digest = _digest(scores)
+    copy = sketches.TDigest.from_bytes(digest.to_bytes())
+    assert (copy.compression, copy.count, copy.min, copy.max) == (digest.compression, digest.count,
+                                                                   digest.min, digest.max)
+    for q in sketches.DEFAULT_QUANTILES:
+        assert copy.quantile(q) == digest.quantile(q)
+
+
+def test_tdigest_merge(scores):
+    half = len(scores) // 2
+    merged = _digest(scores[:half])
+    merged.merge(_digest(scores[half:]))
+    whole = _digest(scores)
+    assert merged.count == whole.count
+    assert (merged.min, merged.max) == (scores.min(), scores.max())
+    ordered = np.sort(scores)
+    for q in (0.01, 0.5, 0.99):
+        value, rank_error = merged.quantile(q)
+        assert abs(_rank(ordered, value) - q) <= rank_error + 1 / len(scores)
+
+
+def test_save_and_load_through_db(tmp_db, monkeypatch):
+    monkeypatch.setattr(sketches, '_sketches', sketches._empty())
+    monkeypatch.setattr(sketches, '_owner', True)
+    for i in range(500):
+        sketches.record({'subreddit': f'r/{i % 7}', 'author': f'u{i % 40}',
+                         'sentiment_score': (i % 21 - 10) / 10, 'upvotes': i % 13})
+    before = sketches.distinct_summary(), sketches.quantile_summary()
+    sketches.save()
+
+    monkeypatch.setattr(sketches, '_sketches', sketches._empty())
+    sketches.load()
+    assert (sketches.distinct_summary(), sketches.quantile_summary()) == before
+    assert before[0]['subreddits']['estimate'] == 7 and before[0]['authors']['estimate'] == 40
+    assert before[1]['upvotes']['count'] == 500
+
+
+def test_parse_quantiles():
+    assert sketches.parse_quantiles(None) == sketches.DEFAULT_QUANTILES
+    assert sketches.parse_quantiles('0.5,0.9') == (0.5, 0.9)
+    with pytest.raises(ValueError):
+        sketches.parse_quantiles('0.5,1.5')
@@ -0,0 +1,118 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app as appmod
+import topk
+
+
+def _frame(n: int = 400, seed: int = 3) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'subreddit': rng.choice(['r/a', 'r/b', 'r/c'], n),
+        'sentiment_score': np.round(rng.uniform(-1, 1, n), 1),     # many ties
+        'upvotes': rng.integers(0, 20, n).astype(float),
+    })
+    df.loc[rng.choice(n, 40, replace=False), 'sentiment_score'] = np.nan
+    df.loc[rng.choice(n, 40, replace=False), 'upvotes'] = np.nan
+    return df
+
+
+def _listing(df: pd.DataFrame, metric: str, direction: str, subreddit: str | None = None) -> list:
+    """The full listing's order: stable sort, NaN last, as bitmaps.BitmapIndex.order()."""
+    values = df[metric].reset_index(drop=True)
+    if subreddit is not None:
+        values = values[df['subreddit'].to_numpy() == subreddit]
+    return list(values.sort_values(ascending=direction == 'low', kind='stable').index)
+
+
+@pytest.mark.parametrize('metric,direction', [('sentiment_score', 'high'), ('sentiment_score', 'low'),
+                                              ('upvotes', 'high')])
+@pytest.mark.parametrize('subreddit', [None, 'r/b'])
+def test_pages_match_stable_sort(metric, direction, subreddit):
+    df = _frame()
+    top = topk.TopK.from_frame(df, k=25)
+    expected = _listing(df, metric, direction, subreddit)
+    for start in range(0, 40, 10):
+        page = top.rows(metric, direction, subreddit, start, start + 10)
+        if start + 10 <= 25:
+            assert page == expected[start:start + 10]
+        else:
+            assert page is None                  # past the heap: the caller uses the listing
+
+
+def test_nan_rows_are_not_answered_off_a_complete_heap():
+    df = pd.DataFrame({'subreddit': ['r/a'] * 6, 'sentiment_score': [0.5, np.nan, 0.9, 0.1, np.nan, 0.3]})
+    top = topk.TopK.from_frame(df, k=10)         # every ranked row fits in the heap
+    assert top.rows('sentiment_score', 'high', stop=4) == [2, 0, 5, 3]
+    assert top.rows('sentiment_score', 'high', start=0, stop=6) is None    # rows 1 and 4 come last
+    assert top.rows('sentiment_score', 'low', start=4, stop=8) is None
+    assert top.rows('sentiment_score', 'high') == [2, 0, 5, 3]
+
+
+def test_complete_heap_answers_short_scopes():
+    df = pd.DataFrame({'subreddit': ['r/a', 'r/b', 'r/a'], 'sentiment_score': [0.2, 0.4, -0.3]})
+    top = topk.TopK.from_frame(df, k=10)
+    assert top.rows('sentiment_score', 'high', 'r/a', 0, 10) == [0, 2]
+    assert top.rows('sentiment_score', 'low', None, 2, 10) == [1]
+    assert top.rows('sentiment_score', 'high', 'r/missing', 0, 10) == []
+    assert top.count('r/a') == 2 and top.count() == 3
+
+
+def test_add_matches_from_frame():
+    df = _frame(200, seed=9)
+    built = topk.TopK.from_frame(df, k=15)
+    live = topk.TopK(k=15)
+    for row, (sub, score, upvotes) in enumerate(df[['subreddit', 'sentiment_score', 'upvotes']].itertuples(index=False)):
+        live.add(sub, {'sentiment_score': score, 'upvotes': upvotes}, row)
+    for metric, directions in topk.METRICS.items():
+        for direction in directions:
+            for sub in (None, 'r/a', 'r/c'):
+                assert live.rows(metric, direction, sub, 0, 15) == built.rows(metric, direction, sub, 0, 15)
+                assert live.rows(metric, direction, sub, 10, 20) is None
+
+
+def test_snapshot_lists_fewer_rows_than_asked(monkeypatch):
+    monkeypatch.setattr(topk, 'live', topk.TopK())
+    topk.record({'id': 'p1', 'subreddit': 'r/a', 'sentiment_label': 'Positive', 'sentiment_score': 0.7,
+                 'upvotes': 3, 'title': 't'})
+    topk.record({'id': 'p2', 'subreddit': 'r/a', 'sentiment_label': 'Negative', 'sentiment_score': float('nan'),
+                 'upvotes': 8, 'title': 't'})
+    snap = topk.snapshot()
+    assert [p['id'] for p in snap['most_positive']] == ['p1']
+    assert [p['id'] for p in snap['most_upvoted']] == ['p2', 'p1']
+
+
+def test_emotion_outliers_fall_back_when_heaps_are_short(monkeypatch):
+    df = _frame(50).assign(sentiment_label='Neutral', comment='text', author='u', created_time='2024-01-01')
+    monkeypatch.setattr(appmod, '_top_k', lambda frame: topk.TopK.from_frame(frame, k=2))
+    outliers = appmod.emotions_payload(df)['outliers']
+    scores = df['sentiment_score']
+    assert [o['score'] for o in outliers] == list(scores.nlargest(4)) + list(scores.nsmallest(4))
+
+
+def test_threads_pages_reach_rows_without_upvotes(client):
+    n = 30
+    csv = pd.DataFrame({
+        'post_id': [f'p{i}' for i in range(n)],
+        'comment': [f'comment {i}' for i in range(n)],
+        'subreddit': 'r/a',
+        'sentiment_label': 'Neutral',
+        'sentiment_score': 0.0,
+        'upvotes': [None if i % 6 == 0 else float(i) for i in range(n)],
+        'author': 'u',
+        'created_time': '2024-01-01T00:00:00',
+    }).to_csv(index=False)
+    uploaded = client.post('/api/upload-csv', data={'file': (io.BytesIO(csv.encode()), 'nan.csv')},
+                           content_type='multipart/form-data')
+    assert uploaded.get_json()['ok']
+
+    ids = []
+    for page in (1, 2, 3):
+        body = client.get(f'/api/threads?sort=top&page={page}&per_page=10').get_json()
+        assert body['total'] == n
+        ids += [t['id'] for t in body['threads']]
+    ranked = [f'p{i}' for i in range(n - 1, -1, -1) if i % 6]
+    assert ids == ranked + [f'p{i}' for i in range(0, n, 6)]
@@ -0,0 +1,103 @@
+import hashlib
+import io
+import os
+from collections import OrderedDict
+
+import pandas as pd
+import pytest
+from werkzeug.datastructures import FileStorage
+
+import app as appmod
+import datasets
+import registry
+
+
+def _csv(n: int, offset: int = 0) -> bytes:
+    return pd.DataFrame({
+        'post_id': [f'p{i}' for i in range(offset, offset + n)],
+        'subreddit': 'r/test',
+        'comment': [f'comment number {i} is great' for i in range(offset, offset + n)],
+        'sentiment_label': 'Positive',
+        'sentiment_score': 0.5,
+        'created_time': '2024-01-01T00:00:00',
+    }).to_csv(index=False).encode()
+
+
+def _upload(client, body: bytes, name: str = 'posts.csv') -> dict:
+    response = client.post('/api/upload-csv', data={'file': (io.BytesIO(body), name)},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+class Unseekable(io.RawIOBase):
+    def __init__(self, data: bytes):
+        self.inner = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self.inner.readinto(buffer)
+
+
+def test_same_bytes_reuse_the_dataset(client):
+    body = _csv(50)
+    first = _upload(client, body)
+    again = _upload(client, body, 'renamed.csv')
+    assert 'deduplicated' not in first and again['deduplicated']
+    assert again['meta']['dataset_id'] == first['meta']['dataset_id']
+    assert again['meta']['content_hash'] == hashlib.sha256(body).hexdigest()
+
+    other = _upload(client, _csv(50, offset=1))
+    assert other['meta']['dataset_id'] != first['meta']['dataset_id']
+    assert other['meta']['rows'] == 50
+
+
+@pytest.mark.parametrize('stream', [io.BytesIO, Unseekable])
+def test_hashed_upload_rewinds_or_spools(stream):
+    body = _csv(2000)
+    content_hash, source = appmod._hashed_upload(FileStorage(stream(body), 'big.csv'))
+    with source:
+        assert content_hash == hashlib.sha256(body).hexdigest()
+        assert source.read() == body
+
+
+def test_restore_dataset_after_restart(client, monkeypatch):
+    uploaded = _upload(client, _csv(30))['meta']
+    registry.flush()
+    # A new process: nothing in memory, only DATASET_DIR and its pointer
+    monkeypatch.setattr(registry, '_entries', OrderedDict())
+    monkeypatch.setattr(appmod, 'ACTIVE_DATASET', None)
+    monkeypatch.setattr(appmod, 'UPLOAD_META', {})
+    appmod._restore_dataset()
+    assert appmod.ACTIVE_DATASET == uploaded['dataset_id']
+    assert appmod.UPLOAD_META['filename'] == 'posts.csv'
+    assert client.get('/api/overview').get_json()['total_comments'] == 30
+
+
+def test_restore_skips_a_removed_dataset(client, monkeypatch):
+    uploaded = _upload(client, _csv(30))['meta']
+    registry.flush()
+    monkeypatch.setattr(registry, '_entries', OrderedDict())
+    monkeypatch.setattr(appmod, 'ACTIVE_DATASET', None)
+    datasets.remove(uploaded['dataset_id'])
+    appmod._restore_dataset()
+    assert appmod.ACTIVE_DATASET is None
+
+
+def test_prune_disk_keeps_active_and_resident(tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets, 'DATASET_DIR', str(tmp_path / 'datasets'))
+    monkeypatch.setattr(registry, '_entries', OrderedDict())
+    monkeypatch.setattr(registry, 'KEEP_ON_DISK', 1)
+    frame = pd.read_csv(io.BytesIO(_csv(10)))
+    for age, version in enumerate(['newest', 'older', 'resident', 'active']):
+        datasets.save(frame, {'filename': f'{version}.csv'}, version)
+        stamp = 1_000_000 - age * 1000
+        os.utime(os.path.join(datasets.DATASET_DIR, version, 'meta.json'), (stamp, stamp))
+    datasets.activate('active')
+    registry.add(frame, {'filename': 'resident.csv'}, 'resident')
+    registry._entries['resident'].last_used = 0
+
+    registry._prune_disk()
+    assert sorted(datasets.saved_versions()) == ['active', 'newest', 'resident']
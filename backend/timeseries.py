@@ -0,0 +1,197 @@
+"""
+timeseries.py — TIME-SERIES BUCKETING FOR /api/trends
+======================================================
+Turns the created_time column into sentiment trends at hour, day or week
+granularity, optionally split per subreddit and limited to a date range.
+
+How it works:
+  - Timestamps are parsed ONCE into int64 epoch seconds (UTC) and kept on
+    the DataFrame as 'created_epoch' — uploads do this at load time, so
+    trend requests never touch strings again.
+  - A bucket is just epoch // width (weeks are aligned to Monday).
+  - Counts, label counts and score sums per bucket come from np.bincount
+    over the bucket index — no Python loop over groups, no string dates
+    except for the buckets actually returned.
+
+Rows only appear for buckets that contain data, matching the old daily
+output of /api/trends.
+"""
+
+import numpy as np
+import pandas as pd
+
+# ─── CONSTANTS ────────────────────────────────────────────────────────────────
+EPOCH_COLUMN = 'created_epoch'
+EPOCH_NA     = np.iinfo(np.int64).min        # marker for unparseable timestamps
+
+GRANULARITIES = {'hour': 3600, 'day': 86400, 'week': 7 * 86400}
+WEEK_ORIGIN   = 4 * 86400                    # 1970-01-05, the first Monday after the epoch
+LABELS        = ('Positive', 'Neutral', 'Negative')
+MAX_DENSE     = 1_000_000                    # most buckets (or subreddit × bucket cells) counted densely
+
+
+# ─── PARSING ─────────────────────────────────────────────────────────────────
+
+def to_epochs(values) -> np.ndarray:
+    """
+    Parse timestamps into int64 epoch seconds (UTC). Naive timestamps are
+    taken as UTC. Values no parser accepts fall back to their first 10
+    characters as a date ('2024-03-01 garbage' → that day), like the old
+    str[:10] trends fallback; anything else becomes EPOCH_NA.
+    """
+    s = pd.Series(values).astype(str)
+    # Fast path: everything we write ourselves is ISO 8601
+    dt = pd.to_datetime(s, errors='coerce', utc=True, format='ISO8601')
+    failed = dt.isna() & s.str.strip().ne('') & ~s.isin(['nan', 'NaT', 'None'])
+    if failed.any():
+        dt[failed] = pd.to_datetime(s[failed], errors='coerce', utc=True, format='mixed')
+        failed &= dt.isna()
+        if failed.any():
+            dt[failed] = pd.to_datetime(s[failed].str.strip().str[:10], errors='coerce', utc=True,
+                                        format='%Y-%m-%d')
+
+    epochs = np.full(len(s), EPOCH_NA, dtype=np.int64)
+    ok = dt.notna().to_numpy()
+    epochs[ok] = dt[ok].to_numpy(dtype='datetime64[s]').astype(np.int64)
+    return epochs
+
+
+def ensure_epochs(df: pd.DataFrame) -> np.ndarray:
+    """Return df's epoch column, parsing created_time once if it isn't there yet."""
+    if EPOCH_COLUMN not in df.columns:
+        df[EPOCH_COLUMN] = to_epochs(df['created_time'])
+    return df[EPOCH_COLUMN].to_numpy()
+
+
+def parse_bound(value: str | None, end: bool = False) -> int | None:
+    """
+    Parse a start/end query parameter into epoch seconds. A bare date
+    (YYYY-MM-DD) used as an end bound covers that whole day.
+    Raises ValueError on garbage.
+    """
+    if not value:
+        return None
+    ts = pd.Timestamp(value)
+    ts = ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+    epoch = int(ts.timestamp())
+    if end and len(value.strip()) == 10:
+        epoch += 86400
+    return epoch
+
+
+# ─── BUCKETING ───────────────────────────────────────────────────────────────
+
+def granularity_width(granularity: str) -> int:
+    """Bucket width in seconds. Raises ValueError for an unknown granularity."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    return GRANULARITIES[granularity]
+
+
+def _bucket_starts(epochs: np.ndarray, granularity: str) -> np.ndarray:
+    width = GRANULARITIES[granularity]
+    origin = WEEK_ORIGIN if granularity == 'week' else 0
+    return (epochs - origin) // width * width + origin
+
+
+def _format(starts: np.ndarray, granularity: str) -> list:
+    stamps = starts.astype('datetime64[s]')
+    if granularity == 'hour':
+        return [s.replace('T', ' ') + ':00' for s in np.datetime_as_string(stamps, unit='h')]
+    return np.datetime_as_string(stamps, unit='D').tolist()
+
+
+def bucket_rows(buckets: np.ndarray, granularity: str, total, pos, neu, neg, score_sum) -> list:
+    """
+    Output rows for per-bucket totals (bucket start epochs + counts); empty
+    buckets are skipped. Counts may be estimates (floats); they are rounded.
+    """
+    idx = np.flatnonzero(total)
+    keys = _format(buckets[idx], granularity)
+    avg = np.round(score_sum[idx] / total[idx], 4).tolist()
+    return [
+        {'date': k, 'avg_score': a, 'positive': round(p), 'neutral': round(u), 'negative': round(n), 'total': round(t)}
+        for k, a, p, u, n, t in zip(keys, avg, pos[idx], neu[idx], neg[idx], total[idx])
+    ]
+
+
+def bucket_index(df: pd.DataFrame, granularity: str = 'day', start: int | None = None,
+                 end: int | None = None) -> tuple:
+    """
+    (keep, buckets, inv): the mask of rows with a timestamp in [start, end),
+    the bucket start epochs, and the bucket of each kept row.
+    Raises ValueError for an unknown granularity.
+    """
+    width = granularity_width(granularity)
+
+    epochs = ensure_epochs(df)
+    keep = epochs != EPOCH_NA
+    if start is not None:
+        keep &= epochs >= start
+    if end is not None:
+        keep &= epochs < end
+    if not keep.any():
+        return keep, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    starts = _bucket_starts(epochs[keep], granularity)
+    first = starts.min()
+    span = (starts.max() - first) // width + 1
+    if span <= MAX_DENSE:
+        # Dense index: bucket i starts at first + i * width (empty buckets are skipped in bucket_rows)
+        inv = (starts - first) // width
+        buckets = first + np.arange(span, dtype=np.int64) * width
+    else:
+        # Outliers stretch the span (e.g. a stray 1970 date) — index only the buckets present
+        buckets, inv = np.unique(starts, return_inverse=True)
+    return keep, buckets, inv
+
+
+def trend_rows(df: pd.DataFrame, granularity: str = 'day', start: int | None = None,
+               end: int | None = None, by_subreddit: bool = False) -> dict:
+    """
+    Bucket df into sentiment trends.
+
+    Args:
+        granularity:  'hour', 'day' or 'week'.
+        start, end:   optional epoch-second bounds, start inclusive / end exclusive.
+        by_subreddit: also return one series per subreddit.
+
+    Returns {'granularity': ..., 'trends': [...], 'subreddits': {name: [...]}}
+    ('subreddits' only when by_subreddit is set).
+    """
+    result = {'granularity': granularity, 'trends': []}
+    if by_subreddit:
+        result['subreddits'] = {}
+    keep, buckets, inv = bucket_index(df, granularity, start, end)
+    if not keep.any():
+        return result
+    n = len(buckets)
+
+    labels = df['sentiment_label'].to_numpy()[keep]
+    scores = df['sentiment_score'].to_numpy(dtype=float)[keep]
+    masks = [(labels == label).astype(float) for label in LABELS]
+
+    def _series(index, size):
+        return (np.bincount(index, minlength=size),
+                *(np.bincount(index, weights=m, minlength=size) for m in masks),
+                np.bincount(index, weights=scores, minlength=size))
+
+    result['trends'] = bucket_rows(buckets, granularity, *_series(inv, n))
+
+    if by_subreddit:
+        codes, names = pd.factorize(df['subreddit'].to_numpy()[keep], use_na_sentinel=False)
+        key = codes * n + inv
+        if len(names) * n <= MAX_DENSE:
+            per_sub = [a.reshape(len(names), n) for a in _series(key, len(names) * n)]
+            for code, name in enumerate(names):
+                result['subreddits'][str(name)] = bucket_rows(buckets, granularity, *(a[code] for a in per_sub))
+        else:
+            # Many subreddits × many buckets: count only the (subreddit, bucket) cells that occur
+            cells, key = np.unique(key, return_inverse=True)
+            per_cell = _series(key, len(cells))
+            bounds = np.searchsorted(cells, np.arange(len(names) + 1) * n)
+            for code, name in enumerate(names):
+                part = slice(bounds[code], bounds[code + 1])
+                result['subreddits'][str(name)] = bucket_rows(buckets[cells[part] % n], granularity,
+                                                              *(a[part] for a in per_cell))
+    return result
@@ -0,0 +1,165 @@
+"""
+topk.py — BOUNDED TOP-K HEAPS PER METRIC AND SUBREDDIT
+=======================================================
+The most extreme rows are what the dashboard shows first: the emotion
+page's outliers (4 highest + 4 lowest sentiment scores) and the "hot",
+"top" and "new" orders of /api/threads. A TopK tracker keeps the K best
+rows for each of those orders, overall and per subreddit, so they are
+read off a heap instead of sorting or scanning the dataset.
+
+How it works:
+  - One min-heap per (metric, direction, subreddit or None for all).
+    Entries are (key, -seq, item): key is the value (negated for 'low'),
+    seq is the row's position, so the root is always the entry to drop
+    next. Equal values rank earlier rows first, matching the stable sorts
+    and nlargest/nsmallest(keep='first') they replace. NaN is never ranked.
+  - add() offers one row to every heap it belongs to: O(log K) per heap.
+    The scheduler feeds the module-level `live` tracker this way, one
+    post per insert (GET /api/live-stats shows it).
+  - from_frame() builds a tracker for an uploaded dataset in one pass:
+    one stable argsort per (metric, direction), then the first K rows
+    of each subreddit. app.py keeps it next to the dataset through
+    registry.derived(), like the bitmap index.
+  - rows() answers a slice of an order, best first. When the slice runs
+    past the K kept rows and the scope has more rows, it returns None and
+    the caller falls back to the full listing. That includes rows without
+    a value: the listing sorts them last, after every ranked row, so a
+    page that reaches them is not answered off the heap.
+"""
+
+import heapq
+import math
+import os
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+TOPK_SIZE   = max(int(os.getenv('TOPK_SIZE', 50)), 4)   # rows kept per heap (5 pages of 10 threads; 4 outliers minimum)
+LIVE_TOP    = 5                                   # rows per list in /api/live-stats
+METRICS     = {'sentiment_score': ('high', 'low'), 'upvotes': ('high',)}
+ENTRY_BYTES = 160                                 # rough size of one heap entry (tuple + float + ints)
+
+
+class TopK:
+    """K best rows per (metric, direction), overall and per subreddit."""
+
+    def __init__(self, k: int = TOPK_SIZE):
+        self.k = k
+        self.heaps: dict = {}           # (metric, direction, subreddit | None) → heap
+        self.counts = Counter()         # subreddit | None → rows offered
+        self.seq = 0
+        self.lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return ENTRY_BYTES * sum(len(h) for h in self.heaps.values())
+
+    # ─── INSERT ──────────────────────────────────────────────────────────────
+
+    def add(self, subreddit: str, values: dict, item):
+        """Offer one row. values: {metric: number}; item is what rows() returns for it."""
+        with self.lock:
+            seq = self.seq
+            self.seq += 1
+            scopes = (None, subreddit)
+            for scope in scopes:
+                self.counts[scope] += 1
+            for metric, value in values.items():
+                if value is None or metric not in METRICS or math.isnan(value):
+                    continue
+                for direction in METRICS[metric]:
+                    entry = (value if direction == 'high' else -value, -seq, item)
+                    for scope in scopes:
+                        heap = self.heaps.setdefault((metric, direction, scope), [])
+                        if len(heap) < self.k:
+                            heapq.heappush(heap, entry)
+                        elif entry > heap[0]:
+                            heapq.heapreplace(heap, entry)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, text: dict | None = None, k: int = TOPK_SIZE) -> 'TopK':
+        """Tracker of an uploaded dataset; items are row positions."""
+        tracker = cls(k)
+        codes, subs = pd.factorize(df['subreddit'])
+        tracker.seq = len(df)
+        tracker.counts[None] = len(df)
+        for code, count in enumerate(np.bincount(codes[codes >= 0], minlength=len(subs))):
+            tracker.counts[subs[code]] = int(count)
+
+        for metric, directions in METRICS.items():
+            if metric not in df.columns:
+                continue
+            values = pd.to_numeric(df[metric], errors='coerce').to_numpy(dtype=float)
+            ranked = np.flatnonzero(~np.isnan(values))
+            for direction in directions:
+                keys = values[ranked] if direction == 'high' else -values[ranked]
+                order = ranked[np.argsort(-keys, kind='stable')]        # best first, ties by row
+                tracker._seed((metric, direction, None), order[:k], values, direction)
+                # First k rows of each subreddit along the order
+                order_codes = codes[order]
+                rank = pd.Series(order_codes).groupby(order_codes).cumcount().to_numpy()
+                keep = order[(rank < k) & (order_codes >= 0)]
+                keep = keep[np.argsort(codes[keep], kind='stable')]
+                bounds = np.flatnonzero(np.diff(codes[keep])) + 1
+                for rows in np.split(keep, bounds):
+                    if len(rows):
+                        tracker._seed((metric, direction, subs[codes[rows[0]]]), rows, values, direction)
+        return tracker
+
+    def _seed(self, key: tuple, rows: np.ndarray, values: np.ndarray, direction: str):
+        sign = 1.0 if direction == 'high' else -1.0
+        heap = [(sign * float(values[row]), -int(row), int(row)) for row in rows]
+        heapq.heapify(heap)
+        self.heaps[key] = heap
+
+    # ─── READ ────────────────────────────────────────────────────────────────
+
+    def count(self, subreddit: str | None = None) -> int:
+        return self.counts.get(subreddit, 0)
+
+    def rows(self, metric: str, direction: str, subreddit: str | None = None,
+             start: int = 0, stop: int | None = None) -> list | None:
+        """
+        Items start..stop of the (metric, direction) order, best first. None
+        when the slice needs rows beyond the K kept ones, or rows without a
+        value (NaN): those are in no heap, but they are in the listing and
+        its total.
+        """
+        with self.lock:
+            heap = list(self.heaps.get((metric, direction, subreddit), []))
+            complete = len(heap) == self.counts.get(subreddit, 0)
+        stop = len(heap) if stop is None else stop
+        if start < 0 or (stop > len(heap) and not complete):
+            return None
+        return [item for _, _, item in sorted(heap, reverse=True)[start:stop]]
+
+
+# ─── LIVE TRACKER (fed by scheduler.py) ──────────────────────────────────────
+live = TopK()
+
+
+def record(post: dict):
+    """Offer one inserted post (a db.insert_post row) to the live tracker."""
+    item = {
+        'id':        post['id'],
+        'title':     (post.get('title') or '')[:120],
+        'subreddit': post['subreddit'],
+        'upvotes':   post.get('upvotes', 0),
+        'sentiment': post['sentiment_label'],
+        'score':     post['sentiment_score'],
+        'time':      post.get('created_time'),
+    }
+    live.add(post['subreddit'], {'sentiment_score': post['sentiment_score'],
+                                 'upvotes': post.get('upvotes', 0)}, item)
+
+
+def snapshot(subreddit: str | None = None, n: int = LIVE_TOP) -> dict:
+    """Extreme posts inserted since startup, overall or for one subreddit."""
+    return {
+        'most_positive': live.rows('sentiment_score', 'high', subreddit)[:n],
+        'most_negative': live.rows('sentiment_score', 'low', subreddit)[:n],
+        'most_upvoted':  live.rows('upvotes', 'high', subreddit)[:n],
+    }
@@ -0,0 +1,221 @@
+"""
+url_analysis.py — REDDIT URL ANALYSIS JOBS
+===========================================
+Backs POST /api/analyze-url: fetches a Reddit post via api_fetch.py,
+scores the post and its comments with VADER and caches the result.
+
+Project Flow position:
+    User URL → [THIS MODULE] → api_fetch.py → scoring.py → API Response
+
+How it works:
+  - Submitting a URL returns a job id straight away; a small thread pool
+    does the fetching and scoring in the background.
+  - Finished results are cached by post id for URL_CACHE_TTL seconds, so a
+    hot thread opened by many dashboards costs one Reddit fetch. Expired
+    entries are swept on every insert and at most URL_CACHE_SIZE are kept.
+  - While a post is being fetched, further submissions for the same post
+    are attached to the running job instead of starting a new one.
+  - Each worker thread reuses its own authenticated client from
+    api_fetch.py (praw clients are not thread-safe).
+  - RUN_MODE=multi: job records are also written to reddit.db, so a job
+    submitted to one worker can be polled on any other.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import db
+from api_fetch import extract_post_id, fetch_post_data
+from scoring import score_many, score_text
+
+# ─── CONFIG ──────────────────────────────────────────────────────────────────
+CACHE_TTL_SECONDS = int(os.getenv('URL_CACHE_TTL', 300))
+CACHE_SIZE        = int(os.getenv('URL_CACHE_SIZE', 1000))
+WORKERS           = int(os.getenv('URL_ANALYSIS_WORKERS', 4))
+MAX_JOBS          = 500     # finished jobs kept for polling before pruning
+COMMENT_LIMIT     = 50
+SHARE_JOBS        = os.getenv('RUN_MODE', 'single').lower() == 'multi'
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='url-analysis')
+_lock     = threading.Lock()
+
+_jobs: dict     = {}   # job_id  → job record
+_inflight: dict = {}   # post_id → job_id of the queued/running job
+_cache: OrderedDict = OrderedDict()   # post_id → (expires_at, result), oldest expiry first
+
+
+# ─── SCORING ─────────────────────────────────────────────────────────────────
+
+def score_post(data: dict) -> dict:
+    """
+    Score a fetch_post_data() payload. The post itself is scored on
+    title + body; each comment becomes one segment, mirroring the
+    response shape of /api/analyze-text.
+    """
+    post_text = f"{data['title']}\n{data['body']}".strip()
+    post_sentiment = score_text(post_text)
+
+    seg_results = []
+    summary = {'Positive': 0, 'Neutral': 0, 'Negative': 0}
+    for comment, s in zip(data['comments'], score_many(data['comments'])):
+        seg_results.append({'text': comment[:200], 'label': s['label'], 'score': s['score']})
+        summary[s['label']] += 1
+
+    return {
+        'post_id': data['post_id'],
+        'subreddit': data['subreddit'],
+        'title': data['title'],
+        'body': data['body'][:1000],
+        'upvotes': data['upvotes'],
+        'post_sentiment': post_sentiment,
+        'segments_analyzed': len(seg_results),
+        'segment_sentiments': seg_results,
+        'summary': summary,
+        'analyzed_at': datetime.now().isoformat(),
+    }
+
+
+# ─── CACHE ───────────────────────────────────────────────────────────────────
+
+def get_cached(post_id: str) -> dict | None:
+    """Return the cached result for a post, or None if missing/expired."""
+    with _lock:
+        entry = _cache.get(post_id)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at < time.time():
+            del _cache[post_id]
+            return None
+        return result
+
+
+def _cache_put(post_id: str, result: dict):
+    """
+    Cache a result. Entries share one TTL, so the dict stays in expiry order:
+    sweep expired ones off the front, then drop the oldest past CACHE_SIZE.
+    Caller holds _lock.
+    """
+    now = time.time()
+    _cache.pop(post_id, None)
+    _cache[post_id] = (now + CACHE_TTL_SECONDS, result)
+    while _cache:
+        oldest_id, (expires_at, _) = next(iter(_cache.items()))
+        if expires_at >= now and len(_cache) <= CACHE_SIZE:
+            break
+        del _cache[oldest_id]
+
+
+def _prune_jobs():
+    """Drop the oldest finished jobs once MAX_JOBS is exceeded. Caller holds _lock."""
+    if len(_jobs) <= MAX_JOBS:
+        return
+    finished = [j for j in _jobs.values() if j['status'] in ('done', 'error')]
+    finished.sort(key=lambda j: j['submitted_at'])
+    for job in finished[:len(_jobs) - MAX_JOBS]:
+        del _jobs[job['job_id']]
+
+
+def _share(job: dict):
+    """RUN_MODE=multi: publish a job record so other workers can answer polls for it."""
+    if not SHARE_JOBS:
+        return
+    try:
+        db.save_url_job(job)
+    except Exception as e:
+        print(f"[url_analysis.py] Could not share job {job['job_id']}: {e}")
+
+
+# ─── JOBS ────────────────────────────────────────────────────────────────────
+
+def _run_job(job_id: str, url: str, post_id: str, comment_limit: int):
+    with _lock:
+        _jobs[job_id]['status'] = 'running'
+        snapshot = dict(_jobs[job_id])
+    _share(snapshot)
+
+    try:
+        data = fetch_post_data(url, comment_limit=comment_limit)
+        if data['ok']:
+            result = score_post(data)
+            error = None
+        else:
+            result, error = None, data['error']
+    except Exception as e:
+        result, error = None, str(e)
+
+    with _lock:
+        job = _jobs[job_id]
+        job['finished_at'] = datetime.now().isoformat()
+        if error is None:
+            job['status'] = 'done'
+            job['result'] = result
+            _cache_put(post_id, result)
+        else:
+            job['status'] = 'error'
+            job['error'] = error
+        _inflight.pop(post_id, None)
+        snapshot = dict(job)
+    _share(snapshot)
+
+
+def submit(url: str, comment_limit: int = COMMENT_LIMIT) -> dict:
+    """
+    Queue a URL for analysis.
+
+    Returns one of:
+      {'ok': False, 'error': ...}                      invalid URL
+      {'ok': True, 'status': 'done', 'cached': True, 'result': {...}}
+      {'ok': True, 'status': 'queued'|'running', 'job_id': ...}
+    """
+    post_id = extract_post_id(url)
+    if not post_id:
+        return {'ok': False, 'error': f'Could not extract a post ID from the URL: "{url}".'}
+
+    cached = get_cached(post_id)
+    if cached is not None:
+        return {'ok': True, 'status': 'done', 'cached': True, 'post_id': post_id, 'result': cached}
+
+    with _lock:
+        # Another request is already fetching this post — share its job
+        job_id = _inflight.get(post_id)
+        if job_id is not None:
+            return {'ok': True, 'status': _jobs[job_id]['status'], 'job_id': job_id, 'post_id': post_id}
+
+        job_id = uuid.uuid4().hex
+        _jobs[job_id] = {
+            'job_id': job_id,
+            'post_id': post_id,
+            'url': url,
+            'status': 'queued',
+            'submitted_at': datetime.now().isoformat(),
+            'finished_at': None,
+            'result': None,
+            'error': None,
+        }
+        _inflight[post_id] = job_id
+        _prune_jobs()
+        snapshot = dict(_jobs[job_id])
+
+    _share(snapshot)
+    _executor.submit(_run_job, job_id, url, post_id, comment_limit)
+    return {'ok': True, 'status': 'queued', 'job_id': job_id, 'post_id': post_id}
+
+
+def get_job(job_id: str) -> dict | None:
+    """Return a snapshot of a job record, or None if the id is unknown (here and, in multi mode, shared)."""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            return dict(job)
+    if SHARE_JOBS:
+        try:
+            return db.load_url_job(job_id)
+        except Exception as e:
+            print(f"[url_analysis.py] Could not read shared job {job_id}: {e}")
+    return None
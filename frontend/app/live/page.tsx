@@ -1,7 +1,7 @@
 'use client';
 
 import { useState, useEffect } from 'react';
-import { fetchStatus, clearData } from '@/src/services/api';
+import { fetchStatus, clearData, subscribeToUpdates } from '@/src/services/api';
 import { Radio, PlayCircle, Settings, Activity, Server, RefreshCw } from 'lucide-react';
 
 export default function LiveStreamPage() {
@@ -21,8 +21,11 @@ export default function LiveStreamPage() {
 
     useEffect(() => {
         loadStatus();
-        const interval = setInterval(loadStatus, 5000);
-        return () => clearInterval(interval);
+        // Cycle events carry the status fields directly; dataset changes need a refetch
+        return subscribeToUpdates((event, data) => {
+            if (event === 'cycle') setStatusData((prev: any) => ({ ...prev, ...data }));
+            else loadStatus();
+        });
     }, []);
 
     const handleStartLive = async () => {
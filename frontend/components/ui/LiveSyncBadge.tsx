@@ -9,11 +9,11 @@
  *   🟡 SYNCING — first cycle hasn't completed yet
  *   🔴 ERR    — sync thread encountered an error
  *
- * Polls /api/status every 30 seconds.
+ * Loads /api/status once, then updates from /api/stream cycle events.
  */
 
 import { useState, useEffect, useCallback } from 'react';
-import { fetchStatus, startAutoRefresh } from '@/src/services/api';
+import { fetchStatus, subscribeToUpdates } from '@/src/services/api';
 
 type SyncMode = 'live' | 'simulation' | 'starting';
 
@@ -53,8 +53,10 @@ export default function LiveSyncBadge() {
 
     useEffect(() => { loadStatus(); }, [loadStatus]);
 
-    // Poll every 30s
-    useEffect(() => startAutoRefresh(loadStatus, 30000), [loadStatus]);
+    // Pushed updates instead of polling
+    useEffect(() => subscribeToUpdates((event, data) => {
+        if (event === 'cycle') setStatus(prev => (prev ? { ...prev, ...data } : prev));
+    }), []);
 
     // Tick every 10s to refresh relative timestamps
     useEffect(() => {
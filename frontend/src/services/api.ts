@@ -138,6 +138,18 @@ export const fetchUploadStatus = () =>
     apiFetch<{ csv_loaded: boolean; meta: any }>('/api/upload-status');
 
 
+// ─── Server-Sent Events (/api/stream) ────────────────────────────────────────
+// The backend pushes 'cycle' after every scheduler run and 'dataset' when a
+// CSV is uploaded or cleared. EventSource reconnects on its own.
+// Usage: const stop = subscribeToUpdates((event, data) => ...); call stop() on cleanup.
+export function subscribeToUpdates(onEvent: (event: 'cycle' | 'dataset', data: any) => void): () => void {
+    const source = new EventSource(`${API_BASE}/api/stream`);
+    const handler = (name: 'cycle' | 'dataset') => (e: MessageEvent) => onEvent(name, JSON.parse(e.data));
+    source.addEventListener('cycle', handler('cycle'));
+    source.addEventListener('dataset', handler('dataset'));
+    return () => source.close();
+}
+
 // ─── Auto-refresh Hook (5s) ──────────────────────────────────────────────────
 // Usage in any page: const stop = startAutoRefresh(() => fetchData(), 5000);
 // Call stop() in a cleanup function.